@@ -0,0 +1,220 @@
+"""
+Resumable batch runs over large address lists.
+
+A job is a directory under `jobs/`:
+
+  jobs/<job_id>/manifest.json        job id, kind, creation time, address count
+  jobs/<job_id>/addresses.txt        the de-duplicated address list, one per line
+  jobs/<job_id>/journal.<shard>.jsonl append-only, one line per finished address
+
+Every finished address is appended (and flushed) to the journal as soon as
+its result is known, so a run that dies halfway restarts with only the
+unfinished addresses. Addresses are split into shards by a stable hash;
+separate processes (or machines sharing the jobs directory) can each take
+one shard and write their own journal file without coordinating.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+JOBS_DIR = os.path.join(os.path.dirname(__file__), 'jobs')
+
+# fsync the journal every N records; each record is flushed immediately anyway
+FSYNC_EVERY = 100
+
+
+def shard_of(address: str, shard_count: int) -> int:
+    """Stable shard number for an address (same on every process and machine)."""
+    return zlib.crc32(address.encode('utf-8')) % max(1, shard_count)
+
+
+class BatchJob:
+    def __init__(self, job_dir: str):
+        self.dir = job_dir
+        self.job_id = os.path.basename(job_dir.rstrip(os.sep))
+        with open(os.path.join(job_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self._addresses: Optional[List[str]] = None
+        # journal name -> bytes already folded into self._records
+        self._offsets: Dict[str, int] = {}
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._read_lock = threading.Lock()
+
+    @classmethod
+    def create(cls, addresses: Iterable[str], kind: str = 'check', job_id: Optional[str] = None,
+               root: str = JOBS_DIR) -> 'BatchJob':
+        job_id = job_id or datetime.now().strftime(f'{kind}-%Y%m%d-%H%M%S')
+        if not re.fullmatch(r'[A-Za-z0-9_.-]+', job_id):
+            raise ValueError(f'invalid job id: {job_id}')
+        job_dir = os.path.join(root, job_id)
+        if os.path.exists(os.path.join(job_dir, 'manifest.json')):
+            raise FileExistsError(f'job already exists: {job_id}')
+        os.makedirs(job_dir, exist_ok=True)
+        unique = list(dict.fromkeys(a.strip() for a in addresses if a and a.strip()))
+        with open(os.path.join(job_dir, 'addresses.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(unique) + ('\n' if unique else ''))
+        manifest = {
+            'job_id': job_id, 'kind': kind, 'count': len(unique),
+            'CreatedAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with open(os.path.join(job_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        return cls(job_dir)
+
+    @classmethod
+    def open(cls, job_id: str, root: str = JOBS_DIR) -> 'BatchJob':
+        job_dir = os.path.join(root, job_id)
+        if not os.path.exists(os.path.join(job_dir, 'manifest.json')):
+            raise FileNotFoundError(f'job not found: {job_id}')
+        return cls(job_dir)
+
+    @staticmethod
+    def list(root: str = JOBS_DIR) -> List[str]:
+        if not os.path.isdir(root):
+            return []
+        return sorted(d for d in os.listdir(root) if os.path.exists(os.path.join(root, d, 'manifest.json')))
+
+    @property
+    def kind(self) -> str:
+        return self.manifest.get('kind', 'check')
+
+    def addresses(self) -> List[str]:
+        if self._addresses is None:
+            with open(os.path.join(self.dir, 'addresses.txt'), 'r', encoding='utf-8') as f:
+                self._addresses = [line.strip() for line in f if line.strip()]
+        return self._addresses
+
+    def journal_path(self, shard: int) -> str:
+        return os.path.join(self.dir, f'journal.{shard}.jsonl')
+
+    def records(self) -> Dict[str, Dict[str, Any]]:
+        """Latest journal record per address, across every shard's journal.
+
+        Journals are only read from where the previous call stopped, so
+        polling the status of a running job costs O(new records).
+        """
+        with self._read_lock:
+            for name in sorted(os.listdir(self.dir)):
+                if not (name.startswith('journal.') and name.endswith('.jsonl')):
+                    continue
+                with open(os.path.join(self.dir, name), 'rb') as f:
+                    f.seek(self._offsets.get(name, 0))
+                    chunk = f.read()
+                # a line without its newline is still being written (or was torn by a
+                # crash); leave it for the next call, the address is redone if it never completes
+                end = chunk.rfind(b'\n') + 1
+                self._offsets[name] = self._offsets.get(name, 0) + end
+                for line in chunk[:end].splitlines():
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    prev = self._records.get(rec.get('a'))
+                    if prev is None or rec.get('t', 0) >= prev.get('t', 0):
+                        self._records[rec['a']] = rec
+            return dict(self._records)
+
+    def pending(self, shard: int = 0, shard_count: int = 1, retry_failed: bool = True) -> List[str]:
+        done = self.records()
+        todo = []
+        for a in self.addresses():
+            if shard_count > 1 and shard_of(a, shard_count) != shard:
+                continue
+            rec = done.get(a)
+            if rec is None or (retry_failed and not rec.get('ok')):
+                todo.append(a)
+        return todo
+
+    def status(self) -> Dict[str, Any]:
+        done = self.records()
+        ok = sum(1 for r in done.values() if r.get('ok'))
+        total = len(self.addresses())
+        return {'job_id': self.job_id, 'kind': self.kind, 'total': total, 'done': ok,
+                'failed': len(done) - ok, 'pending': total - ok}
+
+    def results(self) -> List[Dict[str, Any]]:
+        """Results in the job's address order ({'address', 'ok', 'result'|'error'})."""
+        done = self.records()
+        out = []
+        for a in self.addresses():
+            rec = done.get(a)
+            if rec is None:
+                continue
+            item = {'address': a, 'ok': bool(rec.get('ok'))}
+            if rec.get('ok'):
+                item['result'] = rec.get('r')
+            else:
+                item['error'] = rec.get('e')
+            out.append(item)
+        return out
+
+    def run(self, worker: Callable[[str], Dict[str, Any]], shard: int = 0, shard_count: int = 1,
+            threads: int = 8, stop: Optional[threading.Event] = None,
+            on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Process this shard's unfinished addresses with `threads` concurrent workers.
+
+        `worker(address)` returns a result dict; a dict with an 'error' key
+        (or an exception) is journaled as a failure and retried on the next
+        run. Setting `stop` finishes the in-flight addresses and returns.
+        """
+        todo = self.pending(shard, shard_count)
+        lock = threading.Lock()
+        written = 0
+        counts = {'ok': 0, 'failed': 0}
+        threads = max(1, int(threads))
+
+        def call(address: str) -> Dict[str, Any]:
+            try:
+                res = worker(address)
+            except Exception as e:
+                res = {'error': str(e)}
+            return res if isinstance(res, dict) else {'error': 'worker returned no result'}
+
+        with open(self.journal_path(shard), 'a', encoding='utf-8') as journal:
+            def record(address: str, res: Dict[str, Any]) -> None:
+                nonlocal written
+                ok = not res.get('error')
+                rec = {'a': address, 'ok': ok, 't': time.time()}
+                if ok:
+                    rec['r'] = res
+                else:
+                    rec['e'] = str(res.get('error'))
+                with lock:
+                    journal.write(json.dumps(rec, ensure_ascii=False, separators=(',', ':')) + '\n')
+                    journal.flush()
+                    written += 1
+                    if written % FSYNC_EVERY == 0:
+                        os.fsync(journal.fileno())
+                    counts['ok' if ok else 'failed'] += 1
+                if on_result:
+                    on_result(address, res)
+
+            # keep a bounded window in flight instead of queueing the whole list
+            it = iter(todo)
+            with ThreadPoolExecutor(max_workers=threads) as ex:
+                inflight = {}
+                while True:
+                    while len(inflight) < threads * 2 and not (stop and stop.is_set()):
+                        a = next(it, None)
+                        if a is None:
+                            break
+                        inflight[ex.submit(call, a)] = a
+                    if not inflight:
+                        break
+                    finished, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        record(inflight.pop(fut), fut.result())
+            journal.flush()
+            os.fsync(journal.fileno())
+
+        return {'job_id': self.job_id, 'shard': shard, 'shard_count': shard_count,
+                'processed': written, 'ok': counts['ok'], 'failed': counts['failed'],
+                'stopped': bool(stop and stop.is_set())}
@@ -0,0 +1,101 @@
+"""
+Results of a multi-address check, summarized and sorted on the Python side.
+
+The page only ever receives one compact row per address (totals, next
+unlock, error) and renders the rows through a virtualized list; the full
+thaw breakdown of an address is fetched when its row is opened. Sorting
+and totals are computed here, so the UI thread does no per-address work
+however many wallets were checked.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# sort key offered by the UI -> row field
+SORT_KEYS = {
+    'order': 'index',
+    'address': 'address',
+    'night': 'total_amount',
+    'usd': 'total_usd',
+    'next': 'days_until',
+    'unclaimed': 'unclaimed_amount',
+}
+
+
+def summarize_result(index: int, address: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact row of a `check_address` result."""
+    row: Dict[str, Any] = {'index': index, 'address': address}
+    error = (result or {}).get('error')
+    if error and error != 'No schedule found':
+        row['error'] = error
+        return row
+    thaws = (result or {}).get('thaws') or []
+    upcoming = sorted((t for t in thaws if t.get('status') == 'Unclaimed' and t.get('thaw_date')),
+                      key=lambda t: t['thaw_date'])
+    nxt = upcoming[0] if upcoming else None
+    row.update(
+        total_amount=round(float(result.get('total_amount') or 0.0), 3),
+        total_usd=round(float(result.get('total_usd') or 0.0), 3),
+        thaws=len(thaws),
+        unclaimed=len(upcoming),
+        unclaimed_amount=round(sum(float(t.get('amount') or 0.0) for t in upcoming), 3),
+        next_date=nxt.get('vn_date') if nxt else None,
+        days_until=nxt.get('days_until') if nxt else None,
+    )
+    return row
+
+
+class BulkResults:
+    """Full results of the current multi-address check, plus their summary rows."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._rows: Dict[str, Dict[str, Any]] = {}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self._rows.clear()
+
+    def add(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Store (address, result) pairs; returns their rows."""
+        out = []
+        with self._lock:
+            for address, result in items:
+                prev = self._rows.get(address)
+                row = summarize_result(prev['index'] if prev else len(self._rows), address, result)
+                self._results[address] = result
+                self._rows[address] = row
+                out.append(row)
+        return out
+
+    def result(self, address: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._results.get(address)
+
+    def rows(self, key: str = 'order', descending: bool = False) -> List[Dict[str, Any]]:
+        """All rows sorted by `key` (see SORT_KEYS); rows without the field go last."""
+        field = SORT_KEYS.get(key)
+        if field is None:
+            raise ValueError(f'unknown sort key: {key}')
+        with self._lock:
+            rows = list(self._rows.values())
+        present = [r for r in rows if r.get(field) is not None]
+        missing = [r for r in rows if r.get(field) is None]
+        present.sort(key=lambda r: r[field], reverse=descending)
+        missing.sort(key=lambda r: r['index'])
+        return present + missing
+
+    def totals(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = list(self._rows.values())
+        ok = [r for r in rows if not r.get('error')]
+        return {
+            'addresses': len(rows),
+            'errors': len(rows) - len(ok),
+            'total_amount': round(sum(r['total_amount'] for r in ok), 3),
+            'total_usd': round(sum(r['total_usd'] for r in ok), 3),
+            'unclaimed_amount': round(sum(r['unclaimed_amount'] for r in ok), 3),
+        }
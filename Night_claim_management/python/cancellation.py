@@ -0,0 +1,61 @@
+"""
+Generation-tagged requests, so work for a view the user has left stops early.
+
+The page numbers its requests per channel ('chart', 'check', 'bulk'): every
+new view bumps the generation, and each bridge call carries the generation
+it was made for. A call is superseded as soon as the channel has seen a
+newer generation (from a newer call or from `cancel`). The `Ticket` of a
+call travels down to `fetch_json`, which checks it before sending, between
+reads of the response (closing the connection when superseded), and before
+parsing; a superseded call raises `Superseded` and returns nothing.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Optional
+
+
+class Superseded(Exception):
+    """The request belongs to a generation the UI has moved past."""
+
+
+class Ticket:
+    __slots__ = ('_gens', 'channel', 'generation')
+
+    def __init__(self, gens: 'Generations', channel: str, generation: int):
+        self._gens = gens
+        self.channel = channel
+        self.generation = generation
+
+    @property
+    def cancelled(self) -> bool:
+        return self._gens.current(self.channel) > self.generation
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise Superseded(f'{self.channel} request {self.generation} superseded')
+
+
+class Generations:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current: Dict[str, int] = {}
+
+    def current(self, channel: str) -> int:
+        return self._current.get(channel, 0)
+
+    def cancel(self, channel: str, generation: int) -> None:
+        """Supersede every request of `channel` older than `generation`."""
+        with self._lock:
+            if int(generation) > self._current.get(channel, 0):
+                self._current[channel] = int(generation)
+
+    def begin(self, channel: str, generation: Optional[int]) -> Optional[Ticket]:
+        """Ticket of a call made for `generation` (None: untagged call, never cancelled).
+
+        A newer generation supersedes the older calls still running.
+        """
+        if generation is None:
+            return None
+        self.cancel(channel, generation)
+        return Ticket(self, channel, int(generation))
@@ -0,0 +1,323 @@
+"""
+Local candle history: one fixed-width binary file per (provider, instrument, bar).
+
+Each candle is a 48-byte little-endian record (ts ms as int64, then open,
+high, low, close, volume as float64) and records are kept sorted by ts.
+Files are memory-mapped, so a range query is two binary searches over the
+mapping and returns a view of the records without parsing the rest of the
+history into Python objects.
+
+Two sidecar files sit next to a store: `<name>.bin.pending` holds pages
+staged by a backfill until one compaction folds them in, and
+`<name>.bin.fetched.json` lists the time windows already fetched (empty
+pages included), so a rerun only asks the provider for what it never saw.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+STORE_DIR = os.path.join(os.path.dirname(__file__), 'candles')
+
+RECORD = struct.Struct('<q5d')  # ts, open, high, low, close, volume
+FIELDS = ('ts', 'open', 'high', 'low', 'close', 'volume')
+DTYPE = np.dtype([(f, '<i8' if f == 'ts' else '<f8') for f in FIELDS]) if np is not None else None
+
+BAR_MS = {
+    '1m': 60_000, '5m': 300_000, '15m': 900_000,
+    '1H': 3_600_000, '4H': 14_400_000, '1D': 86_400_000,
+}
+
+
+def store_path(provider: str, inst_id: str, bar: str, root: str = STORE_DIR) -> str:
+    name = re.sub(r'[^A-Za-z0-9_-]+', '_', f'{provider}_{inst_id}_{bar}')
+    return os.path.join(root, name + '.bin')
+
+
+def _record(r: Dict[str, Any]) -> tuple:
+    return (int(r['ts']), float(r['open']), float(r['high']), float(r['low']),
+            float(r['close']), float(r['volume']))
+
+
+def _pack(rows: Sequence[Dict[str, Any]]) -> bytes:
+    pack = RECORD.pack
+    return b''.join(pack(*_record(r)) for r in rows)
+
+
+class CandleView:
+    """A contiguous run of records backed by the store's memory map."""
+
+    def __init__(self, buf: memoryview):
+        self._buf = buf
+
+    def __len__(self) -> int:
+        return len(self._buf) // RECORD.size
+
+    def array(self):
+        """Zero-copy NumPy structured array over the records (requires NumPy)."""
+        if np is None:
+            raise RuntimeError('numpy is not installed')
+        return np.frombuffer(self._buf, dtype=DTYPE)
+
+    def records(self):
+        """Structured array when NumPy is installed, otherwise a tuple iterator."""
+        return self.array() if np is not None else self.tuples()
+
+    def tuples(self) -> Iterator[tuple]:
+        return RECORD.iter_unpack(self._buf)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Materialize as the same list of dicts that `Api.fetch_ohlc` returns."""
+        return [dict(zip(FIELDS, t)) for t in RECORD.iter_unpack(self._buf)]
+
+    def release(self) -> None:
+        self._buf.release()
+
+
+class CandleStore:
+    """Sorted, de-duplicated candle records for one series on disk.
+
+    Appending newer candles is an in-place append and replacing stored
+    candles is an in-place write. Merging older or overlapping pages rewrites
+    the file to a temp name and swaps it in, splicing only the affected
+    range; a backfill stages its pages and compacts once instead. Views
+    returned by `range` must be released before a rewrite on Windows, where
+    a mapped file cannot be replaced.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+
+    @classmethod
+    def open(cls, provider: str, inst_id: str, bar: str, root: str = STORE_DIR) -> 'CandleStore':
+        return cls(store_path(provider, inst_id, bar, root))
+
+    # -- mapping -----------------------------------------------------------
+    def _mapped(self) -> Optional[mmap.mmap]:
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if self._map is not None and len(self._map) == size:
+            return self._map
+        self.close()
+        if size < RECORD.size:
+            return None
+        self._file = open(self.path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                try:
+                    self._map.close()
+                except BufferError:
+                    # a CandleView still exports the buffer; let GC reclaim the map
+                    pass
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            m = self._mapped()
+            return len(m) // RECORD.size if m is not None else 0
+
+    def _ts_at(self, m: mmap.mmap, i: int) -> int:
+        return struct.unpack_from('<q', m, i * RECORD.size)[0]
+
+    def _bisect(self, m: mmap.mmap, ts: int) -> int:
+        """Index of the first record with record.ts >= ts."""
+        lo, hi = 0, len(m) // RECORD.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ts_at(m, mid) < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def bounds(self) -> Optional[tuple]:
+        """(first_ts, last_ts) or None when the store is empty."""
+        with self._lock:
+            m = self._mapped()
+            if m is None:
+                return None
+            return self._ts_at(m, 0), self._ts_at(m, len(m) // RECORD.size - 1)
+
+    def count(self, start_ts: int, end_ts: int) -> int:
+        """Number of records with start_ts <= ts < end_ts."""
+        with self._lock:
+            m = self._mapped()
+            if m is None:
+                return 0
+            return max(0, self._bisect(m, end_ts) - self._bisect(m, start_ts))
+
+    def range(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> CandleView:
+        """View of records with start_ts <= ts < end_ts (either bound optional)."""
+        with self._lock:
+            m = self._mapped()
+            if m is None:
+                return CandleView(memoryview(b''))
+            n = len(m) // RECORD.size
+            lo = self._bisect(m, start_ts) if start_ts is not None else 0
+            hi = self._bisect(m, end_ts) if end_ts is not None else n
+            return CandleView(memoryview(m)[lo * RECORD.size:max(lo, hi) * RECORD.size])
+
+    # -- writing -----------------------------------------------------------
+    def merge(self, rows: Sequence[Dict[str, Any]]) -> int:
+        """Insert candles (any order); rows whose ts is already stored replace it.
+
+        Returns the number of new timestamps added.
+        """
+        if not rows:
+            return 0
+        incoming = {int(r['ts']): _record(r) for r in rows}
+        ordered = [incoming[t] for t in sorted(incoming)]
+        data = b''.join(RECORD.pack(*r) for r in ordered)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            bounds = self.bounds()
+            if bounds is None or ordered[0][0] > bounds[1]:
+                with open(self.path, 'ab') as f:
+                    f.write(data)
+                return len(ordered)
+
+            m = self._mapped()
+            lo = self._bisect(m, ordered[0][0]) * RECORD.size
+            hi = self._bisect(m, ordered[-1][0] + 1) * RECORD.size
+            # only the stored records inside the incoming ts span take part
+            existing = {t[0]: t for t in RECORD.iter_unpack(m[lo:hi])}
+            added = sum(1 for t in incoming if t not in existing)
+            if not added and len(existing) == len(incoming):
+                # same timestamps, new values: overwrite the span in place
+                self.close()
+                with open(self.path, 'r+b') as f:
+                    f.seek(lo)
+                    f.write(data)
+                return 0
+            existing.update(incoming)
+            mid = b''.join(RECORD.pack(*existing[t]) for t in sorted(existing))
+            self._rewrite([m[:lo], mid, m[hi:]])
+            return added
+
+    @property
+    def pending_path(self) -> str:
+        return self.path + '.pending'
+
+    def stage(self, rows: Sequence[Dict[str, Any]]) -> None:
+        """Append candles to the pending sidecar; `compact` folds them into the store.
+
+        Staging is a plain append whatever the order of the pages, so a
+        backfill paging backward costs one rewrite in total instead of one
+        per page. Staged candles are not visible to `range` until then.
+        """
+        if not rows:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.pending_path, 'ab') as f:
+                f.write(_pack(rows))
+
+    def compact(self) -> int:
+        """Merge the staged candles into the store in one pass; returns the new timestamps added.
+
+        Stored records between staged ones are copied as whole byte runs.
+        """
+        with self._lock:
+            try:
+                with open(self.pending_path, 'rb') as f:
+                    raw = f.read()
+            except FileNotFoundError:
+                return 0
+            raw = raw[:len(raw) - len(raw) % RECORD.size]
+            staged = {t[0]: t for t in RECORD.iter_unpack(raw)}  # later pages win
+            if not staged:
+                os.remove(self.pending_path)
+                return 0
+            m = self._mapped()
+            if m is None:
+                parts, added = [b''.join(RECORD.pack(*staged[t]) for t in sorted(staged))], len(staged)
+            else:
+                n = len(m) // RECORD.size
+                parts, added, pos = [], 0, 0
+                for ts in sorted(staged):
+                    i = self._bisect(m, ts)
+                    if i > pos:
+                        parts.append(m[pos * RECORD.size:i * RECORD.size])
+                    parts.append(RECORD.pack(*staged[ts]))
+                    if i < n and self._ts_at(m, i) == ts:
+                        pos = i + 1  # replaced
+                    else:
+                        pos = i
+                        added += 1
+                parts.append(m[pos * RECORD.size:])
+            self._rewrite(parts)
+            os.remove(self.pending_path)
+            return added
+
+    # -- fetched windows ---------------------------------------------------
+    @property
+    def fetched_path(self) -> str:
+        return self.path + '.fetched.json'
+
+    def fetched(self) -> List[Tuple[int, int]]:
+        """Sorted, non-overlapping [start, end) windows already fetched from the provider."""
+        try:
+            with open(self.fetched_path, 'r', encoding='utf-8') as f:
+                return [(int(a), int(b)) for a, b in json.load(f)]
+        except (OSError, ValueError, TypeError):
+            return []
+
+    def mark_fetched(self, windows: Sequence[Tuple[int, int]]) -> None:
+        """Record windows as fetched (whether or not the provider had candles in them)."""
+        with self._lock:
+            spans = sorted(self.fetched() + [(int(a), int(b)) for a, b in windows if b > a])
+            merged: List[List[int]] = []
+            for a, b in spans:
+                if merged and a <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], b)
+                else:
+                    merged.append([a, b])
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp = self.fetched_path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(merged, f)
+            os.replace(tmp, self.fetched_path)
+
+    def gaps(self, start_ts: int, end_ts: int) -> List[Tuple[int, int]]:
+        """Parts of [start_ts, end_ts) not covered by a fetched window, oldest first."""
+        out, pos = [], start_ts
+        for a, b in self.fetched():
+            if b <= pos:
+                continue
+            if a >= end_ts:
+                break
+            if a > pos:
+                out.append((pos, a))
+            pos = max(pos, b)
+        if pos < end_ts:
+            out.append((pos, end_ts))
+        return out
+
+    def _rewrite(self, parts: Sequence[bytes]) -> None:
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            for part in parts:
+                f.write(part)
+            f.flush()
+            os.fsync(f.fileno())
+        self.close()
+        os.replace(tmp, self.path)
@@ -0,0 +1,182 @@
+"""
+Record/replay of HTTP traffic for offline runs and repeatable timings.
+
+In record mode every request that goes through the cassette is performed
+for real and appended to the cassette file as one JSON line: method, url,
+a hash of the request body, status, response text and elapsed time (a
+streamed chat answer also keeps each delta with its offset). Files ending
+in `.gz` are gzip-compressed; each line is flushed as it is written, so a
+recording cut short by a crash still replays up to its last request.
+
+In replay mode nothing touches the network: responses are served from the
+file in the order they were recorded for the same request, after sleeping
+the recorded latency multiplied by `scale` (0 = as fast as possible).
+A request that was never recorded raises `CassetteMiss`, a `URLError`, so
+callers see it like an unreachable host.
+
+The app picks a cassette up from the environment:
+
+  NIGHT_CASSETTE=run.jsonl.gz NIGHT_CASSETTE_MODE=record python night_claim_management.py batch run sweep
+  NIGHT_CASSETTE=run.jsonl.gz NIGHT_CASSETTE_MODE=replay NIGHT_CASSETTE_SCALE=1 python night_claim_management.py batch run sweep
+"""
+from __future__ import annotations
+
+import atexit
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.error import HTTPError, URLError
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+
+class CassetteMiss(URLError):
+    pass
+
+
+def _body_hash(body: Optional[bytes]) -> str:
+    return hashlib.sha1(body).hexdigest()[:12] if body else ''
+
+
+def _open(path: str, mode: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = REPLAY, scale: float = 1.0):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f'unknown cassette mode: {mode}')
+        self.path = path
+        self.mode = mode
+        self.scale = max(0.0, float(scale))
+        self._lock = threading.Lock()
+        # (method, url, body hash) -> recorded entries, and the next one to serve
+        self._tracks: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+        self._cursor: Dict[Tuple[str, str, str], int] = {}
+        self.stats = {'recorded': 0, 'replayed': 0, 'missed': 0}
+        self._fh = None
+        if mode == REPLAY:
+            self._load()
+
+    @classmethod
+    def from_env(cls) -> Optional['Cassette']:
+        path = os.environ.get('NIGHT_CASSETTE')
+        if not path:
+            return None
+        return cls(path, os.environ.get('NIGHT_CASSETTE_MODE', REPLAY),
+                   float(os.environ.get('NIGHT_CASSETTE_SCALE', '1') or 1))
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f'cassette not found: {self.path}')
+        with _open(self.path, 'r') as f:
+            try:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    for key in ((entry['m'], entry['u'], entry.get('b', '')), (entry['m'], entry['u'], '*')):
+                        self._tracks.setdefault(key, []).append(entry)
+            except EOFError:
+                pass  # recording was not closed; everything flushed before that is usable
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._fh is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._fh = _open(self.path, 'a')
+                atexit.register(self.close)
+            self._fh.write(line)
+            self._fh.flush()
+            self.stats['recorded'] += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def _next(self, method: str, url: str, body: Optional[bytes]) -> Dict[str, Any]:
+        """Next recorded entry for the request; falls back to any body for the same url
+        (chat prompts embed context that differs from run to run)."""
+        with self._lock:
+            for key in ((method, url, _body_hash(body)), (method, url, '*')):
+                track = self._tracks.get(key)
+                if track:
+                    i = self._cursor.get(key, 0)
+                    self._cursor[key] = i + 1
+                    self.stats['replayed'] += 1
+                    return track[i % len(track)]
+            self.stats['missed'] += 1
+        raise CassetteMiss(f'not in cassette: {method} {url}')
+
+    def _wait(self, seconds: float) -> None:
+        if self.scale and seconds > 0:
+            time.sleep(seconds * self.scale)
+
+    def fetch(self, method: str, url: str, send: Callable[[], str], body: Optional[bytes] = None) -> str:
+        """Response text of the request; `send()` performs it for real (record mode only)."""
+        if self.mode == REPLAY:
+            entry = self._next(method, url, body)
+            self._wait(entry.get('ms', 0) / 1000)
+            if entry.get('err'):
+                raise URLError(entry['err'])
+            if entry.get('s', 200) >= 400:
+                raise HTTPError(url, entry['s'], entry.get('r') or 'error', None,
+                                io.BytesIO((entry.get('t') or '').encode('utf-8')))
+            return entry.get('t') or ''
+
+        entry: Dict[str, Any] = {'m': method, 'u': url, 'b': _body_hash(body)}
+        started = time.perf_counter()
+        try:
+            text = send()
+            entry.update(s=200, t=text)
+            return text
+        except HTTPError as e:
+            text = e.read().decode('utf-8', errors='ignore')
+            entry.update(s=e.code, r=str(e.reason), t=text)
+            raise HTTPError(e.url, e.code, e.reason, e.headers, io.BytesIO(text.encode('utf-8')))
+        except URLError as e:
+            entry['err'] = str(e.reason)
+            raise
+        except Exception as e:
+            entry['err'] = str(e) or type(e).__name__
+            raise
+        finally:
+            entry['ms'] = round((time.perf_counter() - started) * 1000, 1)
+            self._append(entry)
+
+    def stream(self, method: str, url: str, run: Callable[[Callable[[str], None]], Dict[str, Any]],
+               on_delta: Callable[[str], None], body: Optional[bytes] = None) -> Dict[str, Any]:
+        """A streamed exchange: `run(on_delta)` performs it for real and returns its result;
+        replay re-emits the recorded deltas at their recorded offsets."""
+        if self.mode == REPLAY:
+            entry = self._next(method, url, body)
+            started = time.perf_counter()
+            for offset_ms, text in entry.get('d', []):
+                self._wait(offset_ms / 1000 - (time.perf_counter() - started) / (self.scale or 1))
+                on_delta(text)
+            self._wait(entry.get('ms', 0) / 1000 - (time.perf_counter() - started) / (self.scale or 1))
+            return dict(entry.get('res') or {})
+
+        deltas: List[list] = []
+        started = time.perf_counter()
+
+        def capture(text: str) -> None:
+            deltas.append([round((time.perf_counter() - started) * 1000, 1), text])
+            on_delta(text)
+
+        res = run(capture)
+        self._append({'m': method, 'u': url, 'b': _body_hash(body), 'd': deltas, 'res': res,
+                      'ms': round((time.perf_counter() - started) * 1000, 1)})
+        return res
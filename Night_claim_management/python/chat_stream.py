@@ -0,0 +1,150 @@
+"""
+Streaming chat completions over pooled HTTP connections.
+
+`stream_chat` POSTs an OpenAI-compatible payload with `stream: true` and
+parses the server-sent events as they arrive, handing every content delta
+to a callback. Connections are kept per (scheme, host, port) in a small
+pool, so consecutive questions skip the TCP/TLS handshake. The timeout is
+applied per read, so a slow but steady answer is never cut off.
+"""
+from __future__ import annotations
+
+import http.client
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# idle connections kept per host
+POOL_SIZE = 4
+
+
+class ConnectionPool:
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+
+    def get(self, scheme: str, host: str, port: int, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """An idle connection for the host (reused=True) or a new one."""
+        key = (scheme, host, port)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return cls(host, port, timeout=timeout), False
+
+    def put(self, scheme: str, host: str, port: int, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault((scheme, host, port), [])
+            if len(idle) < self.size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            conns = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+        for c in conns:
+            c.close()
+
+
+_pool = ConnectionPool()
+
+
+def _delta_text(event: Dict[str, Any]) -> str:
+    """Content of one chunk ({choices:[{delta:{content}}]}, or a full message)."""
+    choices = event.get('choices') if isinstance(event, dict) else None
+    if not choices:
+        return ''
+    first = choices[0] or {}
+    part = first.get('delta') or first.get('message') or {}
+    if isinstance(part, dict):
+        return part.get('content') or ''
+    return first.get('text') or ''
+
+
+def stream_chat(endpoint: str, payload: Dict[str, Any], headers: Dict[str, str],
+                on_delta: Callable[[str], None], timeout: float = 30,
+                pool: Optional[ConnectionPool] = None) -> Dict[str, Any]:
+    """Send `payload` with stream=true and call `on_delta(text)` for every content chunk.
+
+    Returns {'reply': full text, 'events': n} or {'error': ...}. A server
+    that ignores `stream` and answers with plain JSON is handled too.
+    """
+    pool = pool or _pool
+    parts = urlsplit(endpoint)
+    scheme = parts.scheme or 'http'
+    port = parts.port or (443 if scheme == 'https' else 80)
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    body = json.dumps(dict(payload, stream=True)).encode('utf-8')
+    hdrs = dict(headers, Accept='text/event-stream')
+
+    for attempt in range(2):
+        conn, reused = pool.get(scheme, parts.hostname, port, timeout)
+        try:
+            conn.request('POST', path, body=body, headers=hdrs)
+            resp = conn.getresponse()
+        except (http.client.HTTPException, OSError) as e:
+            conn.close()
+            if reused and attempt == 0:
+                continue  # the server dropped an idle keep-alive connection
+            return {'error': str(e)}
+        break
+
+    try:
+        if resp.status >= 400:
+            detail = resp.read().decode('utf-8', errors='ignore')[:500]
+            return {'error': f'HTTP {resp.status}: {detail}'}
+        if 'text/event-stream' not in (resp.getheader('Content-Type') or ''):
+            result = json.loads(resp.read().decode('utf-8') or '{}')
+            text = _delta_text(result)
+            if text:
+                on_delta(text)
+            return {'reply': text or json.dumps(result), 'events': 0, 'raw': result}
+
+        chunks: List[str] = []
+        events = 0
+        data: List[str] = []
+        while True:
+            line = resp.readline()
+            if not line:
+                break
+            line = line.decode('utf-8', errors='ignore').rstrip('\r\n')
+            if line.startswith('data:'):
+                data.append(line[5:].lstrip())
+                continue
+            if line or not data:
+                continue  # comments, event:/id: fields, keep-alive blank lines
+            # a blank line ends the event
+            raw, data = '\n'.join(data), []
+            if raw == '[DONE]':
+                break
+            try:
+                event = json.loads(raw)
+            except ValueError:
+                continue
+            events += 1
+            if isinstance(event, dict) and event.get('error'):
+                return {'error': str(event['error']), 'reply': ''.join(chunks)}
+            text = _delta_text(event)
+            if text:
+                chunks.append(text)
+                on_delta(text)
+        resp.read()  # drain what follows [DONE] so the connection can be reused
+        return {'reply': ''.join(chunks), 'events': events}
+    except (http.client.HTTPException, OSError, ValueError) as e:
+        conn.close()
+        return {'error': str(e)}
+    finally:
+        # only a fully read keep-alive response leaves the connection reusable
+        if resp.isclosed() and not resp.will_close and conn.sock is not None:
+            pool.put(scheme, parts.hostname, port, conn)
+        else:
+            conn.close()
@@ -0,0 +1,152 @@
+"""
+Bounded context for the AI assistant.
+
+Results the UI has shown (schedule checks, change reports, candle series)
+are summarized when they are recorded, so the store never holds raw
+payloads: a schedule becomes totals plus the next unlock, a candle series
+becomes recent stats plus a handful of closes. Entries live in a ring
+buffer keyed by (kind, key); re-recording a key moves it to the front and
+the oldest entries fall off once `max_entries` is reached.
+
+`render()` packs the most relevant summaries (entries mentioned in the
+question first, then newest first) into a text block that fits a token
+budget, estimated at ~4 characters per token.
+"""
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+CHARS_PER_TOKEN = 4
+# closes kept per candle summary
+CANDLE_POINTS = 8
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _num(v: Any) -> float:
+    return round(float(v), 8)
+
+
+def _iso(ts_ms: Any) -> Optional[str]:
+    try:
+        return datetime.fromtimestamp(int(ts_ms) / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M')
+    except Exception:
+        return None
+
+
+def summarize_schedule(address: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Totals and the next unlock of a `check_address` result."""
+    if not isinstance(result, dict) or result.get('error'):
+        return {'address': address, 'error': (result or {}).get('error', 'no result')}
+    thaws = result.get('thaws') or []
+    upcoming = [t for t in thaws if t.get('status') == 'Unclaimed' and t.get('thaw_date')]
+    upcoming.sort(key=lambda t: t['thaw_date'])
+    nxt = upcoming[0] if upcoming else None
+    return {
+        'address': address,
+        'total_night': round(float(result.get('total_amount') or 0.0), 3),
+        'total_usd': result.get('total_usd'),
+        'price': result.get('price'),
+        'thaws': len(thaws),
+        'unclaimed': len(upcoming),
+        'unclaimed_night': round(sum(float(t.get('amount') or 0.0) for t in upcoming), 3),
+        'next_unlock': {'date': nxt['thaw_date'][:10], 'night': round(float(nxt.get('amount') or 0.0), 3),
+                        'days': nxt.get('days_until')} if nxt else None,
+    }
+
+
+def summarize_candles(inst_id: str, bar: str, rows: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Recent stats of a candle series plus CANDLE_POINTS evenly spaced closes."""
+    rows = [r for r in rows or [] if isinstance(r, dict)]
+    if not rows:
+        return {'inst': inst_id, 'bar': bar, 'candles': 0}
+    first, last = rows[0], rows[-1]
+    highs = [float(r['high']) for r in rows]
+    lows = [float(r['low']) for r in rows]
+    step = max(1, len(rows) // CANDLE_POINTS)
+    picked = rows[::-1][::step][:CANDLE_POINTS][::-1]
+    open_ = float(first['open'])
+    return {
+        'inst': inst_id, 'bar': bar, 'candles': len(rows),
+        'from': _iso(first['ts']), 'to': _iso(last['ts']),
+        'last': _num(last['close']), 'high': _num(max(highs)), 'low': _num(min(lows)),
+        'change_pct': round((float(last['close']) / open_ - 1) * 100, 2) if open_ else None,
+        'avg_volume': round(sum(float(r.get('volume') or 0.0) for r in rows) / len(rows), 3),
+        'closes': [[_iso(r['ts']), _num(r['close'])] for r in picked],
+    }
+
+
+def summarize_changes(report: Dict[str, Any], limit: int = 10) -> Dict[str, Any]:
+    """Shortened `diff_addresses` report: at most `limit` changed addresses."""
+    changed = report.get('changed') or []
+    return {
+        'changed': [{'address': c['address'], 'new': c.get('new'),
+                     'changes': [f"{x['thaw']}: {x['from']} -> {x['to']}" for x in c.get('changes', [])[:5]]}
+                    for c in changed[:limit]],
+        'more_changed': max(0, len(changed) - limit),
+        'unchanged': report.get('unchanged', 0),
+        'errors': len(report.get('errors') or []),
+    }
+
+
+class ContextStore:
+    def __init__(self, max_entries: int = 64, token_budget: int = 1500):
+        self.max_entries = max_entries
+        self.token_budget = token_budget
+        self._lock = threading.Lock()
+        # (kind, key) -> (recorded at, summary, serialized summary)
+        self._entries: 'OrderedDict[tuple, tuple]' = OrderedDict()
+
+    def put(self, kind: str, key: str, summary: Dict[str, Any]) -> None:
+        text = json.dumps(summary, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._entries.pop((kind, key), None)
+            self._entries[(kind, key)] = (time.time(), summary, text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_schedule(self, address: str, result: Dict[str, Any]) -> None:
+        self.put('schedule', address, summarize_schedule(address, result))
+
+    def record_candles(self, inst_id: str, bar: str, rows: Sequence[Dict[str, Any]]) -> None:
+        self.put('candles', f'{inst_id} {bar}', summarize_candles(inst_id, bar, rows))
+
+    def record_changes(self, report: Dict[str, Any]) -> None:
+        self.put('changes', 'saved addresses', summarize_changes(report))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{'kind': k[0], 'key': k[1], 't': v[0], 'summary': v[1]} for k, v in self._entries.items()]
+
+    def render(self, query: str = '', token_budget: Optional[int] = None) -> str:
+        """Summaries that fit the budget, entries named in `query` first; '' when empty."""
+        budget = token_budget if token_budget is not None else self.token_budget
+        words = set(re.findall(r'[\w-]+', (query or '').lower()))
+        with self._lock:
+            items = list(self._entries.items())
+        newest_first = items[::-1]
+        mentioned = [it for it in newest_first if it[0][1].split(' ')[0].lower() in words]
+        ranked = mentioned + [it for it in newest_first if it not in mentioned]
+        header = 'Recent data from the NIGHT app (summaries, most relevant first):'
+        lines: List[str] = []
+        used = estimate_tokens(header)
+        for (kind, key), (_, _, text) in ranked:
+            line = f'[{kind}] {key}: {text}'
+            cost = estimate_tokens(line)
+            if used + cost > budget:
+                continue  # a smaller entry further down may still fit
+            lines.append(line)
+            used += cost
+        return '\n'.join([header] + lines) if lines else ''
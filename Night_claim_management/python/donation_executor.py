@@ -0,0 +1,357 @@
+"""
+Pipelined batch donations against the Scavenger (defensio) API.
+
+Python counterpart of `Execute-BatchAddresses` in
+solution_donation/v1.3/solution_transfer_manual_gui_v3.ps1: for every
+original address it looks up the statistics, signs the assignment message
+with cardano-signer and POSTs `donate_to`. Each step runs in its own pool,
+so while one address is being signed the next one's statistics are already
+in flight and a third one is being posted; the HTTP stages share a rate
+limiter instead of fixed sleeps.
+
+Every address moves through an explicit state machine and each transition
+is appended to a JSONL journal. A restarted batch skips addresses that
+already finished, and a failed address can be retried on its own.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+API_BASE = 'https://mine.defensio.io/api'
+JOURNAL_DIR = os.path.join(os.path.dirname(__file__), 'donations')
+MESSAGE = 'Assign accumulated Scavenger rights to: {destination}'
+
+PENDING = 'pending'
+STATS = 'stats'
+SIGNING = 'signing'
+POSTING = 'posting'
+DONE = 'done'
+CONFLICT = 'conflict'                # 409: already donating to this destination
+NOT_FOUND = 'not_found'              # 404: wallet not registered
+SIGNATURE_ERROR = 'signature_error'  # 400 or cardano-signer failure
+FAILED = 'failed'                    # network / unexpected; retryable
+
+TRANSITIONS = {
+    PENDING: {STATS},
+    STATS: {SIGNING, FAILED},
+    SIGNING: {POSTING, SIGNATURE_ERROR, FAILED},
+    POSTING: {DONE, CONFLICT, NOT_FOUND, SIGNATURE_ERROR, FAILED},
+}
+# states a restarted batch does not redo
+FINISHED = {DONE, CONFLICT, NOT_FOUND}
+TERMINAL = FINISHED | {SIGNATURE_ERROR, FAILED}
+
+
+def journal_path(destination: str, root: str = JOURNAL_DIR) -> str:
+    return os.path.join(root, re.sub(r'[^A-Za-z0-9_-]+', '_', destination) + '.jsonl')
+
+
+def confirm_token(destination: str, addresses: Iterable[str]) -> str:
+    """Token a confirmed preview hands back to start exactly that batch."""
+    key = json.dumps([destination, sorted(set(addresses))])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def http_json(method: str, url: str, timeout: float = 15) -> Dict[str, Any]:
+    """Send a request and return the JSON body; HTTP errors return their JSON body
+    (with 'statusCode' filled in) instead of raising."""
+    req = Request(url, method=method, headers={'User-Agent': 'night-webview/1.0'})
+    try:
+        with urlopen(req, timeout=timeout) as r:
+            return json.loads(r.read().decode('utf-8', errors='ignore') or '{}')
+    except HTTPError as e:
+        try:
+            body = json.loads(e.read().decode('utf-8', errors='ignore') or '{}')
+        except ValueError:
+            body = {}
+        if not isinstance(body, dict):
+            body = {'body': body}
+        body.setdefault('statusCode', e.code)
+        body.setdefault('message', str(e))
+        return body
+
+
+def cardano_signer_sign(original: str, destination: str, skey_path: str) -> str:
+    """CIP-30 signature of the assignment message via cardano-signer (COSE_Sign1 hex)."""
+    exe = shutil.which('cardano-signer') or shutil.which('cardano-signer.exe')
+    local = os.path.join(os.getcwd(), 'cardano-signer.exe')
+    if os.path.exists(local):
+        exe = local
+    if not exe:
+        raise RuntimeError('Cannot find cardano-signer')
+    args = [exe, 'sign', '--cip30', '--data', MESSAGE.format(destination=destination),
+            '--secret-key', skey_path, '--address', original, '--json-extended']
+    proc = subprocess.run(args, capture_output=True, text=True, timeout=60)
+    if proc.returncode != 0:
+        raise RuntimeError((proc.stderr or proc.stdout).strip() or 'cardano-signer returned error')
+    return json.loads(proc.stdout)['output']['COSE_Sign1_hex']
+
+
+class DonationItem:
+    def __init__(self, address: str, skey: str):
+        self.address = address
+        self.skey = skey
+        self.state = PENDING
+        self.solutions: Optional[int] = None
+        self.signature: Optional[str] = None
+        self.error: Optional[str] = None
+        self.response: Optional[Dict[str, Any]] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'address': self.address, 'state': self.state, 'solutions': self.solutions,
+                'error': self.error, 'response': self.response}
+
+
+class DonationExecutor:
+    """Runs donations from many original addresses to one destination.
+
+    `signer(original, destination, skey_path)` returns the signature hex
+    and `limiter` (anything with `acquire()`) throttles the HTTP stages;
+    both can be swapped, together with `api_base`, to run against a local
+    stand-in server.
+    """
+
+    def __init__(self, destination: str, journal_path: str, api_base: str = API_BASE,
+                 signer: Callable[[str, str, str], str] = cardano_signer_sign, limiter=None,
+                 http_workers: int = 4, sign_workers: int = 2, timeout: float = 15):
+        self.destination = destination
+        self.journal_path = journal_path
+        self.api_base = api_base.rstrip('/')
+        self.signer = signer
+        self.limiter = limiter
+        self.http_workers = max(1, http_workers)
+        self.sign_workers = max(1, sign_workers)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._items: Dict[str, DonationItem] = {}
+
+    # -- journal -------------------------------------------------------------
+    def journal(self) -> Dict[str, Dict[str, Any]]:
+        """Last journaled record per address."""
+        out: Dict[str, Dict[str, Any]] = {}
+        if not os.path.exists(self.journal_path):
+            return out
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if rec.get('dest') == self.destination:
+                    out[rec['a']] = rec
+        return out
+
+    def _record(self, item: DonationItem) -> None:
+        # caller holds self._lock
+        rec = {'a': item.address, 'dest': self.destination, 's': item.state, 't': time.time()}
+        if self.api_base != API_BASE:
+            rec['api'] = self.api_base  # a retry must go to the same (stand-in) server
+        if item.solutions is not None:
+            rec['sol'] = item.solutions
+        if item.error:
+            rec['e'] = item.error
+        if item.state in TERMINAL and item.response is not None:
+            rec['resp'] = item.response
+        os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(rec, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def _move(self, item: DonationItem, state: str, on_update=None) -> None:
+        with self._lock:
+            if state not in TRANSITIONS.get(item.state, ()):
+                raise RuntimeError(f'invalid transition {item.state} -> {state} for {item.address}')
+            item.state = state
+            self._record(item)
+        self._notify(item, on_update)
+
+    def _fail(self, item: DonationItem, error: str, on_update=None) -> None:
+        """Force `item` to FAILED after the pipeline itself broke (journal write,
+        invalid transition); journaling is best effort here."""
+        with self._lock:
+            item.state = FAILED
+            item.error = error
+            try:
+                self._record(item)
+            except OSError:
+                pass
+        self._notify(item, on_update)
+
+    @staticmethod
+    def _notify(item: DonationItem, on_update=None) -> None:
+        if on_update:
+            try:
+                on_update(item.as_dict())
+            except Exception:
+                pass
+
+    # -- stages --------------------------------------------------------------
+    def _http(self, method: str, path: str) -> Dict[str, Any]:
+        if self.limiter is not None:
+            self.limiter.acquire()
+        return http_json(method, self.api_base + path, timeout=self.timeout)
+
+    def solutions(self, address: str) -> int:
+        """Solutions (crypto receipts) the statistics endpoint reports for `address`."""
+        res = self._http('GET', f'/statistics/{quote(address)}')
+        local = res.get('local') if isinstance(res, dict) else None
+        return int(local.get('crypto_receipts', 0)) if isinstance(local, dict) else 0
+
+    def _stats(self, item: DonationItem) -> str:
+        try:
+            item.solutions = self.solutions(item.address)
+            return SIGNING
+        except Exception as e:
+            item.error = f'statistics: {e}'
+            return FAILED
+
+    def _sign(self, item: DonationItem) -> str:
+        try:
+            item.signature = self.signer(item.address, self.destination, item.skey)
+            if not item.signature:
+                raise RuntimeError('empty signature')
+            return POSTING
+        except Exception as e:
+            item.error = f'signature: {e}'
+            return SIGNATURE_ERROR
+
+    def _post(self, item: DonationItem) -> str:
+        try:
+            res = self._http('POST', f'/donate_to/{quote(self.destination)}/{quote(item.address)}/{item.signature}')
+        except Exception as e:
+            item.error = f'donate: {e}'
+            return FAILED
+        item.response = res if isinstance(res, dict) else {'body': res}
+        if item.response.get('status') == 'success':
+            return DONE
+        code = item.response.get('statusCode')
+        item.error = str(item.response.get('message') or f'HTTP {code}')
+        return {409: CONFLICT, 404: NOT_FOUND, 400: SIGNATURE_ERROR}.get(code, FAILED)
+
+    # -- driver --------------------------------------------------------------
+    def preview(self, addresses: Iterable[str]) -> Dict[str, Any]:
+        """Statistics of a batch before anything is signed: solutions per address,
+        the total, and the `confirm` token that starts this exact batch (the
+        confirmation step of Execute-BatchAddresses)."""
+        addresses = list(dict.fromkeys(a for a in addresses if a))
+
+        def one(address: str) -> Dict[str, Any]:
+            try:
+                return {'address': address, 'solutions': self.solutions(address)}
+            except Exception as e:
+                return {'address': address, 'solutions': None, 'error': f'statistics: {e}'}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.http_workers, len(addresses) or 1))) as ex:
+            rows = list(ex.map(one, addresses))
+        return {'destination': self.destination, 'count': len(rows),
+                'total_solutions': sum(r['solutions'] or 0 for r in rows), 'addresses': rows,
+                'confirm': confirm_token(self.destination, addresses)}
+
+    def run(self, items: Iterable[Dict[str, str]], stop: Optional[threading.Event] = None,
+            on_update: Optional[Callable[[Dict[str, Any]], None]] = None, redo: bool = False) -> Dict[str, Any]:
+        """Donate from every {'address', 'skey'} item and block until all are finished.
+
+        Addresses already journaled as done/conflict/not_found are skipped
+        unless `redo` is set. Setting `stop` lets in-flight addresses finish
+        their current stage and leaves the rest pending.
+        """
+        previous = {} if redo else self.journal()
+        todo: List[DonationItem] = []
+        skipped = 0
+        for it in items:
+            addr = (it.get('address') or '').strip()
+            if not addr:
+                continue
+            if previous.get(addr, {}).get('s') in FINISHED:
+                skipped += 1
+                continue
+            item = DonationItem(addr, it.get('skey') or '')
+            with self._lock:
+                self._items[addr] = item
+            todo.append(item)
+
+        remaining = [len(todo)]
+        all_done = threading.Event()
+        if not todo:
+            all_done.set()
+        pools = {
+            STATS: ThreadPoolExecutor(max_workers=self.http_workers),
+            SIGNING: ThreadPoolExecutor(max_workers=self.sign_workers),
+            POSTING: ThreadPoolExecutor(max_workers=self.http_workers),
+        }
+        stage_fn = {STATS: self._stats, SIGNING: self._sign, POSTING: self._post}
+
+        def finish():
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    all_done.set()
+
+        def submit(item: DonationItem, stage: str) -> None:
+            def task():
+                if stage == STATS:
+                    if stop is not None and stop.is_set():
+                        return None  # not started: stays pending
+                    self._move(item, STATS, on_update)
+                return stage_fn[stage](item)
+
+            def advance(fut):
+                # whatever happens here, a terminal item must reach finish() or run() never returns
+                done = True
+                try:
+                    try:
+                        nxt = fut.result()
+                    except Exception as e:
+                        item.error = str(e)
+                        nxt = FAILED
+                    if nxt is None:
+                        return
+                    self._move(item, nxt, on_update)
+                    if nxt not in TERMINAL:
+                        submit(item, nxt)
+                        done = False
+                except Exception as e:
+                    self._fail(item, f'pipeline: {e}', on_update)
+                finally:
+                    if done:
+                        finish()
+
+            pools[stage].submit(task).add_done_callback(advance)
+
+        try:
+            for item in todo:
+                submit(item, STATS)
+            all_done.wait()
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+
+        counts: Dict[str, int] = {}
+        for item in todo:
+            counts[item.state] = counts.get(item.state, 0) + 1
+        return {'destination': self.destination, 'total': len(todo), 'skipped': skipped,
+                'states': counts, 'stopped': bool(stop and stop.is_set())}
+
+    def retry(self, address: str, skey: str, on_update=None) -> Dict[str, Any]:
+        """Run one address through the whole pipeline again, whatever its journaled state."""
+        self.run([{'address': address, 'skey': skey}], on_update=on_update, redo=True)
+        return self.status(address)
+
+    def status(self, address: Optional[str] = None) -> Dict[str, Any]:
+        """Live state of the items of this executor (one address, or all of them)."""
+        with self._lock:
+            if address is not None:
+                item = self._items.get(address)
+                return item.as_dict() if item else {'address': address, 'state': None}
+            return {a: i.as_dict() for a, i in self._items.items()}
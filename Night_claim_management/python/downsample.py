@@ -0,0 +1,114 @@
+"""
+Downsampling for wide chart ranges, applied before data crosses the bridge.
+
+- `ohlc_buckets` merges candles into fixed time buckets (first open, max high,
+  min low, last close, summed volume), so wicks and gaps survive the
+  reduction.
+- `lttb` picks the points of a line series that best preserve its shape
+  (Largest-Triangle-Three-Buckets, Steinarsson 2013).
+
+Both use NumPy when it is installed and plain Python otherwise.
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Sequence
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+
+def bucket_width(start_ts: int, end_ts: int, bar_ms: int, max_points: int) -> int:
+    """Smallest multiple of `bar_ms` that splits [start_ts, end_ts) into <= max_points buckets."""
+    span = max(bar_ms, end_ts - start_ts)
+    bars_per_bucket = max(1, math.ceil(span / bar_ms / max(1, max_points)))
+    return bars_per_bucket * bar_ms
+
+
+def ohlc_buckets(records, start_ts: int, width: int) -> List[Dict[str, Any]]:
+    """Aggregate chronological candles into buckets of `width` ms starting at `start_ts`.
+
+    `records` is a NumPy structured array with ts/open/high/low/close/volume
+    fields (e.g. `CandleView.array()`), or an iterable of
+    (ts, open, high, low, close, volume) tuples. Empty buckets are omitted.
+    Each output candle is stamped with its bucket start.
+    """
+    if np is not None and isinstance(records, np.ndarray):
+        if not len(records):
+            return []
+        ids = (records['ts'] - start_ts) // width
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+        ends = np.concatenate((starts[1:], [len(records)])) - 1
+        cols = {
+            'ts': (ids[starts] * width + start_ts).tolist(),
+            'open': records['open'][starts].tolist(),
+            'high': np.maximum.reduceat(records['high'], starts).tolist(),
+            'low': np.minimum.reduceat(records['low'], starts).tolist(),
+            'close': records['close'][ends].tolist(),
+            'volume': np.add.reduceat(records['volume'], starts).tolist(),
+        }
+        keys = list(cols)
+        return [dict(zip(keys, row)) for row in zip(*cols.values())]
+
+    out: List[Dict[str, Any]] = []
+    cur = None
+    cur_id = None
+    for ts, o, h, l, c, v in records:
+        bid = (ts - start_ts) // width
+        if bid != cur_id:
+            cur_id = bid
+            cur = {'ts': bid * width + start_ts, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            out.append(cur)
+        else:
+            if h > cur['high']:
+                cur['high'] = h
+            if l < cur['low']:
+                cur['low'] = l
+            cur['close'] = c
+            cur['volume'] += v
+    return out
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    Always keeps the first and last point; returns every index when the
+    series already has <= threshold points.
+    """
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1]
+
+    every = (n - 2) / (threshold - 2)
+    keep = [0]
+    a = 0
+    if np is not None:
+        x = np.asarray(xs, dtype=float)
+        y = np.asarray(ys, dtype=float)
+    for i in range(threshold - 2):
+        lo = int(math.floor(i * every)) + 1
+        hi = int(math.floor((i + 1) * every)) + 1
+        nxt_lo, nxt_hi = hi, min(int(math.floor((i + 2) * every)) + 1, n)
+        if np is not None:
+            avg_x = x[nxt_lo:nxt_hi].mean()
+            avg_y = y[nxt_lo:nxt_hi].mean()
+            area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+            a = lo + int(area.argmax())
+        else:
+            span = nxt_hi - nxt_lo
+            avg_x = sum(xs[nxt_lo:nxt_hi]) / span
+            avg_y = sum(ys[nxt_lo:nxt_hi]) / span
+            ax, ay = xs[a], ys[a]
+            best, best_area = lo, -1.0
+            for j in range(lo, hi):
+                area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+                if area > best_area:
+                    best, best_area = j, area
+            a = best
+        keep.append(a)
+    keep.append(n - 1)
+    return keep
@@ -0,0 +1,325 @@
+"""
+Technical indicators over the candle series returned by `Api.fetch_ohlc*`.
+
+Columns are computed with NumPy when it is installed and with plain Python
+otherwise. `IndicatorEngine` keeps the running state of every indicator, so
+candles that arrive on a later poll are folded in at O(new bars) instead of
+recomputing the whole history.
+
+Indicator specs are short strings: 'sma:20', 'ema:20', 'rsi:14', 'bb:20:2'
+(Bollinger bands, period and width in std devs) and 'vwap'.
+"""
+from __future__ import annotations
+
+import copy
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+
+def _to_list(arr) -> List[Optional[float]]:
+    """NumPy array (NaN = no value) -> JSON friendly list (None = no value)."""
+    return [None if x != x else x for x in arr.tolist()]
+
+
+class _Indicator(ABC):
+    """Base class: `batch` computes columns for many bars, `step` folds in one bar."""
+
+    columns: List[str] = []
+
+    def batch(self, cols: Dict[str, Sequence[float]]) -> Dict[str, List[Optional[float]]]:
+        out: Dict[str, List[Optional[float]]] = {c: [] for c in self.columns}
+        n = len(cols['close'])
+        for i in range(n):
+            bar = {k: cols[k][i] for k in ('high', 'low', 'close', 'volume')}
+            for name, value in self.step(bar).items():
+                out[name].append(value)
+        return out
+
+    @abstractmethod
+    def step(self, bar: Dict[str, float]) -> Dict[str, Optional[float]]:
+        """Fold in one bar and return its value per column (None = not enough bars yet)."""
+
+
+class SMA(_Indicator):
+    def __init__(self, period: int):
+        self.period = period
+        self.columns = [f'sma_{period}']
+        self._window: deque = deque(maxlen=period)
+        self._sum = 0.0
+
+    def batch(self, cols):
+        if np is None:
+            return super().batch(cols)
+        close = np.asarray(cols['close'], dtype=float)
+        out = np.full(len(close), np.nan)
+        p = self.period
+        if len(close) >= p:
+            csum = np.cumsum(np.concatenate(([0.0], close)))
+            out[p - 1:] = (csum[p:] - csum[:-p]) / p
+        tail = close[-p:].tolist()
+        self._window = deque(tail, maxlen=p)
+        self._sum = float(sum(tail))
+        return {self.columns[0]: _to_list(out)}
+
+    def step(self, bar):
+        c = bar['close']
+        if len(self._window) == self.period:
+            self._sum -= self._window[0]
+        self._window.append(c)
+        self._sum += c
+        value = self._sum / self.period if len(self._window) == self.period else None
+        return {self.columns[0]: value}
+
+
+class EMA(_Indicator):
+    """Exponential moving average seeded with the SMA of the first `period` closes.
+
+    The recursion is inherently sequential, so there is no NumPy batch path.
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.columns = [f'ema_{period}']
+        self._alpha = 2.0 / (period + 1)
+        self._count = 0
+        self._seed = 0.0
+        self._value: Optional[float] = None
+
+    def step(self, bar):
+        c = bar['close']
+        self._count += 1
+        if self._value is None:
+            self._seed += c
+            if self._count == self.period:
+                self._value = self._seed / self.period
+        else:
+            self._value += self._alpha * (c - self._value)
+        return {self.columns[0]: self._value}
+
+
+class RSI(_Indicator):
+    """Relative strength index with Wilder smoothing."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.columns = [f'rsi_{period}']
+        self._prev: Optional[float] = None
+        self._count = 0
+        self._gain = 0.0
+        self._loss = 0.0
+        self._ready = False
+
+    def _value(self) -> float:
+        if self._loss == 0:
+            return 100.0 if self._gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + self._gain / self._loss)
+
+    def step(self, bar):
+        c = bar['close']
+        prev, self._prev = self._prev, c
+        if prev is None:
+            return {self.columns[0]: None}
+        change = c - prev
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        p = self.period
+        if not self._ready:
+            self._count += 1
+            self._gain += gain
+            self._loss += loss
+            if self._count < p:
+                return {self.columns[0]: None}
+            self._gain /= p
+            self._loss /= p
+            self._ready = True
+        else:
+            self._gain = (self._gain * (p - 1) + gain) / p
+            self._loss = (self._loss * (p - 1) + loss) / p
+        return {self.columns[0]: self._value()}
+
+
+class Bollinger(_Indicator):
+    def __init__(self, period: int = 20, width: float = 2.0):
+        self.period = period
+        self.width = width
+        key = f'bb_{period}'
+        self.columns = [f'{key}_upper', f'{key}_mid', f'{key}_lower']
+        self._window: deque = deque(maxlen=period)
+
+    def batch(self, cols):
+        if np is None:
+            return super().batch(cols)
+        close = np.asarray(cols['close'], dtype=float)
+        p = self.period
+        mid = np.full(len(close), np.nan)
+        std = np.full(len(close), np.nan)
+        if len(close) >= p:
+            windows = np.lib.stride_tricks.sliding_window_view(close, p)
+            mid[p - 1:] = windows.mean(axis=1)
+            std[p - 1:] = windows.std(axis=1)
+        self._window = deque(close[-p:].tolist(), maxlen=p)
+        upper, lower = mid + self.width * std, mid - self.width * std
+        return dict(zip(self.columns, (_to_list(upper), _to_list(mid), _to_list(lower))))
+
+    def step(self, bar):
+        self._window.append(bar['close'])
+        if len(self._window) < self.period:
+            return dict.fromkeys(self.columns)
+        # window is a handful of bars, so a two-pass std keeps this exact and O(period)
+        mid = sum(self._window) / self.period
+        std = math.sqrt(sum((x - mid) ** 2 for x in self._window) / self.period)
+        return dict(zip(self.columns, (mid + self.width * std, mid, mid - self.width * std)))
+
+
+class VWAP(_Indicator):
+    """Volume weighted average (typical) price, cumulative over the series."""
+
+    columns = ['vwap']
+
+    def __init__(self):
+        self._pv = 0.0
+        self._vol = 0.0
+
+    def batch(self, cols):
+        if np is None:
+            return super().batch(cols)
+        high = np.asarray(cols['high'], dtype=float)
+        low = np.asarray(cols['low'], dtype=float)
+        close = np.asarray(cols['close'], dtype=float)
+        vol = np.asarray(cols['volume'], dtype=float)
+        pv = np.cumsum((high + low + close) / 3.0 * vol)
+        cv = np.cumsum(vol)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = np.where(cv > 0, pv / np.where(cv > 0, cv, 1.0), np.nan)
+        if len(cv):
+            self._pv, self._vol = float(pv[-1]), float(cv[-1])
+        return {'vwap': _to_list(out)}
+
+    def step(self, bar):
+        self._pv += (bar['high'] + bar['low'] + bar['close']) / 3.0 * bar['volume']
+        self._vol += bar['volume']
+        return {'vwap': self._pv / self._vol if self._vol > 0 else None}
+
+
+def parse_spec(spec: str) -> _Indicator:
+    """Build an indicator from a spec string like 'sma:20' or 'bb:20:2'."""
+    parts = str(spec).strip().lower().split(':')
+    kind, args = parts[0], parts[1:]
+    try:
+        if kind == 'sma':
+            return SMA(int(args[0]) if args else 20)
+        if kind == 'ema':
+            return EMA(int(args[0]) if args else 20)
+        if kind == 'rsi':
+            return RSI(int(args[0]) if args else 14)
+        if kind in ('bb', 'boll', 'bollinger'):
+            return Bollinger(int(args[0]) if args else 20, float(args[1]) if len(args) > 1 else 2.0)
+        if kind == 'vwap':
+            return VWAP()
+    except (ValueError, IndexError):
+        pass
+    raise ValueError(f'unknown indicator spec: {spec}')
+
+
+def _columns(rows: Sequence[Dict[str, Any]]) -> Dict[str, List[float]]:
+    return {k: [float(r[k]) for r in rows] for k in ('high', 'low', 'close', 'volume')}
+
+
+class IndicatorEngine:
+    """Incrementally maintained indicator columns for one candle series.
+
+    Every row except the last is treated as closed and folded into the
+    indicators' running state. The last candle is usually still forming, so
+    it is evaluated on a throwaway copy of that state and re-evaluated on
+    the next update.
+    """
+
+    def __init__(self, specs: Sequence[str], max_history: int = 5000):
+        self.specs = list(specs)
+        self.max_history = max_history
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self._indicators = [parse_spec(s) for s in self.specs]
+        self._ts: List[int] = []
+        self._cols: Dict[str, List[Optional[float]]] = {
+            c: [] for ind in self._indicators for c in ind.columns}
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._cols)
+
+    def _append(self, ts: Sequence[int], values: Dict[str, List[Optional[float]]]) -> None:
+        self._ts.extend(ts)
+        for name, col in values.items():
+            self._cols[name].extend(col)
+        # trim in chunks so the copy cost is amortised over many updates
+        if len(self._ts) > 2 * self.max_history:
+            cut = len(self._ts) - self.max_history
+            del self._ts[:cut]
+            for col in self._cols.values():
+                del col[:cut]
+
+    def update(self, rows: Sequence[Dict[str, Any]]) -> Dict[str, List[Optional[float]]]:
+        """Fold chronological candle rows in and return columns aligned with `rows`.
+
+        Only candles newer than the last closed one are processed. If `rows`
+        does not continue the series seen so far (gap, other instrument,
+        history rewritten, a window starting before the known history) the
+        engine starts over from `rows`.
+        """
+        with self._lock:
+            if not rows:
+                return {c: [] for c in self._cols}
+            closed = rows[:-1]
+            new = closed
+            if self._ts and rows[0]['ts'] < self._ts[0]:
+                # window reaches further back than our history: warm up from `rows`
+                self.reset()
+            if self._ts:
+                # walk back over the closed rows to the last closed candle we know;
+                # the forming last row can never be that candle
+                last = self._ts[-1]
+                i = len(rows) - 2
+                while i >= 0 and rows[i]['ts'] > last:
+                    i -= 1
+                if i >= 0 and rows[i]['ts'] == last:
+                    new = closed[i + 1:]
+                else:
+                    self.reset()
+
+            if not self._ts:
+                cols = _columns(new)
+                batch: Dict[str, List[Optional[float]]] = {}
+                for ind in self._indicators:
+                    batch.update(ind.batch(cols))
+                self._append([r['ts'] for r in new], batch)
+            elif new:
+                stepped: Dict[str, List[Optional[float]]] = {c: [] for c in self._cols}
+                for r in new:
+                    bar = {k: float(r[k]) for k in ('high', 'low', 'close', 'volume')}
+                    for ind in self._indicators:
+                        for name, value in ind.step(bar).items():
+                            stepped[name].append(value)
+                self._append([r['ts'] for r in new], stepped)
+
+            last_bar = {k: float(rows[-1][k]) for k in ('high', 'low', 'close', 'volume')}
+            provisional: Dict[str, Optional[float]] = {}
+            for ind in self._indicators:
+                provisional.update(copy.deepcopy(ind).step(last_bar))
+
+            k = len(closed)
+            out: Dict[str, List[Optional[float]]] = {}
+            for name, col in self._cols.items():
+                head = col[-k:] if k else []
+                # history shorter than the window (trimmed engine): pad the front
+                out[name] = [None] * (k - len(head)) + head + [provisional[name]]
+            return out
@@ -16,76 +16,347 @@ from __future__ import annotations
 import json
 import os
 import sys
+import argparse
 import threading
 import subprocess
 import shutil
+import time
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
 from urllib.request import Request, urlopen
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from urllib.error import URLError, HTTPError
+from urllib.error import HTTPError
 
 try:
     import webview
 except Exception:
     webview = None
 
+from address_import import ImportReport, import_stream, read_source, split_valid, validate_address
+from batch_jobs import BatchJob
+from bulk_results import BulkResults
+from candle_store import BAR_MS, CandleStore
+from cancellation import Generations, Superseded, Ticket
+from cassette import Cassette
+from chat_stream import stream_chat
+from consolidated import ConsolidatedSeries
+from context_store import ContextStore
+from donation_executor import DonationExecutor, confirm_token, journal_path as donation_journal_path
+from downsample import bucket_width, lttb, ohlc_buckets
+from indicators import IndicatorEngine
+from prefetch import PrefetchQueue
+from providers import PROVIDERS, get_provider, to_rows
+from rate_limit import RateLimiter
+from service import NightService, make_server
+from shared_cache import SharedCache
+from snapshots import SnapshotStore
+from ticker_scan import extract_tickers, read_chunks
+from valuation import DAY_MS, ValuationEngine
+from wallet_index import WalletIndex, WalletScanner
+
 DATA_FILE = os.path.join(os.path.dirname(__file__), 'NIGHT_addresses.json')
 
+# folder holding the donation tool's phraseN/ folders (generated wallets)
+PHRASE_ROOT = os.environ.get('NIGHT_PHRASE_ROOT') or os.path.dirname(__file__)
 
-def fetch_json(url: str, timeout: int = 8) -> Any:
-    req = Request(url, headers={'User-Agent': 'night-webview/1.0'})
+# same endpoint the PowerShell checker (check_gui.ps1) uses
+SCHEDULE_URL = 'https://mainnet.prod.gd.midnighttge.io/thaws/{address}/schedule'
+
+# the full OKX ticker list is large; one download serves every check in this window
+PRICE_TTL = 30.0
+
+# candles are refreshed by the chart's 30s poll; anything younger than this is
+# served from memory (pan/zoom redraws, overlay toggles, provider round-trips)
+CANDLE_TTL = 20.0
+
+
+def _cassette_from_env() -> tuple:
+    """(cassette or None, error message or None); a bad NIGHT_CASSETTE must not break the import."""
     try:
-        with urlopen(req, timeout=timeout) as r:
-            raw = r.read()
-            return json.loads(raw.decode('utf-8', errors='ignore'))
-    except HTTPError as e:
-        raise
-    except URLError as e:
-        raise
+        return Cassette.from_env(), None
+    except (OSError, ValueError) as e:
+        return None, f'NIGHT_CASSETTE: {e}'
+
+
+# record/replay of fetch_json and chat_message traffic (see cassette.py); None = live network.
+# When the configured cassette cannot be opened, the entry points below refuse to run
+# and anything else importing this module goes live with a warning.
+CASSETTE, CASSETTE_ERROR = _cassette_from_env()
+if CASSETTE_ERROR and __name__ != '__main__':
+    print(f'warning: {CASSETTE_ERROR}; using the live network', file=sys.stderr)
+
+
+# requests actually sent upstream, per host (reported by the service's /metrics)
+UPSTREAM_CALLS: Dict[str, int] = {}
+_upstream_lock = threading.Lock()
+
+
+def _get_text(url: str, timeout: int, ticket: Optional[Ticket] = None) -> str:
+    if ticket is not None:
+        ticket.check()
+    host = urlsplit(url).hostname or ''
+    with _upstream_lock:
+        UPSTREAM_CALLS[host] = UPSTREAM_CALLS.get(host, 0) + 1
+    req = Request(url, headers={'User-Agent': 'night-webview/1.0'})
+    with urlopen(req, timeout=timeout) as r:
+        if ticket is None:
+            return r.read().decode('utf-8', errors='ignore')
+        # leaving the with-block closes the connection of a superseded request
+        parts = []
+        for chunk in read_chunks(r):
+            ticket.check()
+            parts.append(chunk)
+        return b''.join(parts).decode('utf-8', errors='ignore')
+
+
+def fetch_json(url: str, timeout: int = 8, ticket: Optional[Ticket] = None) -> Any:
+    """GET and parse JSON; a superseded `ticket` raises Superseded instead of sending,
+    reading on or parsing."""
+    if CASSETTE is not None:
+        text = CASSETTE.fetch('GET', url, lambda: _get_text(url, timeout, ticket))
+    else:
+        text = _get_text(url, timeout, ticket)
+    if ticket is not None:
+        ticket.check()
+    return json.loads(text)
+
+
+class TTLCache:
+    """Small thread-safe cache with per-entry expiry.
+
+    Concurrent loads of the same key are coalesced: the first caller runs the
+    loader while the others wait for its result instead of issuing their own
+    request. With a `shared` SharedCache behind it, a miss here is looked up
+    in (and a load written to) the cache every local process shares, keeping
+    the entry's remaining TTL.
+    """
+
+    def __init__(self, ttl: float = CANDLE_TTL, max_entries: int = 256, shared: Optional[SharedCache] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._entries: Dict[Any, tuple] = {}  # key -> (expires_at, value)
+        self._inflight: Dict[Any, threading.Event] = {}
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit and hit[0] > time.monotonic():
+                return hit[1]
+        if self.shared is not None:
+            shared = self.shared.read(key)
+            if shared is not None:
+                self.put(key, shared[0], min(self.ttl, shared[1]))
+                return shared[0]
+        return None
+
+    def put(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            if len(self._entries) > self.max_entries:
+                now = time.monotonic()
+                for k in [k for k, (exp, _) in self._entries.items() if exp <= now]:
+                    del self._entries[k]
+                while len(self._entries) > self.max_entries:
+                    # dicts keep insertion order: drop the oldest entry
+                    del self._entries[next(iter(self._entries))]
+
+    def get_or_load(self, key: Any, loader: Callable[[], Any], ttl: Optional[float] = None,
+                    should_cache: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Return the cached value for `key`, calling `loader` on a miss.
+
+        `should_cache` can reject results (e.g. error dicts) so they are
+        returned to the caller but not stored.
+        """
+        while True:
+            with self._lock:
+                hit = self._entries.get(key)
+                if hit and hit[0] > time.monotonic():
+                    return hit[1]
+                event = self._inflight.get(key)
+                owner = event is None
+                if owner:
+                    event = self._inflight[key] = threading.Event()
+            if not owner:
+                event.wait()
+                continue
+            try:
+                if self.shared is not None:
+                    value, left = self.shared.load(key, loader, self.ttl if ttl is None else ttl, should_cache)
+                    ttl = min(self.ttl if ttl is None else ttl, left)
+                else:
+                    value = loader()
+                if should_cache is None or should_cache(value):
+                    self.put(key, value, ttl)
+                return value
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                event.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _shared(namespace: str) -> Optional[SharedCache]:
+    # a replayed cassette must see every request, so nothing is shared then
+    return None if CASSETTE is not None else SharedCache.from_env(namespace)
+
+
+# shared by every Api instance so all chart calls reuse the same candles; the
+# candle, price and schedule caches are also shared with other local processes
+# through files (see shared_cache.py; NIGHT_SHARED_CACHE=0 turns that off)
+_candle_cache = TTLCache(ttl=CANDLE_TTL, shared=_shared('candles'))
+
+
+# pseudo provider of the chart: every registered exchange merged (see consolidated.py)
+CONSOLIDATED = 'all'
+
+# result of a call whose generation the UI has moved past; never cached or rendered
+SUPERSEDED = {'error': 'superseded', 'superseded': True}
+
+# donation API (mine.defensio.io); the PS tool slept 0.5-2 s between addresses
+DONATION_LIMITER = RateLimiter(4)
+
+# streamed chat: per-read timeout, and how often partial text is pushed to the page
+STREAM_READ_TIMEOUT = 60.0
+STREAM_FLUSH_INTERVAL = 0.05
+
+
+_price_cache = TTLCache(ttl=PRICE_TTL, max_entries=4, shared=_shared('price'))
+
+# raw schedules by address; filled by checks and by the prefetch queue, so the
+# Check click on an address that was just listed or pasted needs no request
+SCHEDULE_TTL = 120.0
+_schedule_cache = TTLCache(ttl=SCHEDULE_TTL, max_entries=4096, shared=_shared('schedule'))
+
+# background prefetch stays well under the schedule API's tolerance and never
+# runs while a foreground check is in flight (see prefetch.py)
+PREFETCH_LIMITER = RateLimiter(2)
+# addresses of one view that are warmed ahead of time
+PREFETCH_MAX = 50
+
+
+def get_night_price() -> float:
+    """NIGHT/USDT last price from OKX, cached for PRICE_TTL seconds (0.0 if unavailable)."""
+    def load() -> float:
+        prices = fetch_okx_prices()
+        return prices.get('NIGHT') or prices.get('NIGHTUSDT') or 0.0
+    return _price_cache.get_or_load('NIGHT', load, should_cache=lambda v: bool(v))
+
 
+# OKX spot tickers the app prices with; only these are parsed out of the full ticker list
+WATCHED_TICKERS = ('NIGHT-USDT',)
+OKX_TICKERS_URL = 'https://www.okx.com/api/v5/market/tickers?instType=SPOT'
 
-def fetch_okx_prices() -> Dict[str, float]:
-    """Fetch simplified OKX spot tickers and return mapping like {'NIGHT': price}.
+
+def fetch_tickers(url: str, inst_ids: Sequence[str], timeout: int = 8) -> Dict[str, Dict[str, Any]]:
+    """Ticker objects of `inst_ids` from an exchange's full ticker list (see ticker_scan.py).
+
+    The response is scanned as it arrives and the connection is closed once
+    every id was seen. With a cassette the whole body goes through it as usual.
+    """
+    if CASSETTE is not None:
+        text = CASSETTE.fetch('GET', url, lambda: _get_text(url, timeout))
+        return extract_tickers([text.encode('utf-8')], inst_ids)
+    host = urlsplit(url).hostname or ''
+    with _upstream_lock:
+        UPSTREAM_CALLS[host] = UPSTREAM_CALLS.get(host, 0) + 1
+    req = Request(url, headers={'User-Agent': 'night-webview/1.0'})
+    with urlopen(req, timeout=timeout) as r:
+        return extract_tickers(read_chunks(r), inst_ids)
+
+
+def fetch_okx_prices(inst_ids: Sequence[str] = WATCHED_TICKERS) -> Dict[str, float]:
+    """Last OKX spot price of the watched instruments, keyed by base symbol like {'NIGHT': price}.
     Uses public OKX endpoint similar to the PowerShell version.
     """
     out: Dict[str, float] = {}
     try:
-        url = 'https://www.okx.com/api/v5/market/tickers?instType=SPOT'
-        data = fetch_json(url)
-        if not data or 'data' not in data:
-            return out
-        for item in data['data']:
-            inst = item.get('instId', '')
-            last = item.get('last')
-            if not inst or not last:
-                continue
-            # inst like 'NIGHT-USDT' or 'NIGHT-USDT'
-            sym = inst.split('-')[0]
-            try:
-                out[sym] = float(last)
-            except Exception:
-                continue
+        tickers = fetch_tickers(OKX_TICKERS_URL, inst_ids)
     except Exception:
-        pass
+        return out
+    for inst in inst_ids:
+        last = (tickers.get(inst) or {}).get('last')
+        if not last:
+            continue
+        try:
+            out.setdefault(inst.split('-')[0], float(last))
+        except (TypeError, ValueError):
+            continue
     return out
 
 
 class Api:
     def __init__(self):
         self._last_address: Optional[str] = None
-
-    def check_address(self, address: str) -> Dict[str, Any]:
+        # (provider, inst, bar, specs) -> IndicatorEngine, updated on every poll
+        self._indicator_engines: Dict[tuple, IndicatorEngine] = {}
+        # (inst, bar) -> ConsolidatedSeries, updated on every poll
+        self._consolidated: Dict[tuple, ConsolidatedSeries] = {}
+        self._engines_lock = threading.Lock()
+        # job_id -> (thread, stop event, BatchJob) for batch runs started from this process
+        self._batch_runs: Dict[str, tuple] = {}
+        self._batch_lock = threading.Lock()
+        self._snapshots = SnapshotStore()
+        self._wallet_indexes: Dict[str, WalletIndex] = {}
+        self._wallet_scanners: Dict[str, WalletScanner] = {}
+        # wallet lookups never wait on the chart engines
+        self._wallet_lock = threading.Lock()
+        # destination -> (thread, stop event, DonationExecutor, summary holder)
+        self._donation_runs: Dict[str, tuple] = {}
+        # summaries of what the UI has shown, handed to the AI assistant
+        self._context = ContextStore()
+        # set by start(); used to push streamed chat text into the page
+        self._window = None
+        # full results behind the virtualized "check selected" list
+        self._bulk = BulkResults()
+        self._prefetch = PrefetchQueue(PREFETCH_LIMITER)
+        # current request generation per UI channel ('chart', 'check', 'bulk')
+        self._generations = Generations()
+        # (provider, inst, bar) -> ValuationEngine over the saved addresses
+        self._valuations: Dict[tuple, ValuationEngine] = {}
+
+    def check_address(self, address: str, remember: bool = True, generation: Optional[int] = None) -> Dict[str, Any]:
         """Check schedule for an address and return processed data.
 
         Returns structure matching the GUI needs: thaws list with amount (NIGHT), thaw_date (ISO), days_until, total_amount, total_usd
+        With `remember`, a summary is kept as context for the AI assistant.
+        A `generation` tags the call on the 'check' channel (see cancellation.py).
         """
+        return self._check(address, remember, self._generations.begin('check', generation))
+
+    def cancel_requests(self, channel: str, generation: int) -> Dict[str, Any]:
+        """Supersede the calls of `channel` made for generations older than `generation`."""
+        self._generations.cancel(str(channel), int(generation))
+        return {'ok': True}
+
+    def _check(self, address: str, remember: bool, ticket: Optional[Ticket] = None) -> Dict[str, Any]:
         address = (address or '').strip()
         if not address:
             return {'error': 'empty address'}
+        normalized, err = validate_address(address)
+        if err:
+            return {'error': f'invalid address: {err}'}
+        address = normalized
+        with self._prefetch.foreground():
+            res = self._check_address(address, ticket)
+        if res.get('superseded'):
+            return res
+        if remember:
+            self._context.record_schedule(address, res)
+        return res
+
+    def _check_address(self, address: str, ticket: Optional[Ticket] = None) -> Dict[str, Any]:
 
         try:
-            data = self._fetch_schedule_via_script(address)
+            data = self._cached_schedule(address, ticket)
+        except Superseded:
+            return SUPERSEDED.copy()
         except Exception as e:
             return {'error': f'network error: {e}'}
 
@@ -150,15 +421,65 @@ class Api:
           })
           idx += 1
 
-        # fetch price
-        prices = fetch_okx_prices()
-        night_price = prices.get('NIGHT') or prices.get('NIGHTUSDT') or 0.0
+        # fetch price (shared short-lived cache, so bulk checks don't refetch all tickers)
+        night_price = get_night_price()
         total_usd = round(total_amount * (night_price or 0.0), 3)
 
         self._last_address = address
 
         return {'thaws': thaws, 'total_amount': total_amount, 'total_usd': total_usd, 'price': night_price}
 
+    def _cached_schedule(self, address: str, ticket: Optional[Ticket] = None) -> Any:
+        # concurrent loads of one address (a click racing its prefetch) share one request;
+        # when the loading call is superseded the others retry with their own
+        return _schedule_cache.get_or_load(address, lambda: self._fetch_schedule(address, ticket),
+                                           should_cache=lambda d: d is not None)
+
+    def prefetch_addresses(self, addresses) -> Dict[str, Any]:
+        """Warm the schedule cache for addresses the user is likely to check next
+        (the rows of an opened list, a pasted address) plus the NIGHT price.
+
+        Replaces whatever an earlier view queued. Invalid addresses are skipped;
+        at most PREFETCH_MAX are queued, in the given order of priority.
+        """
+        self._prefetch.cancel()
+        queued = cached = 0
+        valid, invalid = split_valid(a for a in (addresses or []) if a and str(a).strip())
+        # the queue runs newest first: submit the most important address last
+        for address in reversed(valid[:PREFETCH_MAX]):
+            if _schedule_cache.get(address) is not None:
+                cached += 1
+            elif self._prefetch.submit(('schedule', address), lambda a=address: self._cached_schedule(a)):
+                queued += 1
+        self.prefetch_price()
+        return {'queued': queued, 'cached': cached, 'invalid': len(invalid)}
+
+    def prefetch_price(self) -> Dict[str, Any]:
+        """Refresh the NIGHT price in the background when the cached one is missing."""
+        if _price_cache.get('NIGHT') is None:
+            self._prefetch.submit(('price', 'NIGHT'), get_night_price)
+        return {'ok': True}
+
+    def cancel_prefetch(self) -> Dict[str, Any]:
+        return {'cancelled': self._prefetch.cancel()}
+
+    def prefetch_status(self) -> Dict[str, Any]:
+        return self._prefetch.status()
+
+    def _fetch_schedule(self, address: str, ticket: Optional[Ticket] = None) -> Any:
+        """Fetch the raw thaw schedule: via `fetch.ps1` when it is shipped next
+        to this file, otherwise straight from the Midnight API."""
+        if os.path.exists(os.path.join(os.path.dirname(__file__), 'fetch.ps1')):
+            if ticket is not None:
+                ticket.check()
+            return self._fetch_schedule_via_script(address)
+        try:
+            return fetch_json(SCHEDULE_URL.format(address=address), timeout=10, ticket=ticket)
+        except HTTPError as e:
+            if e.code == 404:
+                return {'thaws': []}
+            raise
+
     def _fetch_schedule_via_script(self, address: str) -> Any:
         """Call the repository's `fetch.ps1` script to retrieve the schedule and return parsed JSON.
 
@@ -214,30 +535,109 @@ class Api:
         except Exception as e:
           raise RuntimeError(f'Failed to read JSON output file: {e}')
 
+    def _read_address_store(self) -> List[str]:
+        existing = []
+        if os.path.exists(DATA_FILE):
+            with open(DATA_FILE, 'r', encoding='utf-8') as f:
+                try:
+                    obj = json.load(f)
+                    existing = obj.get('Addresses', []) if isinstance(obj, dict) else []
+                except Exception:
+                    existing = []
+        return existing
+
     def save_address(self, address: str) -> Dict[str, Any]:
         address = (address or '').strip()
         if not address:
             return {'error': 'empty address'}
+        _, err = validate_address(address)
+        if err:
+            return {'error': f'invalid address: {err}'}
+        res = self.save_addresses([address])
+        return {'ok': True, 'path': DATA_FILE} if res.get('ok') else res
+
+    def save_addresses(self, addresses) -> Dict[str, Any]:
+        """Add many addresses to the saved list with a single read and write of the file.
+
+        Invalid addresses are skipped and listed under 'invalid'.
+        """
         try:
-            # load existing
-            existing = []
-            if os.path.exists(DATA_FILE):
-                with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                    try:
-                        obj = json.load(f)
-                        existing = obj.get('Addresses', []) if isinstance(obj, dict) else []
-                    except Exception:
-                        existing = []
-
-            if address not in existing:
-                existing.append(address)
+            valid, invalid = split_valid(a for a in addresses or [] if a and a.strip())
+            existing = self._read_address_store()
+            seen = set(existing)
+            added = 0
+            for a in valid:
+                if a not in seen:
+                    seen.add(a)
+                    existing.append(a)
+                    added += 1
+            if added:
                 obj = {'CreatedAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'Addresses': existing}
-                with open(DATA_FILE, 'w', encoding='utf-8') as f:
+                tmp = DATA_FILE + '.tmp'
+                with open(tmp, 'w', encoding='utf-8') as f:
                     json.dump(obj, f, indent=2, ensure_ascii=False)
-            return {'ok': True, 'path': DATA_FILE}
+                os.replace(tmp, DATA_FILE)
+            out = {'ok': True, 'path': DATA_FILE, 'added': added, 'count': len(existing)}
+            if invalid:
+                out['invalid'] = invalid
+            return out
         except Exception as e:
             return {'error': str(e)}
 
+    def import_addresses(self, text: Optional[str] = None, path: Optional[str] = None,
+                         fmt: Optional[str] = None, save: bool = True) -> Dict[str, Any]:
+        """Bulk import from pasted text or a CSV/JSON/text file, without any network call.
+
+        Every entry is checked offline (bech32 checksum, addr/addr_test
+        payment address) and deduplicated against the saved list in one
+        pass; with `save` the new ones are written in a single update.
+        Returns counts, the new addresses and up to 200 rejected entries
+        with their line and reason.
+        """
+        started = time.perf_counter()
+        try:
+            lines, guessed = read_source(text, path)
+            try:
+                report = ImportReport(self._read_address_store()).feed(import_stream(lines, fmt or guessed))
+            finally:
+                if hasattr(lines, 'close'):
+                    lines.close()
+        except Exception as e:
+            return {'error': str(e)}
+        out = report.summary()
+        out['addresses'] = report.new
+        if save and report.new:
+            saved = self.save_addresses(report.new)
+            if saved.get('error'):
+                return saved
+            out['count'] = saved['count']
+        out['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return out
+
+    def scan_wallets(self, root: Optional[str] = None, save: bool = False) -> Dict[str, Any]:
+        """Discover generated wallets (phraseN/generated_keys/*/delegated.addr) under `root`.
+
+        With save=True the discovered addresses are added to the saved
+        address list used by view_all.
+        """
+        root = os.path.abspath(root or PHRASE_ROOT)
+        try:
+            with self._wallet_lock:
+                scanner = self._wallet_scanners.get(root)
+                if scanner is None:
+                    scanner = self._wallet_scanners[root] = WalletScanner(root)
+            wallets = scanner.scan()
+        except Exception as e:
+            return {'error': str(e)}
+        out: Dict[str, Any] = {'wallets': wallets, 'count': len(wallets)}
+        if save:
+            res = self.save_addresses([w['address'] for w in wallets if w['address']])
+            if res.get('error'):
+                out['error'] = res['error']
+            else:
+                out['added'] = res['added']
+        return out
+
     def view_all(self) -> Dict[str, Any]:
         if not os.path.exists(DATA_FILE):
             return {'addresses': []}
@@ -248,145 +648,695 @@ class Api:
         except Exception as e:
             return {'error': str(e)}
 
-    def fetch_ohlc(self, inst_id: str = 'NIGHT-USDT', bar: str = '1H', limit: int = 200):
-        """Fetch OHLC (history-candles) from OKX and return list of dicts: {ts, open, high, low, close, volume} in chronological order."""
+    def list_providers(self) -> Dict[str, Any]:
+        """Registered candle providers (see providers.py), for the chart's provider selector."""
+        return {'providers': [p.info() for p in PROVIDERS.values()]}
+
+    def fetch_candles(self, provider: str = 'okx', inst_id: str = 'NIGHT-USDT', bar: str = '1H',
+                      limit: int = 200, start: Optional[int] = None, end: Optional[int] = None,
+                      ticket: Optional[Ticket] = None):
+        """Fetch candles from any registered provider.
+
+        Returns a chronological list of {ts, open, high, low, close, volume}
+        or {'error': ...}. `start`/`end` (ms, start inclusive, end exclusive)
+        restrict the page to a time window; used by the backfill.
+        """
+        get_json = fetch_json if ticket is None else (lambda url: fetch_json(url, ticket=ticket))
         try:
-            # OKX history-candles endpoint
-            url = f'https://www.okx.com/api/v5/market/history-candles?instId={inst_id}&bar={bar}&limit={limit}'
-            data = fetch_json(url)
+            return to_rows(get_provider(provider).fetch(get_json, inst_id, bar, limit, start, end))
+        except Superseded:
+            return SUPERSEDED.copy()
         except Exception as e:
             return {'error': str(e)}
 
-        if not data or 'data' not in data:
-            return {'error': 'no data'}
+    def fetch_ohlc(self, inst_id: str = 'NIGHT-USDT', bar: str = '1H', limit: int = 200,
+                   start: Optional[int] = None, end: Optional[int] = None):
+        """Fetch OHLC (history-candles) from OKX; same as fetch_candles('okx', ...)."""
+        return self.fetch_candles('okx', inst_id, bar, limit, start, end)
+
+    def fetch_ohlc_bybit(self, inst_id: str = 'NIGHT-USDT', bar: str = '1H', limit: int = 200,
+                         start: Optional[int] = None, end: Optional[int] = None):
+        """Fetch OHLC from Bybit; same as fetch_candles('bybit', ...)."""
+        return self.fetch_candles('bybit', inst_id, bar, limit, start, end)
+
+    def fetch_ohlc_gate(self, inst_id: str = 'NIGHT-USDT', bar: str = '1H', limit: int = 200,
+                        start: Optional[int] = None, end: Optional[int] = None):
+        """Fetch OHLC from Gate.io; same as fetch_candles('gate', ...)."""
+        return self.fetch_candles('gate', inst_id, bar, limit, start, end)
+
+    def backfill_candles(self, provider: str = 'okx', inst_id: str = 'NIGHT-USDT', bar: str = '1m',
+                         days: float = 30, workers: int = 4) -> Dict[str, Any]:
+        """Page backward through the provider's candle history into the local store.
+
+        The requested span is cut into page-sized time windows, newest first,
+        and `workers` windows are fetched concurrently (each request still
+        waits on the provider's rate limiter). Closed windows are recorded as
+        fetched even when they come back empty (trading halts, before the
+        listing), so re-running only asks for what was never fetched. Pages
+        are staged and merged into the store once at the end. Stops early
+        when a whole round of pages comes back empty (before the instrument
+        was listed).
+        """
+        if provider not in PROVIDERS:
+            return {'error': f'unknown provider: {provider}'}
+        bar_ms = BAR_MS.get(bar)
+        if not bar_ms:
+            return {'error': f'unsupported bar: {bar}'}
+
+        store = CandleStore.open(provider, inst_id, bar)
+        page = PROVIDERS[provider].page_limit
+        span = page * bar_ms
+        now = int(time.time() * 1000)
+        end = now - now % bar_ms + bar_ms
+        oldest = end - int(days * 86_400_000)
+        # windows ending before the open candle will not change any more
+        closed = end - bar_ms
+
+        windows = []
+        complete = []
+        for gap_lo, gap_hi in reversed(store.gaps(oldest, end)):
+            hi = gap_hi
+            while hi > gap_lo:
+                lo = max(gap_lo, hi - span)
+                if hi <= closed and store.count(lo, hi) >= (hi - lo) // bar_ms:
+                    complete.append((lo, hi))  # filled before windows were recorded
+                else:
+                    windows.append((lo, hi))
+                hi = lo
+        store.mark_fetched(complete)
+
+        errors: List[str] = []
+        workers = max(1, int(workers))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                for i in range(0, len(windows), workers):
+                    batch = windows[i:i + workers]
+                    pages = list(ex.map(lambda w: self.fetch_candles(provider, inst_id, bar, page, w[0], w[1]), batch))
+                    rows = []
+                    done = []
+                    for w, res in zip(batch, pages):
+                        if isinstance(res, list):
+                            rows.extend(res)
+                            done.append(w)
+                        elif isinstance(res, dict) and res.get('error'):
+                            errors.append(res['error'])
+                    store.stage(rows)
+                    store.mark_fetched([w for w in done if w[1] <= closed])
+                    if not rows and len(done) == len(batch):
+                        # nothing listed before this round either
+                        store.mark_fetched([(oldest, min(w[0] for w in batch))])
+                        break
+        finally:
+            added = store.compact()
+
+        bounds = store.bounds()
+        store.close()
+        out = {'ok': True, 'path': store.path, 'added': added, 'count': len(store), 'pages': len(windows)}
+        if bounds:
+            out['first_ts'], out['last_ts'] = bounds
+        if errors:
+            out['errors'] = errors[:5]
+        return out
 
-        out = []
-        for item in data['data']:
+    def query_candles(self, provider: str = 'okx', inst_id: str = 'NIGHT-USDT', bar: str = '1m',
+                      start: Optional[int] = None, end: Optional[int] = None):
+        """Read candles with start <= ts < end (ms) from the local store."""
+        store = CandleStore.open(provider, inst_id, bar)
+        try:
+            view = store.range(start, end)
+            rows = view.rows()
+            view.release()
+            return rows
+        except Exception as e:
+            return {'error': str(e)}
+        finally:
+            store.close()
+
+    def fetch_range(self, provider: str = 'okx', inst_id: str = 'NIGHT-USDT', bar: str = '1m',
+                    start: Optional[int] = None, end: Optional[int] = None, max_points: int = 800,
+                    overlay=None, generation: Optional[int] = None) -> Dict[str, Any]:
+        """Read a time range from the local store reduced to at most `max_points` per series.
+
+        Candles are merged into equal time buckets (OHLC preserving) and
+        overlay instruments are reduced to line points with LTTB, so the UI
+        gets roughly one point per pixel whatever the span.
+
+        Returns {'main': [...], 'bucket_ms': int, 'raw_count': int,
+        'overlays': {inst: [{'ts', 'close'}, ...]}} or {'error': ...}.
+        Tagged with a 'chart' `generation`, the overlays are skipped once the
+        chart has moved on.
+        """
+        bar_ms = BAR_MS.get(bar)
+        if not bar_ms:
+            return {'error': f'unsupported bar: {bar}'}
+        ticket = self._generations.begin('chart', generation)
+        max_points = max(10, int(max_points or 800))
+        store = CandleStore.open(provider, inst_id, bar)
+        try:
+            bounds = store.bounds()
+            if bounds is None:
+                return {'error': 'no local history; run a backfill first'}
+            lo = bounds[0] if start is None else max(int(start), bounds[0])
+            hi = bounds[1] + bar_ms if end is None else int(end)
+            width = bucket_width(lo, hi, bar_ms, max_points)
+            view = store.range(lo, hi)
+            raw_count = len(view)
+            records = view.records()
+            main = ohlc_buckets(records, lo - lo % width, width)
+            del records
+            view.release()
+        except Exception as e:
+            return {'error': str(e)}
+        finally:
+            store.close()
+
+        if isinstance(overlay, str):
+            overlay = [overlay]
+        overlays: Dict[str, Any] = {}
+        for inst in overlay or []:
+            if ticket is not None and ticket.cancelled:
+                return SUPERSEDED.copy()
+            ostore = CandleStore.open(provider, inst, bar)
             try:
-                # item: [timestamp, open, high, low, close, volume]
-                ts = int(item[0])
-                o = float(item[1])
-                h = float(item[2])
-                l = float(item[3])
-                c = float(item[4])
-                v = float(item[5])
-                out.append({'ts': ts, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v})
-            except Exception:
-                continue
+                oview = ostore.range(lo, hi)
+                pts = [(t[0], t[4]) for t in oview.tuples()]
+                oview.release()
+            finally:
+                ostore.close()
+            keep = lttb([p[0] for p in pts], [p[1] for p in pts], max_points)
+            overlays[inst] = [{'ts': pts[i][0], 'close': pts[i][1]} for i in keep]
+        return {'main': main, 'bucket_ms': width, 'raw_count': raw_count, 'overlays': overlays}
+
+    def portfolio_value(self, addresses=None, provider: str = 'okx', inst_id: str = 'NIGHT-USDT',
+                        bar: str = '1D', workers: int = 8) -> Dict[str, Any]:
+        """Mark the thaw schedules of `addresses` (default: all saved ones) to market
+        against the local candle history of `inst_id` (see valuation.py).
+
+        Returns {'days': [{ts, close, unlocked, unlocked_usd, total_usd}],
+        'tranches': [{ts, amount, usd_at_thaw, price, addresses}] per thaw date,
+        'addresses': [{address, amount, thawed, usd_now, usd_at_thaw}], 'totals',
+        'errors', 'recomputed'} or {'error': ...}. Schedules come through the
+        schedule cache; the engine keeps its arrays between calls and only
+        redoes what changed.
+        """
+        bar_ms = BAR_MS.get(bar)
+        if not bar_ms:
+            return {'error': f'unsupported bar: {bar}'}
+        if addresses is None:
+            saved = self.view_all()
+            if saved.get('error'):
+                return saved
+            addresses = saved.get('addresses', [])
+        addresses, invalid = split_valid(a for a in addresses if a and a.strip())
+        started = time.perf_counter()
+
+        store = CandleStore.open(provider, inst_id, bar)
+        try:
+            bounds = store.bounds()
+            if bounds is None:
+                return {'error': 'no local history; run a backfill first'}
+            view = store.range()
+            records = view.records()
+            days = ohlc_buckets(records, bounds[0] - bounds[0] % DAY_MS, DAY_MS)
+            del records
+            view.release()
+        except Exception as e:
+            return {'error': str(e)}
+        finally:
+            store.close()
+
+        errors: List[Dict[str, Any]] = [{'address': i['value'], 'error': f"invalid address: {i['error']}"}
+                                        for i in invalid]
 
-        # OKX returns newest-first; return chronological (oldest first)
-        out.reverse()
+        def load(address: str):
+            try:
+                return address, self._cached_schedule(address), None
+            except Exception as e:
+                return address, None, f'network error: {e}'
+
+        key = (provider, inst_id, bar)
+        with self._engines_lock:
+            engine = self._valuations.get(key)
+            if engine is None:
+                engine = self._valuations[key] = ValuationEngine()
+        engine.set_prices([d['ts'] for d in days], [d['close'] for d in days])
+        engine.keep_only(addresses)
+        with ThreadPoolExecutor(max_workers=max(1, int(workers))) as ex:
+            for address, schedule, err in ex.map(load, addresses):
+                if err:
+                    errors.append({'address': address, 'error': err})
+                else:
+                    engine.set_schedule(address, schedule)
+        res = engine.value()
+        if res.get('error'):
+            return res
+        return dict(res, errors=errors, recomputed=engine.last_recompute,
+                    elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+
+    def _cached_ohlc(self, provider: str, inst_id: str, bar: str, limit: int, ticket: Optional[Ticket] = None):
+        """Fetch one candle series through the shared candle cache."""
+        if provider == CONSOLIDATED:
+            res = self.fetch_consolidated(inst_id, bar, limit, ticket=ticket)
+            return res.get('main') if res.get('main') else res
+        key = ('ohlc', provider, inst_id, bar, int(limit))
+        return _candle_cache.get_or_load(key, lambda: self.fetch_candles(provider, inst_id, bar, limit, ticket=ticket),
+                                         should_cache=lambda v: isinstance(v, list))
+
+    def cached_candles(self, provider: str = 'okx', inst_id: str = 'NIGHT-USDT', bar: str = '1H', limit: int = 200):
+        """Candles of one series through the shared candle cache (provider 'all': consolidated)."""
+        return self._cached_ohlc(provider, inst_id, bar, limit)
+
+    def fetch_consolidated(self, inst_id: str = 'NIGHT-USDT', bar: str = '1H', limit: int = 200,
+                           generation: Optional[int] = None, ticket: Optional[Ticket] = None) -> Dict[str, Any]:
+        """Volume-weighted candles across all registered providers, aligned on ts.
+
+        Every provider is fetched in parallel through the candle cache; each
+        returned candle carries `spread_bps` ({provider: close vs composite})
+        and `sources` (exchanges with a candle at that ts). Providers that
+        fail are reported in 'providers' and the rest still consolidate.
+        """
+        names = list(PROVIDERS)
+        ticket = ticket or self._generations.begin('chart', generation)
+        with ThreadPoolExecutor(max_workers=len(names)) as ex:
+            series = dict(zip(names, ex.map(lambda p: self._cached_ohlc(p, inst_id, bar, limit, ticket), names)))
+        if ticket is not None and ticket.cancelled:
+            return SUPERSEDED.copy()
+        status = {p: 'ok' if isinstance(rows, list) else (rows or {}).get('error', 'no data')
+                  for p, rows in series.items()}
+        key = (inst_id, bar)
+        with self._engines_lock:
+            cs = self._consolidated.get(key)
+            if cs is None or cs.providers != names:
+                cs = self._consolidated[key] = ConsolidatedSeries(names, max_len=max(int(limit), 1))
+            else:
+                cs.grow(int(limit))  # a larger limit than the first caller's
+        main = cs.update({p: rows if isinstance(rows, list) else None for p, rows in series.items()})
+        if not main:
+            return {'error': 'no data from any provider', 'providers': status}
+        return {'main': main[-int(limit):], 'providers': status}
+
+    def _indicator_columns(self, key: tuple, specs: List[str], rows: List[Dict[str, Any]]):
+        with self._engines_lock:
+            engine = self._indicator_engines.get(key)
+            if engine is None:
+                engine = self._indicator_engines[key] = IndicatorEngine(specs)
+        return engine.update(rows)
+
+    def fetch_series(self, inst_id: str = 'NIGHT-USDT', bar: str = '1H', limit: int = 200,
+                     provider: str = 'okx', overlay=None, indicators=None, generation: Optional[int] = None):
+        """Fetch a main series plus optional overlay series in one call.
+
+        `overlay` is an instrument id or a list of them. Every series goes
+        through the shared candle cache, and overlays are aligned on `ts`
+        with the main series: `overlays[inst][i]` is the overlay candle at
+        `main[i]['ts']`, or None when that instrument has no candle there.
+
+        `indicators` is a list of specs understood by `indicators.parse_spec`
+        (e.g. ['sma:20', 'bb:20:2']); their columns are returned aligned with
+        the main series and updated incrementally between calls.
+
+        A `generation` tags the call on the 'chart' channel: once the chart has
+        moved on, pending fetches are dropped and {'superseded': True, ...} is
+        returned.
+
+        Returns {'main': [...], 'overlays': {inst: [...]}, 'indicators': {col: [...]}}
+        or {'error': ...}.
+        """
+        if isinstance(overlay, str):
+            overlay = [overlay]
+        others = [o for o in (overlay or []) if o and o != inst_id]
+        insts = [inst_id] + list(dict.fromkeys(others))
+        ticket = self._generations.begin('chart', generation)
+
+        with ThreadPoolExecutor(max_workers=len(insts)) as ex:
+            series = list(ex.map(lambda i: self._cached_ohlc(provider, i, bar, limit, ticket), insts))
+        if ticket is not None and ticket.cancelled:
+            return SUPERSEDED.copy()
+
+        main = series[0]
+        if not isinstance(main, list):
+            return main if isinstance(main, dict) else {'error': 'no data'}
+
+        overlays: Dict[str, Any] = {}
+        for inst, rows in zip(insts[1:], series[1:]):
+            if not isinstance(rows, list):
+                overlays[inst] = {'error': (rows or {}).get('error', 'no data')}
+                continue
+            by_ts = {r['ts']: r for r in rows}
+            overlays[inst] = [by_ts.get(r['ts']) for r in main]
+        out = {'main': main, 'overlays': overlays}
+        self._context.record_candles(inst_id, bar, main)
+        for inst, rows in overlays.items():
+            if isinstance(rows, list):
+                self._context.record_candles(inst, bar, [r for r in rows if r])
+
+        if indicators:
+            specs = [str(x) for x in indicators]
+            try:
+                out['indicators'] = self._indicator_columns((provider, inst_id, bar, tuple(specs)), specs, main)
+            except ValueError as e:
+                out['indicators'] = {'error': str(e)}
         return out
 
-    def fetch_ohlc_bybit(self, inst_id: str = 'NIGHT-USDT', bar: str = '1H', limit: int = 200):
-        """Fetch OHLC from Bybit (best-effort mapping).
+    def diff_addresses(self, addresses=None, workers: int = 8) -> Dict[str, Any]:
+        """Check addresses (default: all saved ones) and report only what changed.
 
-        Returns same structure as fetch_ohlc: list of {ts, open, high, low, close, volume}
+        Each result is compared with the snapshot stored by the previous
+        sweep; unchanged addresses are only counted. Returns
+        {'changed': [{'address', 'new', 'changes': [...], 'total_amount', 'total_usd'}],
+         'unchanged': int, 'errors': [{'address', 'error'}]}.
         """
+        if addresses is None:
+            saved = self.view_all()
+            if saved.get('error'):
+                return saved
+            addresses = saved.get('addresses', [])
+        addresses, invalid = split_valid(a for a in addresses if a and a.strip())
+
+        changed: List[Dict[str, Any]] = []
+        errors: List[Dict[str, Any]] = [{'address': i['value'], 'error': f"invalid address: {i['error']}"}
+                                        for i in invalid]
+        unchanged = 0
+        with ThreadPoolExecutor(max_workers=max(1, int(workers))) as ex:
+            futures = {ex.submit(self.check_address, a, False): a for a in addresses}
+            for fut in as_completed(futures):
+                addr = futures[fut]
+                res = fut.result()
+                if res.get('error') == 'No schedule found':
+                    res = {'thaws': [], 'total_amount': 0.0, 'total_usd': 0.0}
+                elif res.get('error'):
+                    errors.append({'address': addr, 'error': res['error']})
+                    continue
+                delta = self._snapshots.diff(addr, res)
+                if delta is None:
+                    unchanged += 1
+                    continue
+                delta['total_amount'] = res.get('total_amount', 0.0)
+                delta['total_usd'] = res.get('total_usd', 0.0)
+                changed.append(delta)
         try:
-            # map inst like 'ADA-USDT' -> 'ADAUSDT'
-            symbol = inst_id.replace('-', '').upper()
-            # timeframe mapping for Bybit v5 kline intervals
-            tf_map = {
-                '1m': '1', '5m': '5', '15m': '15', '1H': '60', '4H': '240', '1D': 'D'
-            }
-            interval = tf_map.get(bar, '60')
-
-            url = (
-                "https://api.bybit.com/v5/market/kline"
-                f"?category=spot&symbol={symbol}&interval={interval}&limit={limit}"
-            )
-
-            data = fetch_json(url)
+            self._snapshots.save()
         except Exception as e:
+            errors.append({'address': None, 'error': f'snapshot save failed: {e}'})
+        order = {a: i for i, a in enumerate(addresses)}
+        changed.sort(key=lambda d: order[d['address']])
+        report = {'changed': changed, 'unchanged': unchanged, 'errors': errors}
+        self._context.record_changes(report)
+        return report
+
+    def bulk_check(self, addresses, reset: bool = False, workers: int = 8,
+                   generation: Optional[int] = None) -> Dict[str, Any]:
+        """Check one chunk of addresses for the multi-address view.
+
+        Full results stay here; the page gets one summary row per address
+        (see bulk_results.py) plus running totals. `reset` starts a new view.
+        A chunk tagged with a superseded 'bulk' `generation` stops fetching
+        and adds nothing.
+        """
+        ticket = self._generations.begin('bulk', generation)
+        if ticket is not None and ticket.cancelled:
+            return SUPERSEDED.copy()
+        if reset:
+            self._bulk.clear()
+        addresses = [a.strip() for a in (addresses or []) if a and a.strip()]
+        started = time.perf_counter()
+        results: Dict[str, Dict[str, Any]] = {}
+        if addresses:
+            with ThreadPoolExecutor(max_workers=max(1, min(int(workers), len(addresses)))) as ex:
+                for addr, res in zip(addresses, ex.map(lambda a: self._check(a, False, ticket), addresses)):
+                    results[addr] = res
+        if ticket is not None and ticket.cancelled:
+            return SUPERSEDED.copy()
+        rows = self._bulk.add((a, results[a]) for a in addresses)
+        return {'rows': rows, 'totals': self._bulk.totals(),
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+    def bulk_rows(self, key: str = 'order', descending: bool = False) -> Dict[str, Any]:
+        """Summary rows of the multi-address view sorted by `key` (order, address, night, usd, next, unclaimed)."""
+        try:
+            return {'rows': self._bulk.rows(key, bool(descending)), 'totals': self._bulk.totals()}
+        except ValueError as e:
             return {'error': str(e)}
 
-        rows = []
+    def bulk_result(self, address: str) -> Dict[str, Any]:
+        """Full result behind one row of the multi-address view."""
+        res = self._bulk.result((address or '').strip())
+        if res is None:
+            return {'error': 'address not in the current results'}
+        self._context.record_schedule(address.strip(), res)
+        return res
+
+    def _wallet_index(self, root: Optional[str] = None) -> WalletIndex:
+        root = os.path.abspath(root or PHRASE_ROOT)
+        with self._wallet_lock:
+            ix = self._wallet_indexes.get(root)
+            if ix is None:
+                ix = self._wallet_indexes[root] = WalletIndex(root)
+        return ix
+
+    def refresh_wallet_index(self, root: Optional[str] = None) -> Dict[str, Any]:
+        """Fold new delegated_summary.txt / generation.log lines into the wallet index.
+
+        Returns only the wallets added or changed since the previous refresh.
+        """
         try:
-            # Bybit v5 shape: {'retCode':0,'result':{'list':[[ts,o,h,l,c,vol],...]}}
-            if isinstance(data, dict):
-                rows = data.get('result', {}).get('list', []) if data.get('result') else data.get('result') or []
-            elif isinstance(data, list):
-                rows = data
-        except Exception:
-            rows = []
-
-        out = []
+            ix = self._wallet_index(root)
+            new = ix.refresh()
+            return {'new': new, 'count': len(ix.entries())}
+        except Exception as e:
+            return {'error': str(e)}
+
+    def wallet_index(self, root: Optional[str] = None) -> Dict[str, Any]:
+        """All indexed wallets ({'key', 'phrase', 'wallet', 'address', 'file', 'skey', 'source'})."""
         try:
-            for r in rows:
-                # expect r like [ts, open, high, low, close, volume]
-                ts = int(r[0])
-                out.append({
-                    'ts': ts,
-                    'open': float(r[1]),
-                    'high': float(r[2]),
-                    'low': float(r[3]),
-                    'close': float(r[4]),
-                    'volume': float(r[5]),
-                })
-
-            out.sort(key=lambda x: x['ts'])
-            return out
+            ix = self._wallet_index(root)
+            ix.refresh()
+            return {'wallets': ix.entries()}
         except Exception as e:
-            return {'error': f'parse error: {e}'}
+            return {'error': str(e)}
 
-    def fetch_ohlc_gate(self, inst_id: str = 'NIGHT-USDT', bar: str = '1H', limit: int = 200):
-        """Fetch OHLC from Gate.io (spec-compliant parser).
+    # -- batch jobs ---------------------------------------------------------
+    def _batch_worker(self, kind: str) -> Callable[[str], Dict[str, Any]]:
+        if kind == 'check':
+            return self._check_for_batch
+        raise ValueError(f'unknown batch kind: {kind}')
+
+    def _check_for_batch(self, address: str) -> Dict[str, Any]:
+        """check_address reduced to what a bulk run needs to keep in its journal."""
+        res = self.check_address(address, remember=False)
+        if res.get('error') == 'No schedule found':
+            # a definitive answer, not a failure to retry
+            return {'total_amount': 0.0, 'total_usd': 0.0, 'price': get_night_price(), 'thaws': []}
+        if res.get('error'):
+            return res
+        return {
+            'total_amount': res['total_amount'], 'total_usd': res['total_usd'], 'price': res['price'],
+            'thaws': [{'amount': t['amount'], 'thaw_date': t['thaw_date'], 'status': t['status']}
+                      for t in res['thaws']],
+        }
 
-        Gate always returns arrays in the documented order:
-        [timestamp, open, high, low, close, volume]
-        Timestamps are seconds; convert to milliseconds and return chronological list.
+    def start_batch(self, addresses=None, kind: str = 'check', job_id: Optional[str] = None,
+                    threads: int = 8) -> Dict[str, Any]:
+        """Create a batch job (or resume `job_id` when no addresses are given) and run it in the background.
+
+        Progress is journaled per address, so an interrupted job resumes
+        where it stopped when started again with the same job_id.
         """
+        invalid: List[Dict[str, str]] = []
         try:
-            pair = inst_id.replace('-', '_').upper()
-            tf_map = {
-                '1m': '1m', '5m': '5m', '15m': '15m', '1H': '1h', '4H': '4h', '1D': '1d'
-            }
-            interval = tf_map.get(bar, '1h')
+            if addresses:
+                # garbage never becomes a request: only valid, de-duplicated addresses enter the job
+                addresses, invalid = split_valid(a for a in addresses if a and a.strip())
+                if not addresses:
+                    return {'error': 'no valid addresses', 'invalid': invalid[:200]}
+                job = BatchJob.create(addresses, kind=kind, job_id=job_id)
+            elif job_id:
+                job = BatchJob.open(job_id)
+            else:
+                return {'error': 'no addresses or job_id given'}
+            worker = self._batch_worker(job.kind)
+        except Exception as e:
+            return {'error': str(e)}
+
+        with self._batch_lock:
+            running = self._batch_runs.get(job.job_id)
+            if running and running[0].is_alive():
+                return {'ok': True, 'job_id': job.job_id, 'running': True}
+            stop = threading.Event()
+            t = threading.Thread(target=job.run, args=(worker,), kwargs={'threads': threads, 'stop': stop},
+                                 daemon=True)
+            self._batch_runs[job.job_id] = (t, stop, job)
+            t.start()
+        out = {'ok': True, 'job_id': job.job_id, 'running': True}
+        if invalid:
+            out['invalid_count'] = len(invalid)
+            out['invalid'] = invalid[:200]
+        return out
 
-            url = (
-                "https://api.gateio.ws/api/v4/spot/candlesticks"
-                f"?currency_pair={pair}&interval={interval}&limit={limit}"
-            )
+    def _batch_job(self, job_id: str) -> BatchJob:
+        with self._batch_lock:
+            running = self._batch_runs.get(job_id)
+        return running[2] if running else BatchJob.open(job_id)
 
-            data = fetch_json(url)
+    def batch_status(self, job_id: str) -> Dict[str, Any]:
+        try:
+            status = self._batch_job(job_id).status()
         except Exception as e:
             return {'error': str(e)}
+        with self._batch_lock:
+            running = self._batch_runs.get(job_id)
+        status['running'] = bool(running and running[0].is_alive())
+        return status
 
-        out = []
+    def batch_results(self, job_id: str) -> Dict[str, Any]:
         try:
-            if not isinstance(data, list):
-                return {'error': 'unexpected response format'}
-
-            for r in data:
-              if not r or len(r) < 6:
-                continue
-              try:
-                ts = int(float(r[0]))
-                if ts < 1e12:
-                  ts = int(ts * 1000)
-                # parse fields as floats
-                f1 = float(r[1]); f2 = float(r[2]); f3 = float(r[3]); f4 = float(r[4]); f5 = float(r[5])
-                # Default assumed order: [open, high, low, close, volume]
-                o, h, l, c, v = f1, f2, f3, f4, f5
-                # Conservative fix: if 'open' looks like a very large number (likely volume)
-                # while the last field is small (likely price), remap from [t, vol, close, high, low, open]
-                max_price = max(abs(h), abs(l), abs(c), abs(o)) if any([h, l, c, o]) else 0
-                if max_price > 0 and (o > max_price * 1000 and f5 < max_price * 100):
-                  # interpret as [t, volume, close, high, low, open]
-                  v = f1
-                  c = f2
-                  h = f3
-                  l = f4
-                  o = f5
-                out.append({'ts': ts, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v})
-              except Exception:
-                continue
+            return {'job_id': job_id, 'results': self._batch_job(job_id).results()}
+        except Exception as e:
+            return {'error': str(e)}
 
-            out.sort(key=lambda x: x['ts'])
-            return out
+    def stop_batch(self, job_id: str) -> Dict[str, Any]:
+        with self._batch_lock:
+            running = self._batch_runs.get(job_id)
+        if not running:
+            return {'error': f'job not running: {job_id}'}
+        running[1].set()
+        return {'ok': True, 'job_id': job_id}
+
+    def list_batches(self) -> Dict[str, Any]:
+        return {'jobs': BatchJob.list()}
+
+    # -- donations ----------------------------------------------------------
+    def _donation_items(self, addresses=None, root: Optional[str] = None) -> List[Dict[str, str]]:
+        """{'address', 'skey'} for the given addresses (all indexed wallets when None)."""
+        wallets = [w for w in self._wallet_index(root).entries() if w.get('address')]
+        if addresses is None:
+            return [{'address': w['address'], 'skey': w.get('skey', '')} for w in wallets]
+        skeys = {w['address']: w.get('skey', '') for w in wallets}
+        return [{'address': a, 'skey': skeys.get(a, '')} for a in dict.fromkeys(addresses) if a]
+
+    def _donation_executor(self, destination: str, api_base: Optional[str] = None) -> DonationExecutor:
+        with self._batch_lock:
+            running = self._donation_runs.get(destination)
+        if running and (api_base is None or running[2].api_base == api_base.rstrip('/')):
+            return running[2]
+        kwargs = {'api_base': api_base} if api_base else {}
+        return DonationExecutor(destination, donation_journal_path(destination), limiter=DONATION_LIMITER, **kwargs)
+
+    def preview_donations(self, destination: str, addresses=None, root: Optional[str] = None,
+                          api_base: Optional[str] = None) -> Dict[str, Any]:
+        """Solutions per address and in total for a batch (default: every indexed
+        wallet), plus the `confirm` token `start_donations` needs. Nothing is signed."""
+        destination = (destination or '').strip()
+        if not destination:
+            return {'error': 'destination address is required'}
+        try:
+            items = self._donation_items(addresses, root)
+            preview = self._donation_executor(destination, api_base).preview(i['address'] for i in items)
+        except Exception as e:
+            return {'error': str(e)}
+        preview['missing_skey'] = [i['address'] for i in items if not i['skey']]
+        return preview
+
+    def start_donations(self, destination: str, addresses=None, root: Optional[str] = None,
+                        http_workers: int = 4, sign_workers: int = 2,
+                        api_base: Optional[str] = None, confirm: Optional[str] = None) -> Dict[str, Any]:
+        """Donate from `addresses` (default: every indexed wallet) to `destination` in the background.
+
+        Needs the `confirm` token of `preview_donations` for the same
+        destination and addresses; without it nothing is started and the
+        preview is returned instead. Addresses already journaled as done for
+        this destination are skipped, so starting again resumes an
+        interrupted run.
+        """
+        destination = (destination or '').strip()
+        if not destination:
+            return {'error': 'destination address is required'}
+        try:
+            items = self._donation_items(addresses, root)
+            if confirm != confirm_token(destination, [i['address'] for i in items]):
+                preview = self.preview_donations(destination, [i['address'] for i in items], root, api_base)
+                if preview.get('error'):
+                    return preview
+                return dict(preview, confirm_required=True)
+            missing = [i['address'] for i in items if not i['skey']]
+            if missing:
+                return {'error': f'no skey found for {len(missing)} address(es)', 'missing': missing}
+            executor = self._donation_executor(destination, api_base)
         except Exception as e:
-            return {'error': f'parse error: {e}'}
+            return {'error': str(e)}
+        executor.http_workers = max(1, http_workers)
+        executor.sign_workers = max(1, sign_workers)
+
+        with self._batch_lock:
+            running = self._donation_runs.get(destination)
+            if running and running[0].is_alive():
+                return {'ok': True, 'destination': destination, 'running': True}
+            stop = threading.Event()
+            summary: Dict[str, Any] = {}
+
+            def run():
+                summary.update(executor.run(items, stop=stop))
+
+            t = threading.Thread(target=run, daemon=True)
+            self._donation_runs[destination] = (t, stop, executor, summary)
+            t.start()
+        return {'ok': True, 'destination': destination, 'running': True, 'count': len(items)}
+
+    def donation_status(self, destination: str) -> Dict[str, Any]:
+        """Per-address state of the current run plus the journaled state of earlier runs."""
+        try:
+            executor = self._donation_executor(destination)
+            journal = executor.journal()
+        except Exception as e:
+            return {'error': str(e)}
+        with self._batch_lock:
+            running = self._donation_runs.get(destination)
+        live = executor.status()
+        items = []
+        for address, rec in journal.items():
+            item = live.get(address) or {'address': address, 'state': rec.get('s'), 'solutions': rec.get('sol'),
+                                         'error': rec.get('e'), 'response': rec.get('resp')}
+            items.append(item)
+        counts: Dict[str, int] = {}
+        for item in items:
+            counts[item['state']] = counts.get(item['state'], 0) + 1
+        return {'destination': destination, 'running': bool(running and running[0].is_alive()),
+                'states': counts, 'items': items, 'summary': dict(running[3]) if running else None}
+
+    def retry_donation(self, destination: str, address: str, root: Optional[str] = None,
+                       api_base: Optional[str] = None) -> Dict[str, Any]:
+        """Run one address through statistics, signing and donate_to again (blocking).
+
+        Goes to `api_base`, by default the server the address was journaled
+        against, and is refused while a run for `destination` is active.
+        """
+        with self._batch_lock:
+            running = self._donation_runs.get(destination)
+        if running and running[0].is_alive():
+            return {'error': f'a donation run for {destination} is still active; stop it first'}
+        try:
+            items = self._donation_items([address], root)
+            if not items or not items[0]['skey']:
+                return {'error': f'no skey found for {address}'}
+            if api_base is None:
+                journaled = DonationExecutor(destination, donation_journal_path(destination)).journal()
+                api_base = journaled.get(address, {}).get('api')
+            return self._donation_executor(destination, api_base).retry(address, items[0]['skey'])
+        except Exception as e:
+            return {'error': str(e)}
+
+    def stop_donations(self, destination: str) -> Dict[str, Any]:
+        with self._batch_lock:
+            running = self._donation_runs.get(destination)
+        if not running:
+            return {'error': f'no donation run for {destination}'}
+        running[1].set()
+        return {'ok': True, 'destination': destination}
+
+    def clear_context(self) -> Dict[str, Any]:
+        """Forget the summaries collected for the AI assistant."""
+        self._context.clear()
+        return {'ok': True}
 
     def chat_message(self, message: str, nodes_data=None):
         """
@@ -414,6 +1364,14 @@ class Api:
             # allow optional model/messages fields in nodes_data
             model = nodes_data.get('model')
             messages = nodes_data.get('messages') or [{'role': 'user', 'content': message}]
+            # summaries of recent checks/charts, trimmed to the token budget
+            try:
+                budget = int(nodes_data.get('contextTokens') or 0) or None
+            except (TypeError, ValueError):
+                budget = None
+            context = self._context.render(message, budget)
+            if context:
+                messages = [{'role': 'system', 'content': context}] + list(messages)
             if model:
                 payload = {'model': model, 'messages': messages}
             else:
@@ -428,23 +1386,68 @@ class Api:
         if api_key:
             headers['Authorization'] = f'Bearer {api_key}'
 
+        if nodes_data.get('stream'):
+            return self._stream_chat(endpoint, payload, headers, nodes_data.get('streamId'))
+
         try:
-            req = Request(endpoint, data=json.dumps(payload).encode('utf-8'), headers=headers)
-            with urlopen(req, timeout=30) as resp:
-                result = json.load(resp)
-                # return the raw response and a short `reply` when possible
+            body = json.dumps(payload).encode('utf-8')
+            req = Request(endpoint, data=body, headers=headers)
+
+            def send() -> str:
+                with urlopen(req, timeout=30) as resp:
+                    return resp.read().decode('utf-8')
+
+            text = CASSETTE.fetch('POST', endpoint, send, body) if CASSETTE is not None else send()
+            result = json.loads(text)
+            # return the raw response and a short `reply` when possible
+            reply = None
+            try:
+                # Common shape: {choices:[{message:{content:...}}]}
+                if isinstance(result, dict) and 'choices' in result and isinstance(result['choices'], list) and result['choices']:
+                    m = result['choices'][0].get('message') or result['choices'][0]
+                    reply = m.get('content') if isinstance(m, dict) else None
+            except Exception:
                 reply = None
-                try:
-                    # Common shape: {choices:[{message:{content:...}}]}
-                    if isinstance(result, dict) and 'choices' in result and isinstance(result['choices'], list) and result['choices']:
-                        m = result['choices'][0].get('message') or result['choices'][0]
-                        reply = m.get('content') if isinstance(m, dict) else None
-                except Exception:
-                    reply = None
-                return {'reply': reply or json.dumps(result), 'raw': result}
+            return {'reply': reply or json.dumps(result), 'raw': result}
         except Exception as e:
             return {'error': str(e)}
 
+    def _stream_chat(self, endpoint: str, payload: Dict[str, Any], headers: Dict[str, str],
+                     stream_id: Optional[str]) -> Dict[str, Any]:
+        """Stream the completion, pushing partial text to `window.onChatDelta(stream_id, text)`.
+
+        Deltas are coalesced to one push per STREAM_FLUSH_INTERVAL; the full
+        reply is still returned when the stream ends.
+        """
+        pending: List[str] = []
+        last_push = [0.0]
+
+        def flush() -> None:
+            text = ''.join(pending)
+            pending.clear()
+            last_push[0] = time.monotonic()
+            if text and self._window is not None:
+                try:
+                    self._window.evaluate_js(f'window.onChatDelta({json.dumps(stream_id)}, {json.dumps(text)})')
+                except Exception:
+                    pass
+
+        def on_delta(text: str) -> None:
+            pending.append(text)
+            if time.monotonic() - last_push[0] >= STREAM_FLUSH_INTERVAL:
+                flush()
+
+        if CASSETTE is not None:
+            body = json.dumps(dict(payload, stream=True)).encode('utf-8')
+            res = CASSETTE.stream('POST', endpoint,
+                                  lambda cb: stream_chat(endpoint, payload, headers, cb, timeout=STREAM_READ_TIMEOUT),
+                                  on_delta, body)
+        else:
+            res = stream_chat(endpoint, payload, headers, on_delta, timeout=STREAM_READ_TIMEOUT)
+        flush()
+        res['streamed'] = True
+        return res
+
 
 HTML = r'''
 <!doctype html>
@@ -471,6 +1474,10 @@ HTML = r'''
     .col{flex:1}
     .log{margin-top:12px;padding:12px;border-radius:8px;background:#071018;border:1px solid var(--border);max-height:360px;overflow:auto}
     .thaw{padding:8px;border-radius:8px;border:1px solid rgba(255,255,255,0.02);margin-bottom:8px}
+    .vlist{position:relative;height:200px;overflow:auto;border:1px solid var(--border);border-radius:8px;margin:8px 0}
+    .vrow{position:absolute;left:0;right:0;height:30px;line-height:30px;padding:0 8px;display:flex;gap:12px;cursor:pointer;white-space:nowrap;font-size:13px;border-bottom:1px solid rgba(255,255,255,0.03)}
+    .vrow:hover{background:rgba(124,199,255,0.06)}
+    .vrow .addr{flex:1;overflow:hidden;text-overflow:ellipsis;font-family:Consolas,monospace;color:#7cc7ff}
     footer{margin-top:12px;color:var(--muted);font-size:13px;display:flex;justify-content:space-between}
     @media(max-width:800px){.grid,.cols{flex-direction:column}}
 
@@ -509,6 +1516,8 @@ HTML = r'''
         <button class="btn primary" id="btnCheck">Check</button>
         <button class="btn ghost" id="btnClear">Clear</button>
         <button class="btn ghost" id="btnSave">Save</button>
+        <button class="btn ghost" id="btnImport">Import</button>
+        <input type="file" id="importFile" accept=".csv,.json,.txt" style="display:none" />
         <button class="btn ghost" id="btnViewAll">View All</button>
         <button class="btn ghost" id="btnChart">Chart</button>
         <button class="btn ghost" onclick="toggleChat()"><i class="fas fa-robot"></i> AI Assistant</button>
@@ -580,25 +1589,26 @@ HTML = r'''
     const logEl = document.getElementById('status');
     const resultsEl = document.getElementById('results');
     const priceEl = document.getElementById('price');
-    // store recent API outputs here so AI can use them for analysis
-    window.apiOutputs = window.apiOutputs || {};
-
     function setStatus(s){ logEl.textContent = s }
 
+    // generations of the chart, single and multi-address checks; a newer view or click
+    // supersedes the older one. Page-scoped, like the counters Python keeps for the app's lifetime
+    let chartGen = 0, checkGen = 0, bulkGen = 0;
+
     async function checkAddress(){
       const addr = document.getElementById('address').value.trim();
       if(!addr){ alert('Enter address'); return }
+      const gen = ++checkGen;
       setStatus('Loading...');
       resultsEl.innerHTML = '...';
       try{
-        const res = await window.pywebview.api.check_address(addr);
-        // save last check result for AI context
-        try{ window.apiOutputs.last_check = res }catch(e){}
+        const res = await window.pywebview.api.check_address(addr, true, gen);
+        if(gen !== checkGen || res.superseded) return;
         if(res.error){ setStatus('Error: '+res.error); resultsEl.textContent = res.error; return }
         setStatus('Success');
         try{ priceEl.textContent = (res.price != null && isFinite(Number(res.price))) ? Number(res.price).toFixed(3) + ' USD' : 'N/A' }catch(e){ priceEl.textContent = 'N/A' }
         renderResults(res)
-      }catch(e){ setStatus('JS error: '+e); resultsEl.textContent = ''+e }
+      }catch(e){ if(gen === checkGen){ setStatus('JS error: '+e); resultsEl.textContent = ''+e } }
     }
 
     function renderResults(res, target){
@@ -629,6 +1639,29 @@ HTML = r'''
       }
     }
 
+    // bulk import (CSV / JSON / text); validated and deduplicated in Python before anything is saved
+    async function importAddresses(file){
+      if(!file) return;
+      setStatus('Importing ' + file.name + '...');
+      const name = file.name.toLowerCase();
+      const fmt = name.endsWith('.json') ? 'json' : (name.endsWith('.csv') ? 'csv' : 'text');
+      const res = await window.pywebview.api.import_addresses(await file.text(), null, fmt, true);
+      if(res.error){ setStatus('Import error: '+res.error); return }
+      setStatus(`Imported ${res.new} new (${res.duplicates} duplicates, ${res.already_saved} already saved, ${res.invalid_count} invalid) in ${res.elapsed_ms} ms`);
+      resultsEl.innerHTML = '';
+      res.invalid.forEach(i=>{
+        const div = document.createElement('div'); div.style.color = '#ff8a80';
+        div.textContent = `line ${i.line}: ${i.value} (${i.error})`;
+        resultsEl.appendChild(div);
+      });
+      if(res.invalid_count > res.invalid.length){
+        const more = document.createElement('div'); more.style.color = 'var(--muted)';
+        more.textContent = `... ${res.invalid_count - res.invalid.length} more invalid entries`;
+        resultsEl.appendChild(more);
+      }
+      if(!res.invalid.length) resultsEl.textContent = 'No invalid entries';
+    }
+
     async function saveAddress(){
       const addr = document.getElementById('address').value.trim();
       if(!addr){ alert('Enter address'); return }
@@ -670,50 +1703,182 @@ HTML = r'''
       const btnSelectAll = document.createElement('button'); btnSelectAll.className='btn ghost'; btnSelectAll.textContent='✓ Select All';
       const btnDeselectAll = document.createElement('button'); btnDeselectAll.className='btn ghost'; btnDeselectAll.textContent='✗ Deselect All';
       const btnCheckSelected = document.createElement('button'); btnCheckSelected.className='btn primary'; btnCheckSelected.textContent='🔍 Check Selected';
+      const btnChanges = document.createElement('button'); btnChanges.className='btn ghost'; btnChanges.textContent='Δ Changes only';
       const btnCancel = document.createElement('button'); btnCancel.className='btn ghost'; btnCancel.textContent='Cancel';
-      btnRow.appendChild(btnSelectAll); btnRow.appendChild(btnDeselectAll); btnRow.appendChild(btnCheckSelected); btnRow.appendChild(btnCancel);
+      btnRow.appendChild(btnSelectAll); btnRow.appendChild(btnDeselectAll); btnRow.appendChild(btnChanges); btnRow.appendChild(btnCheckSelected); btnRow.appendChild(btnCancel);
       content.appendChild(btnRow);
 
       modal.appendChild(content); document.body.appendChild(modal);
 
+      // warm the schedule cache while the user is still choosing: ticked addresses first, then the list
+      const prefetchSelection = ()=>{
+        const ticked = Array.from(listDiv.querySelectorAll('input[type=checkbox]')).filter(c=>c.checked).map(c=>c.value);
+        window.pywebview.api.prefetch_addresses(ticked.concat(list.filter(a=>!ticked.includes(a)))).catch(()=>{});
+      };
+      prefetchSelection();
+      listDiv.addEventListener('change', prefetchSelection);
+
       btnSelectAll.addEventListener('click', ()=>{ listDiv.querySelectorAll('input[type=checkbox]').forEach(c=>c.checked=true) });
       btnDeselectAll.addEventListener('click', ()=>{ listDiv.querySelectorAll('input[type=checkbox]').forEach(c=>c.checked=false) });
-      btnCancel.addEventListener('click', ()=>{ document.body.removeChild(modal); setStatus('Ready'); });
+      btnCancel.addEventListener('click', ()=>{ document.body.removeChild(modal); window.pywebview.api.cancel_prefetch(); setStatus('Ready'); });
 
-      btnCheckSelected.addEventListener('click', async ()=>{
+      // compare with the previous sweep in Python and render only the deltas
+      btnChanges.addEventListener('click', async ()=>{
         const checked = Array.from(listDiv.querySelectorAll('input[type=checkbox]')).filter(c=>c.checked).map(c=>c.value);
         if(!checked.length){ alert('Please select at least one address'); return }
         document.body.removeChild(modal);
-        setStatus('Checking selected addresses...');
+        setStatus('Checking for changes...');
         resultsEl.innerHTML = '';
-        for(const addr of checked){
-          console.log('[VIEW ALL] Checking:', addr);
-          const header = document.createElement('div'); header.style.marginTop='8px'; header.innerHTML = `<div style="color:#7cc7ff"><strong>[VIEW ALL] Checking:</strong> ${addr}</div>`;
-          resultsEl.appendChild(header);
-          try{
-            const r = await window.pywebview.api.check_address(addr);
-            // capture view-all results for AI context
-            try{ window.apiOutputs.view_all = window.apiOutputs.view_all || []; window.apiOutputs.view_all.push({address: addr, result: r}); }catch(e){}
-            const addrContainer = document.createElement('div');
-            addrContainer.style.marginTop = '8px';
-            addrContainer.style.padding = '8px';
-            addrContainer.style.border = '1px solid rgba(255,255,255,0.03)';
-            addrContainer.style.borderRadius = '8px';
-            const subHeader = document.createElement('div');
-            subHeader.innerHTML = `<div style="color:#7cc7ff"><strong>[VIEW ALL] Result for:</strong> ${addr}</div>`;
-            addrContainer.appendChild(subHeader);
-            renderResults(r, addrContainer);
-            resultsEl.appendChild(addrContainer);
-            console.log('[VIEW ALL] Result for', addr, r);
-          }catch(e){
-            const err = document.createElement('div'); err.style.color='#ff8a80'; err.textContent = '[VIEW ALL] Error checking ' + addr + ': ' + e; resultsEl.appendChild(err); console.error('[VIEW ALL] Error', addr, e);
+        const res = await window.pywebview.api.diff_addresses(checked);
+        if(res.error){ setStatus('Error: '+res.error); resultsEl.textContent = res.error; return }
+        const head = document.createElement('div');
+        head.innerHTML = `<strong>${res.changed.length}</strong> changed, ${res.unchanged} unchanged, ${res.errors.length} errors`;
+        resultsEl.appendChild(head); resultsEl.appendChild(document.createElement('hr'));
+        res.changed.forEach(d=>{
+          const div = document.createElement('div'); div.className = 'thaw';
+          const title = document.createElement('div'); title.style.color = '#7cc7ff';
+          title.textContent = d.address + (d.new ? ' (first snapshot)' : '') + ' — ' + Number(d.total_amount || 0).toFixed(3) + ' NIGHT';
+          div.appendChild(title);
+          if(!d.new){
+            d.changes.forEach(c=>{
+              const line = document.createElement('div');
+              line.textContent = `${c.thaw}: ${c.from || '—'} → ${c.to || 'removed'} (${Number(c.amount).toFixed(3)} NIGHT)`;
+              div.appendChild(line);
+            });
           }
-        }
+          resultsEl.appendChild(div);
+        });
+        res.errors.forEach(e=>{ const err = document.createElement('div'); err.style.color='#ff8a80'; err.textContent = (e.address || '') + ': ' + e.error; resultsEl.appendChild(err); });
         setStatus('Done');
       });
+
+      btnCheckSelected.addEventListener('click', async ()=>{
+        const checked = Array.from(listDiv.querySelectorAll('input[type=checkbox]')).filter(c=>c.checked).map(c=>c.value);
+        if(!checked.length){ alert('Please select at least one address'); return }
+        document.body.removeChild(modal);
+        await runBulkCheck(checked);
+      });
+    }
+
+    // multi-address results: Python keeps the full results and does the summarizing and
+    // sorting (Api.bulk_check / bulk_rows); the page holds one compact row per address and
+    // only builds the rows that are scrolled into view
+    const BULK_ROW_H = 30, BULK_CHUNK = 25, BULK_OVERSCAN = 6;
+    const bulkView = {rows: [], pool: [], frame: 0, list: null, inner: null, head: null, detail: null, sort: null, desc: null};
+
+    function fmt3(v){ return (v != null && isFinite(Number(v))) ? Number(v).toFixed(3) : '—' }
+
+    function buildBulkView(){
+      resultsEl.innerHTML = '';
+      const bar = document.createElement('div'); bar.style.display='flex'; bar.style.gap='8px'; bar.style.alignItems='center';
+      const head = document.createElement('div'); head.style.flex='1';
+      const sort = document.createElement('select');
+      [['order','Input order'],['night','NIGHT'],['usd','USD'],['unclaimed','Unclaimed'],['next','Next unlock'],['address','Address']]
+        .forEach(([v, t])=>{ const o = document.createElement('option'); o.value = v; o.textContent = t; sort.appendChild(o) });
+      const desc = document.createElement('input'); desc.type = 'checkbox'; desc.title = 'Descending';
+      bar.appendChild(head); bar.appendChild(sort); bar.appendChild(desc);
+      const list = document.createElement('div'); list.className = 'vlist';
+      const inner = document.createElement('div'); inner.style.position = 'relative';
+      list.appendChild(inner);
+      const detail = document.createElement('div');
+      resultsEl.appendChild(bar); resultsEl.appendChild(list); resultsEl.appendChild(detail);
+      Object.assign(bulkView, {rows: [], pool: [], list, inner, head, detail, sort, desc});
+      list.addEventListener('scroll', scheduleBulkPaint, {passive: true});
+      list.addEventListener('click', e=>{ const row = e.target.closest('.vrow'); if(row && row.dataset.address) showBulkDetail(row.dataset.address) });
+      sort.addEventListener('change', applyBulkSort);
+      desc.addEventListener('change', applyBulkSort);
+    }
+
+    function scheduleBulkPaint(){ if(!bulkView.frame) bulkView.frame = requestAnimationFrame(paintBulkRows) }
+
+    function paintBulkRows(){
+      bulkView.frame = 0;
+      const {list, inner, rows, pool} = bulkView;
+      inner.style.height = (rows.length * BULK_ROW_H) + 'px';
+      const first = Math.max(0, Math.floor(list.scrollTop / BULK_ROW_H) - BULK_OVERSCAN);
+      const last = Math.min(rows.length, Math.ceil((list.scrollTop + list.clientHeight) / BULK_ROW_H) + BULK_OVERSCAN);
+      while(pool.length < last - first){
+        const el = document.createElement('div'); el.className = 'vrow';
+        ['addr', 'amt', 'usd', 'next'].forEach(c=>{ const sp = document.createElement('span'); sp.className = c; el.appendChild(sp) });
+        inner.appendChild(el); pool.push(el);
+      }
+      pool.forEach((el, k)=>{
+        const r = rows[first + k];
+        if(!r || first + k >= last){ el.style.display = 'none'; el.dataset.address = ''; return }
+        el.style.display = ''; el.style.top = ((first + k) * BULK_ROW_H) + 'px';
+        if(el.dataset.address === r.address && el.dataset.index === String(first + k)) return;
+        el.dataset.address = r.address; el.dataset.index = String(first + k);
+        const [a, amt, usd, next] = el.children;
+        a.textContent = r.address; a.title = r.address;
+        if(r.error){
+          amt.textContent = r.error; amt.style.color = '#ff8a80'; usd.textContent = ''; next.textContent = '';
+        } else {
+          amt.textContent = fmt3(r.total_amount) + ' NIGHT'; amt.style.color = '';
+          usd.textContent = '$' + fmt3(r.total_usd);
+          next.textContent = r.next_date ? `next ${r.next_date} (${r.days_until}d)` : 'no pending unlock';
+        }
+      });
+    }
+
+    function showBulkTotals(t, done, total){
+      const progress = done < total ? ` — checked ${done}/${total}` : '';
+      bulkView.head.innerHTML = `<strong>${t.addresses}</strong> addresses, <strong>${fmt3(t.total_amount)}</strong> NIGHT ≈ $${fmt3(t.total_usd)}` +
+        ` (unclaimed ${fmt3(t.unclaimed_amount)}), ${t.errors} errors${progress}`;
+    }
+
+    async function applyBulkSort(){
+      const res = await window.pywebview.api.bulk_rows(bulkView.sort.value, bulkView.desc.checked);
+      if(res.error){ setStatus('Error: '+res.error); return }
+      bulkView.rows = res.rows;
+      bulkView.pool.forEach(el=>{ el.dataset.address = '' });
+      scheduleBulkPaint();
+    }
+
+    async function showBulkDetail(addr){
+      const r = await window.pywebview.api.bulk_result(addr);
+      const {detail} = bulkView;
+      detail.innerHTML = '';
+      const title = document.createElement('div'); title.style.color = '#7cc7ff'; title.style.wordBreak = 'break-all';
+      title.textContent = addr;
+      const body = document.createElement('div');
+      detail.appendChild(title); detail.appendChild(body);
+      if(r.error){ body.textContent = r.error; return }
+      renderResults(r, body);
+    }
+
+    async function runBulkCheck(addresses){
+      const gen = ++bulkGen;
+      buildBulkView();
+      setStatus(`Checking ${addresses.length} addresses...`);
+      for(let i = 0; i < addresses.length; i += BULK_CHUNK){
+        try{
+          const res = await window.pywebview.api.bulk_check(addresses.slice(i, i + BULK_CHUNK), i === 0, 8, gen);
+          if(gen !== bulkGen || res.superseded) return;
+          if(res.error){ setStatus('Error: '+res.error); return }
+          showBulkTotals(res.totals, Math.min(i + BULK_CHUNK, addresses.length), addresses.length);
+          // a sort picked while checking is kept as chunks come in
+          if(bulkView.sort.value !== 'order' || bulkView.desc.checked) await applyBulkSort();
+          else { bulkView.rows.push(...res.rows); scheduleBulkPaint() }
+        }catch(e){ setStatus('JS error: '+e); return }
+      }
+      setStatus('Done');
     }
 
     // AI Chat functions
+    // partial text of a streamed answer, pushed from Python (Api._stream_chat)
+    window.onChatDelta = function(id, text){
+        const el = document.getElementById(id);
+        if (!el) return;
+        if (!el.dataset.streaming) {
+            el.dataset.streaming = '1';
+            el.innerHTML = '<strong>AI</strong>\n';
+            el.appendChild(document.createElement('span'));
+        }
+        el.lastChild.textContent += text;
+        const container = document.getElementById('chat-content');
+        container.scrollTop = container.scrollHeight;
+    };
+
     async function callAI() {
         const input = document.getElementById('ai-input');
         const container = document.getElementById('chat-content');
@@ -730,17 +1895,24 @@ HTML = r'''
         container.innerHTML += `<div id="${loadingId}" class="msg bot"><em>Cụ chờ 1 lúc em đang suy nghĩ...</em></div>`;
 
           try {
-            // Gửi qua Python API, include recent API outputs for context and optional user API key
-            const nodes = { outputs: window.apiOutputs || {} };
+            // Gửi qua Python API; context (recent checks/charts) is kept and summarized on the Python side
+            const nodes = {};
             if(window.userApiKey) nodes.apiKey = window.userApiKey;
             // include selected endpoint if available
             nodes.endpoint = window.userApiEndpoint || (document.getElementById('modelSelect') && document.getElementById('modelSelect').value) || null;
             // also include model identifier if set
             if(window.userModel) nodes.model = window.userModel;
+            // stream the answer into the waiting bubble unless turned off
+            nodes.stream = window.userStream !== false;
+            nodes.streamId = loadingId;
             const response = await window.pywebview.api.chat_message(text, nodes);
             
-            document.getElementById(loadingId).remove();
-            if (response.reply) {
+            const bubble = document.getElementById(loadingId);
+            if (response.reply && bubble.dataset.streaming) {
+                bubble.lastChild.textContent = response.reply;
+                bubble.removeAttribute('id');
+            } else if (response.reply) {
+                bubble.remove();
                 container.innerHTML += `<div class="msg bot"><strong>AI</strong>\n${response.reply}</div>`;
             } else {
                 throw new Error(response.error);
@@ -854,8 +2026,18 @@ HTML = r'''
     }catch(e){}
 
     document.getElementById('btnCheck').addEventListener('click', checkAddress);
+    // a pasted or typed address is fetched in the background before Check is clicked
+    let prefetchTimer = null;
+    document.getElementById('address').addEventListener('input', (ev)=>{
+      clearTimeout(prefetchTimer);
+      const addr = ev.target.value.trim();
+      if(!/^addr(_test)?1[0-9a-z]{50,}$/i.test(addr)) return;
+      prefetchTimer = setTimeout(()=>{ window.pywebview.api.prefetch_addresses([addr]).catch(()=>{}) }, 300);
+    });
     document.getElementById('btnClear').addEventListener('click', ()=>{ document.getElementById('address').value=''; resultsEl.innerHTML='No results yet'; setStatus('Ready') });
     document.getElementById('btnSave').addEventListener('click', saveAddress);
+    document.getElementById('btnImport').addEventListener('click', ()=>document.getElementById('importFile').click());
+    document.getElementById('importFile').addEventListener('change', async (ev)=>{ await importAddresses(ev.target.files[0]); ev.target.value = ''; });
     document.getElementById('btnViewAll').addEventListener('click', viewAll);
     document.getElementById('btnChart').addEventListener('click', openChart);
 
@@ -887,7 +2069,16 @@ HTML = r'''
       // initialize provider selection from top controls if present, otherwise default to 'okx'
       const topProviderEl = document.getElementById('provider');
       providerSel.value = (topProviderEl && topProviderEl.value) ? topProviderEl.value : 'okx';
+      // volume-weighted composite of every exchange (Api.fetch_consolidated)
+      { const o=document.createElement('option'); o.value='all'; o.textContent='ALL (VW)'; providerSel.appendChild(o); }
       controls.appendChild(providerSel);
+      // providers registered as plugins in Python (providers.py) beyond the built-in three
+      window.pywebview.api.list_providers().then(res=>{
+        (res && res.providers || []).forEach(p=>{
+          if(Array.from(providerSel.options).some(o=>o.value===p.name)) return;
+          const o=document.createElement('option'); o.value=p.name; o.textContent=p.name.toUpperCase(); providerSel.appendChild(o);
+        });
+      }).catch(()=>{});
 
       // instrument selection: default to NIGHT-USDT when top control missing
       const topInstrEl = document.getElementById('instrument');
@@ -896,75 +2087,127 @@ HTML = r'''
       const tfSel = document.createElement('select'); tfSel.style.padding='6px'; tfSel.style.borderRadius='6px'; ['1m','5m','15m','1H','4H','1D'].forEach(t=>{const o=document.createElement('option');o.value=t;o.textContent=t; if(t==='1H') o.selected=true; tfSel.appendChild(o)});
       const topTfEl = document.getElementById('timeframe');
       tfSel.value = (topTfEl && topTfEl.value) ? topTfEl.value : '1H';
+      const indSel = document.createElement('select'); indSel.style.padding='6px'; indSel.style.borderRadius='6px';
+      [['','No indicator'],['sma:20','SMA 20'],['ema:20','EMA 20'],['bb:20:2','Bollinger 20'],['vwap','VWAP']].forEach(p=>{ const o=document.createElement('option'); o.value=p[0]; o.textContent=p[1]; indSel.appendChild(o)});
       const overlayChk = document.createElement('input'); overlayChk.type='checkbox'; overlayChk.id='chartOverlay'; const overlayLabel = document.createElement('label'); overlayLabel.style.display='flex'; overlayLabel.style.alignItems='center'; overlayLabel.style.gap='6px'; overlayLabel.appendChild(overlayChk); overlayLabel.appendChild(document.createTextNode('Overlay other'));
+      // Live = latest page from the exchange; other ranges read the local store (downsampled in Python)
+      const rangeSel = document.createElement('select'); rangeSel.style.padding='6px'; rangeSel.style.borderRadius='6px';
+      [['','Live'],['1','1D'],['7','7D'],['30','30D'],['90','90D']].forEach(p=>{ const o=document.createElement('option'); o.value=p[0]; o.textContent=p[1]; rangeSel.appendChild(o)});
+      const backfillBtn = document.createElement('button'); backfillBtn.className='btn ghost'; backfillBtn.textContent='Backfill';
       const refreshBtn = document.createElement('button'); refreshBtn.className='btn ghost'; refreshBtn.textContent='Refresh';
       const closeBtn = document.createElement('button'); closeBtn.className='btn ghost'; closeBtn.textContent='Close';
-      controls.appendChild(instrSel); controls.appendChild(tfSel); controls.appendChild(overlayLabel); controls.appendChild(refreshBtn); controls.appendChild(closeBtn);
+      controls.appendChild(instrSel); controls.appendChild(tfSel); controls.appendChild(indSel); controls.appendChild(overlayLabel); controls.appendChild(rangeSel); controls.appendChild(backfillBtn); controls.appendChild(refreshBtn); controls.appendChild(closeBtn);
 
       // status
       const chartStatus = document.createElement('div'); chartStatus.style.color='var(--muted)'; chartStatus.textContent='Ready';
 
       // canvas
-      const canvas = document.createElement('canvas'); canvas.width = Math.min(1100, window.innerWidth-160); canvas.height = 480; canvas.style.width='100%'; canvas.style.height='480px'; canvas.style.background='#071018'; canvas.style.borderRadius='8px';
+      const chartBox = document.createElement('div'); chartBox.style.width='100%'; chartBox.style.height='480px'; chartBox.style.background='#071018'; chartBox.style.borderRadius='8px'; chartBox.style.overflow='hidden';
 
-      content.appendChild(controls); content.appendChild(chartStatus); content.appendChild(canvas);
+      content.appendChild(controls); content.appendChild(chartStatus); content.appendChild(chartBox);
       chartArea.appendChild(content);
+      const renderer = createChartRenderer(chartBox);
+      // top (pointer) layer receives the mouse events
+      const canvas = renderer.canvas;
 
       // chart state for interactivity
       const chartState = {
-        data: [], instrument: instrSel.value, timeframe: tfSel.value, overlay: overlayChk.checked,
+        data: [], overlayData: null, indicators: null, instrument: instrSel.value, timeframe: tfSel.value, overlay: overlayChk.checked,
         windowStart: 0, windowSize: 80, live: true, pollId: null
       };
 
-      async function loadData(){
+      // overlay instrument shown when "Overlay other" is ticked
+      function overlayInstrument(){
+        return instrSel.value === 'NIGHT-USDT' ? 'ADA-USDT' : 'NIGHT-USDT';
+      }
+
+      // one bridge call returns the main series plus overlays aligned on ts (served from the candle cache)
+      async function fetchSeries(inst, overlays, indicators, gen){
+        const prov = providerSel.value || (document.getElementById('provider') && document.getElementById('provider').value) || 'okx';
+        return await window.pywebview.api.fetch_series(inst, tfSel.value, 500, prov, overlays, indicators || null, gen);
+      }
+
+      // true when a reply belongs to a view the user has already left
+      function staleChart(gen, res){ return gen !== chartGen || !!(res && res.superseded) }
+
+      // history mode: read the requested span from the local store, at most ~1 candle per pixel
+      async function loadRange(days, overlayInst, gen){
+        if(instrSel.value.includes('/')) throw new Error('History ranges need a single instrument');
+        const prov = providerSel.value || 'okx';
+        const startTs = Date.now() - days * 86400000;
+        const res = await window.pywebview.api.fetch_range(prov, instrSel.value, tfSel.value, startTs, null, Math.max(100, canvas.clientWidth || 800), overlayInst, gen);
+        if(staleChart(gen, res)) return null;
+        if(!res || res.error) throw new Error(res && res.error ? res.error : 'no data');
+        const data = res.main || [];
+        let overlayRows = null;
+        const pts = overlayInst ? (res.overlays || {})[overlayInst] : null;
+        if(pts && data.length){
+          // LTTB points -> the bucket they fall in, so the renderer can index them like candles
+          overlayRows = new Array(data.length).fill(null);
+          let j = 0;
+          for(const p of pts){
+            while(j + 1 < data.length && data[j + 1].ts <= p.ts) j++;
+            overlayRows[j] = p;
+          }
+        }
+        return {data: data, overlay: overlayRows};
+      }
+
+      // loads the view of generation `gen` (default: the current one); returns null,
+      // leaving chartState alone, when the user has moved on before the reply came
+      async function loadData(gen){
+        if(gen === undefined) gen = chartGen;
         try{
+          const overlayInst = overlayChk.checked ? overlayInstrument() : null;
+          let overlayRows = null, data = null, indicators = null;
+          if(rangeSel.value){
+            const r = await loadRange(Number(rangeSel.value), overlayInst, gen);
+            if(!r || staleChart(gen)) return null;
+            chartState.data = r.data; chartState.overlayData = r.overlay; chartState.indicators = null;
+            chartState.windowSize = chartState.data.length; chartState.windowStart = 0;
+            return chartState.data;
+          }
           // support synthetic pair like ADA/NIGHT -> compute ADA price divided by NIGHT price
           if(instrSel.value && instrSel.value.includes('/')){
             const parts = instrSel.value.split('/');
             const left = parts[0]; const right = parts[1];
             const leftInst = left.includes('-') ? left : (left + '-USDT');
             const rightInst = right.includes('-') ? right : (right + '-USDT');
-                  // fetch series using selected provider
-                  async function fetchSeries(inst){
-                    const prov = providerSel.value || (document.getElementById('provider') && document.getElementById('provider').value) || 'okx';
-                    if(prov === 'bybit') return await window.pywebview.api.fetch_ohlc_bybit(inst, tfSel.value, 500);
-                    if(prov === 'gate') return await window.pywebview.api.fetch_ohlc_gate(inst, tfSel.value, 500);
-                    return await window.pywebview.api.fetch_ohlc(inst, tfSel.value, 500);
-                  }
-                  const leftData = await fetchSeries(leftInst);
-                  const rightData = await fetchSeries(rightInst);
-                    // store fetched OHLC series for AI context
-                    try{ window.apiOutputs['ohlc_'+leftInst] = leftData; window.apiOutputs['ohlc_'+rightInst] = rightData }catch(e){}
-            if(!leftData || leftData.error) throw new Error('Left series error: '+(leftData && leftData.error));
+            const res = await fetchSeries(leftInst, overlayInst ? [rightInst, overlayInst] : [rightInst], null, gen);
+            if(staleChart(gen, res)) return null;
+            if(!res || res.error) throw new Error('Left series error: '+(res && res.error));
+            const leftData = res.main;
+            const rightData = (res.overlays || {})[rightInst];
             if(!rightData || rightData.error) throw new Error('Right series error: '+(rightData && rightData.error));
-            // align by most recent candles (use min length)
-            const minLen = Math.min(leftData.length, rightData.length);
-            const out = [];
-            for(let i=0;i<minLen;i++){
-              const a = leftData[leftData.length - minLen + i];
-              const b = rightData[rightData.length - minLen + i];
+            // right series is aligned on ts with the left one; skip candles missing on either side
+            const out = []; const outOverlay = [];
+            const overlayAligned = overlayInst ? (res.overlays || {})[overlayInst] : null;
+            for(let i=0;i<leftData.length;i++){
+              const a = leftData[i];
+              const b = rightData[i];
+              if(!b) continue;
               // compute ratio = left / right
               const open = (a.open && b.open) ? (a.open / b.open) : 0;
               const high = (a.high && b.low) ? (a.high / b.low) : 0;
               const low = (a.low && b.high) ? (a.low / b.high) : 0;
               const close = (a.close && b.close) ? (a.close / b.close) : 0;
-              const ts = a.ts || b.ts;
-              out.push({ts: ts, open: open, high: high, low: low, close: close, volume: 0});
+              out.push({ts: a.ts, open: open, high: high, low: low, close: close, volume: 0});
+              if(Array.isArray(overlayAligned)) outOverlay.push(overlayAligned[i]);
             }
-            chartState.data = out;
+            data = out;
+            if(Array.isArray(overlayAligned)) overlayRows = outOverlay;
           } else {
             // single instrument fetch using selected provider
-            async function fetchSeriesSingle(inst){
-              const prov = providerSel.value || (document.getElementById('provider') && document.getElementById('provider').value) || 'okx';
-              if(prov === 'bybit') return await window.pywebview.api.fetch_ohlc_bybit(inst, tfSel.value, 500);
-              if(prov === 'gate') return await window.pywebview.api.fetch_ohlc_gate(inst, tfSel.value, 500);
-              return await window.pywebview.api.fetch_ohlc(inst, tfSel.value, 500);
-            }
-            const data = await fetchSeriesSingle(instrSel.value);
-            try{ window.apiOutputs['ohlc_'+instrSel.value] = data }catch(e){}
-            if(!data || data.error) throw new Error(data && data.error ? data.error : 'no data');
-            chartState.data = data;
+            // indicators are computed in Python over the real series (not available for synthetic pairs)
+            const res = await fetchSeries(instrSel.value, overlayInst, indSel.value ? [indSel.value] : null, gen);
+            if(staleChart(gen, res)) return null;
+            if(!res || res.error) throw new Error(res && res.error ? res.error : 'no data');
+            if(res.indicators && !res.indicators.error) indicators = res.indicators;
+            data = res.main;
+            const aligned = overlayInst ? (res.overlays || {})[overlayInst] : null;
+            if(Array.isArray(aligned)) overlayRows = aligned;
           }
+          chartState.data = data; chartState.overlayData = overlayRows; chartState.indicators = indicators;
           // default window: most recent N candles
           chartState.windowSize = Math.min(120, chartState.data.length || 120);
           chartState.windowStart = Math.max(0, chartState.data.length - chartState.windowSize);
@@ -975,33 +2218,62 @@ HTML = r'''
       async function draw(){
         try{
           const data = chartState.data || [];
-          // slice window
+          // window over the full series; overlay and indicators are aligned index-for-index with data
           const start = Math.max(0, Math.min(chartState.windowStart, Math.max(0, data.length - 1)));
           const end = Math.min(data.length, start + chartState.windowSize);
-          const slice = data.slice(start, end);
-          await renderChart(slice, canvas, instrSel.value, overlayChk.checked, tfSel.value);
-          // expose last slice for tooltip/pointer handlers
-          canvas._lastSlice = slice;
+          const overlay = (overlayChk.checked && chartState.overlayData) ? chartState.overlayData : null;
+          renderer.render(data, start, end, overlay, chartState.indicators, tfSel.value);
         }catch(e){ console.error('Draw error', e); }
       }
 
+      // pan/zoom events arrive faster than the screen refreshes; draw at most once per frame
+      let drawFrame = 0;
+      function scheduleDraw(){ if(!drawFrame) drawFrame = requestAnimationFrame(()=>{ drawFrame = 0; draw(); }) }
+
+      async function runBackfill(){
+        if(instrSel.value.includes('/')){ chartStatus.textContent = 'Backfill needs a single instrument'; return }
+        const days = Number(rangeSel.value || 7);
+        chartStatus.textContent = 'Backfilling ' + days + 'D of ' + instrSel.value + ' ' + tfSel.value + '...';
+        const res = await window.pywebview.api.backfill_candles(providerSel.value || 'okx', instrSel.value, tfSel.value, days, 4);
+        if(!res || res.error){ chartStatus.textContent = 'Backfill error: ' + (res && res.error); return }
+        if(!rangeSel.value) rangeSel.value = String(days);
+        await refreshOnce();
+        chartStatus.textContent = 'Backfill: +' + res.added + ' candles (' + res.count + ' stored)';
+      }
+
+      // per-exchange spread of the latest consolidated candle, e.g. ' | OKX +3.1bp, GATE -2.4bp'
+      function spreadText(){
+        const last = chartState.data && chartState.data[chartState.data.length-1];
+        if(!last || !last.spread_bps) return '';
+        return ' | ' + Object.entries(last.spread_bps).map(([p,b])=>p.toUpperCase()+' '+(b>0?'+':'')+b+'bp').join(', ');
+      }
+
+      // a new view: older chart requests still running in Python are dropped
+      function nextChartGen(){
+        chartGen++;
+        window.pywebview.api.cancel_requests('chart', chartGen).catch(()=>{});
+        return chartGen;
+      }
+
       async function refreshOnce(){
+        const gen = nextChartGen();
         chartStatus.textContent = 'Loading ' + instrSel.value + ' ' + tfSel.value + '...';
         try{
-          await loadData();
+          if(!(await loadData(gen))) return;
           chartStatus.textContent = 'Rendering...';
           await draw();
-          chartStatus.textContent = 'Last update: ' + new Date().toLocaleString();
-        }catch(e){ chartStatus.textContent = 'Chart error: '+(e && e.message ? e.message : e); }
+          chartStatus.textContent = 'Last update: ' + new Date().toLocaleString() + spreadText();
+        }catch(e){ if(gen === chartGen) chartStatus.textContent = 'Chart error: '+(e && e.message ? e.message : e); }
       }
 
       // live poll every 30s when live mode on
       function startPolling(){
         if(chartState.pollId) clearInterval(chartState.pollId);
         chartState.pollId = setInterval(async ()=>{
+          if(rangeSel.value) return;  // stored history does not change between polls
           try{
             // Use loadData() so synthetic pairs (X/Y) are handled correctly
-            try{ await loadData(); }catch(err){ console.error('Poll loadData error', err); return; }
+            try{ if(!(await loadData())) return; }catch(err){ console.error('Poll loadData error', err); return; }
             if(chartState.data && !chartState.data.error){
               // if live, keep view at most recent
               if(chartState.live) chartState.windowStart = Math.max(0, chartState.data.length - chartState.windowSize);
@@ -1014,10 +2286,14 @@ HTML = r'''
       }
 
       refreshBtn.addEventListener('click', async ()=>{ chartState.live = true; await refreshOnce(); });
-      closeBtn.addEventListener('click', ()=>{ if(chartState.pollId) clearInterval(chartState.pollId); chartArea.style.display='none'; chartArea.innerHTML=''; setStatus('Ready'); });
+      closeBtn.addEventListener('click', ()=>{ if(chartState.pollId) clearInterval(chartState.pollId); nextChartGen(); chartArea.style.display='none'; chartArea.innerHTML=''; setStatus('Ready'); });
       instrSel.addEventListener('change', async ()=>{ chartState.instrument = instrSel.value; await refreshOnce(); });
       providerSel.addEventListener('change', async ()=>{ chartState.instrument = instrSel.value; await refreshOnce(); });
       tfSel.addEventListener('change', async ()=>{ chartState.timeframe = tfSel.value; await refreshOnce(); });
+      indSel.addEventListener('change', async ()=>{ await refreshOnce(); });
+      rangeSel.addEventListener('change', async ()=>{ chartState.live = !rangeSel.value; await refreshOnce(); });
+      backfillBtn.addEventListener('click', runBackfill);
+      overlayChk.addEventListener('change', async ()=>{ chartState.overlay = overlayChk.checked; await refreshOnce(); });
 
       // interactive zoom/pan handlers
       let isPanning = false, panStartX = 0, panStartWindow = 0;
@@ -1026,10 +2302,10 @@ HTML = r'''
       canvas.addEventListener('mousemove', (ev)=>{
         if(!isPanning) return;
         const dx = ev.clientX - panStartX;
-        const cssW = canvas.clientWidth; const pad = 50; const w = cssW - pad*2;
+        const {w} = renderer.layout();
         const deltaIndex = Math.round((dx / w) * chartState.windowSize);
         chartState.windowStart = Math.max(0, Math.min(Math.max(0, chartState.data.length - 1), panStartWindow - deltaIndex));
-        draw();
+        scheduleDraw();
       });
 
       // wheel zoom centered at mouse
@@ -1038,7 +2314,7 @@ HTML = r'''
         const delta = ev.deltaY > 0 ? 1.15 : 0.85; // zoom out/in
         const rect = canvas.getBoundingClientRect();
         const mouseX = ev.clientX - rect.left;
-        const cssW = canvas.clientWidth; const pad = 50; const w = cssW - pad*2;
+        const {pad, w} = renderer.layout();
         const rel = Math.max(0, Math.min(1, (mouseX - pad) / w));
         const anchor = Math.floor(chartState.windowStart + rel * chartState.windowSize);
         const newSize = Math.max(6, Math.min(chartState.data.length, Math.round(chartState.windowSize * delta)));
@@ -1046,7 +2322,7 @@ HTML = r'''
         chartState.windowSize = newSize;
         chartState.windowStart = Math.max(0, Math.min(Math.max(0, chartState.data.length - newSize), newStart));
         chartState.live = false;
-        draw();
+        scheduleDraw();
       }, {passive:false});
 
       canvas.addEventListener('dblclick', async ()=>{ chartState.live = true; await refreshOnce(); });
@@ -1056,152 +2332,277 @@ HTML = r'''
       tooltip.style.position='absolute'; tooltip.style.pointerEvents='none'; tooltip.style.background='rgba(2,10,20,0.95)'; tooltip.style.color='#cfeaff'; tooltip.style.padding='8px'; tooltip.style.borderRadius='6px'; tooltip.style.fontSize='12px'; tooltip.style.display='none'; tooltip.style.zIndex=10000;
       content.style.position = 'relative'; content.appendChild(tooltip);
 
-      // pointer tooltip handlers
+      // pointer tooltip handlers: crosshair on the pointer layer, candles and grid are left alone
       canvas.addEventListener('mousemove', (ev)=>{
-        const slice = canvas._lastSlice;
-        if(!slice || !slice.length) { tooltip.style.display='none'; return }
         const rect = canvas.getBoundingClientRect();
-        const mouseX = ev.clientX - rect.left;
-        const cssW = canvas.clientWidth; const pad = 60; const w = cssW - pad*2;
-        const rel = Math.max(0, Math.min(1, (mouseX - pad) / w));
-        const idx = Math.max(0, Math.min(slice.length-1, Math.round(rel * (slice.length-1))));
-        const d = slice[idx];
+        const mouseX = ev.clientX - rect.left, mouseY = ev.clientY - rect.top;
+        const d = renderer.pointer(mouseX, mouseY);
         if(!d) { tooltip.style.display='none'; return }
-        // format time based on timeframe
-        const ts = (d.ts && d.ts > 1e12) ? d.ts : (d.ts ? d.ts*1000 : Date.now());
-        const dt = new Date(ts);
-        const tf = (tfSel && tfSel.value) || document.getElementById('timeframe').value || '1H';
-        let timeStr = '';
-        if(tf.toLowerCase().includes('m')){
-          timeStr = dt.toLocaleTimeString([], {hour:'2-digit', minute:'2-digit'});
-        } else if(tf.toUpperCase().includes('H')){
-          timeStr = dt.toLocaleString([], {month:'2-digit', day:'2-digit', hour:'2-digit'});
-        } else {
-          timeStr = dt.toLocaleDateString();
-        }
+        const timeStr = timeLabel(d.ts || 0, (tfSel && tfSel.value) || '1H');
         tooltip.innerHTML = `<div style="font-weight:700">${timeStr}</div>` +
           `<div>O: ${Number(d.open).toFixed(3)} H: ${Number(d.high).toFixed(3)} L: ${Number(d.low).toFixed(3)} C: ${Number(d.close).toFixed(3)}</div>`;
         tooltip.style.left = Math.min(rect.width - 160, mouseX + 12) + 'px';
-        tooltip.style.top = Math.max(8, ev.clientY - rect.top + 12) + 'px';
+        tooltip.style.top = Math.max(8, mouseY + 12) + 'px';
         tooltip.style.display = 'block';
       });
-      canvas.addEventListener('mouseleave', ()=>{ tooltip.style.display='none'; });
+      canvas.addEventListener('mouseleave', ()=>{ tooltip.style.display='none'; renderer.clearPointer(); });
 
       // initial load and start polling
       (async ()=>{ await refreshOnce(); startPolling(); })();
       setStatus('Chart opened');
     }
 
-    async function renderChart(data, canvas, instrument, overlay, timeframe){
-      // draw candlestick chart into given canvas
-      const ctx = canvas.getContext('2d');
-      if(!data || !data.length){ ctx.clearRect(0,0,canvas.width,canvas.height); ctx.fillStyle='#98a0a6'; ctx.fillText('No chart data', 20,20); return }
-
-      const closes = data.map(d=>d.close);
-      const highs = data.map(d=>d.high);
-      const lows = data.map(d=>d.low);
-      const opens = data.map(d=>d.open);
-
-      // compute size based on CSS width (canvas scaled)
-      const DPR = window.devicePixelRatio || 1;
-      const cssW = canvas.clientWidth;
-      const cssH = canvas.clientHeight;
-      canvas.width = Math.floor(cssW * DPR);
-      canvas.height = Math.floor(cssH * DPR);
-      ctx.scale(DPR, DPR);
-
-      const max = Math.max(...highs), min = Math.min(...lows);
-      const pad = 60;
-      const w = cssW - pad*2, h = cssH - pad*2;
-      ctx.clearRect(0,0,cssW,cssH);
-
-      // background grid
-      ctx.fillStyle = '#071018'; ctx.fillRect(0,0,cssW,cssH);
-      ctx.strokeStyle = 'rgba(255,255,255,0.03)'; ctx.lineWidth=1;
-      for(let i=0;i<5;i++){ const y=pad + (i/4)*h; ctx.beginPath(); ctx.moveTo(pad,y); ctx.lineTo(pad+w,y); ctx.stroke(); }
-
-      // axes labels (Y axis)
-      ctx.fillStyle='#98a0a6'; ctx.font='12px Inter, Arial'; ctx.textAlign='left';
-      const yTicks = 5;
-      for(let yi=0; yi<yTicks; yi++){
-        const v = max - (yi/(yTicks-1))*(max-min);
-        const y = pad + (yi/(yTicks-1))*h;
-        ctx.fillText(v.toFixed(3), 8, y+4);
+    // max/min over any index range in O(1) (sparse table). Built once per series; a poll that only
+    // changes the last candles rewrites just the entries covering them.
+    function rangeTable(hi, lo){
+      const n = hi.length;
+      const maxT = [Float64Array.from(hi)], minT = [Float64Array.from(lo)];
+      for(let k = 1; (1 << k) <= n; k++){ maxT.push(new Float64Array(n - (1 << k) + 1)); minT.push(new Float64Array(n - (1 << k) + 1)); }
+      function fill(from){
+        for(let k = 1; k < maxT.length; k++){
+          const ph = maxT[k-1], pl = minT[k-1], th = maxT[k], tl = minT[k], half = 1 << (k-1);
+          for(let i = Math.max(0, from - (1 << k) + 1); i < th.length; i++){
+            th[i] = ph[i] > ph[i+half] ? ph[i] : ph[i+half];
+            tl[i] = pl[i] < pl[i+half] ? pl[i] : pl[i+half];
+          }
+        }
       }
+      fill(0);
+      return {
+        length: n,
+        // values from index `from` on changed
+        update(from, hiVals, loVals){
+          for(let i = from; i < n; i++){ maxT[0][i] = hiVals[i]; minT[0][i] = loVals[i]; }
+          fill(from);
+        },
+        // [min, max] over [a, b)
+        query(a, b){
+          if(b <= a) return [Infinity, -Infinity];
+          const k = 31 - Math.clz32(b - a), j = b - (1 << k);
+          return [Math.min(minT[k][a], minT[k][j]), Math.max(maxT[k][a], maxT[k][j])];
+        }
+      };
+    }
+
+    function sameCandle(a, b){
+      return a === b || (!!a && !!b && a.ts === b.ts && a.open === b.open && a.high === b.high && a.low === b.low && a.close === b.close);
+    }
 
-      // draw candlesticks
-      const n = data.length;
-      const candleW = Math.max(2, Math.floor(w / n * 0.7));
-      for(let i=0;i<n;i++){
-        const x = pad + (i/(n-1))*w;
-        const o = opens[i], hVal = highs[i], lVal = lows[i], c = closes[i];
-        const yO = pad + ((max - o)/(max-min || 1))*h;
-        const yH = pad + ((max - hVal)/(max-min || 1))*h;
-        const yL = pad + ((max - lVal)/(max-min || 1))*h;
-        const yC = pad + ((max - c)/(max-min || 1))*h;
-        // wick
-        ctx.strokeStyle = 'rgba(200,200,200,0.25)'; ctx.lineWidth=1; ctx.beginPath(); ctx.moveTo(x, yH); ctx.lineTo(x, yL); ctx.stroke();
-        // body
-        const top = Math.min(yO,yC), bottom = Math.max(yO,yC);
-        ctx.fillStyle = c >= o ? '#28a745' : '#dc3545';
-        ctx.fillRect(x - candleW/2, top, candleW, Math.max(1, bottom-top));
+    function timeLabel(ts, timeframe){
+      const dt = new Date((ts > 1e12) ? ts : (ts ? ts*1000 : Date.now()));
+      const tf = timeframe || '1H';
+      if(tf.toLowerCase().includes('m')) return dt.toLocaleTimeString([], {hour:'2-digit', minute:'2-digit'});
+      if(tf.toUpperCase().includes('H')) return dt.toLocaleString([], {month:'2-digit', day:'2-digit', hour:'2-digit'});
+      return dt.toLocaleDateString();
+    }
+
+    // Chart drawn on three stacked canvases:
+    //   grid    - background, grid lines and axis labels; redrawn only when size, price scale or x labels change
+    //   candles - candles, indicator lines and the overlay; a poll that only moves the last candles
+    //             repaints just their columns, pan/zoom repaints the layer without reallocating it
+    //   pointer - crosshair only, cleared and redrawn on every mouse move
+    // Canvases are resized only when the box size or devicePixelRatio changes.
+    function createChartRenderer(host){
+      const PAD = 60;
+      const IND_COLORS = ['#ffd166','#c792ea','#ffd166','#80cbc4'];
+      host.style.position = 'relative';
+      const layers = ['grid', 'candles', 'pointer'].map(()=>{
+        const c = document.createElement('canvas');
+        c.style.position = 'absolute'; c.style.left = '0'; c.style.top = '0'; c.style.width = '100%'; c.style.height = '100%';
+        host.appendChild(c);
+        return c;
+      });
+      const [gridCtx, candleCtx, pointerCtx] = layers.map(c=>c.getContext('2d'));
+      const st = {cssW: 0, cssH: 0, dpr: 0, gridKey: '', drawn: null, table: null, tableSrc: null, oTable: null, oSrc: null};
+
+      function resize(){
+        const dpr = window.devicePixelRatio || 1, cssW = host.clientWidth, cssH = host.clientHeight;
+        if(cssW === st.cssW && cssH === st.cssH && dpr === st.dpr) return false;
+        Object.assign(st, {cssW, cssH, dpr, gridKey: ''});
+        layers.forEach((c, i)=>{
+          c.width = Math.floor(cssW * dpr); c.height = Math.floor(cssH * dpr);
+          [gridCtx, candleCtx, pointerCtx][i].setTransform(dpr, 0, 0, dpr, 0, 0);
+        });
+        return true;
       }
 
-      // X axis labels (dates) based on timeframe
-      const ts = data.map(d=>d.ts || 0);
-      const ticks = Math.min(6, Math.max(2, Math.floor(n/5)) );
-      const tickCount = 6;
-      ctx.textAlign='center'; ctx.fillStyle='#98a0a6'; ctx.font='12px Inter, Arial';
-      for(let ti=0; ti<tickCount; ti++){
-        const idx = Math.floor(ti*(n-1)/(tickCount-1));
-        const t = ts[idx] || 0;
-        const tms = (t>1e12) ? t : (t? t*1000 : Date.now());
-        const dt = new Date(tms);
-        let label = '';
-        const tf = (timeframe || document.getElementById('timeframe').value || '1H');
-        if(tf.toLowerCase().includes('m')){
-          label = dt.toLocaleTimeString([], {hour:'2-digit', minute:'2-digit'});
-        } else if(tf.toUpperCase().includes('H')){
-          label = dt.toLocaleString([], {month:'2-digit', day:'2-digit', hour:'2-digit'});
-        } else {
-          label = dt.toLocaleDateString();
+      function layout(){ return {pad: PAD, w: st.cssW - PAD*2, h: st.cssH - PAD*2} }
+
+      function indicatorKeys(indicators){ return indicators ? Object.keys(indicators).filter(k=>!k.startsWith('rsi')) : [] }
+
+      function extremes(data, indicators){
+        const keys = indicatorKeys(indicators), n = data.length;
+        const hi = new Float64Array(n), lo = new Float64Array(n);
+        for(let i = 0; i < n; i++){
+          let h = data[i].high, l = data[i].low;
+          for(const k of keys){ const v = indicators[k][i]; if(v != null){ if(v > h) h = v; if(v < l) l = v; } }
+          hi[i] = h; lo[i] = l;
         }
-        const x = pad + (idx/(n-1))*w;
-        ctx.fillText(label, x, pad + h + 18);
+        return [hi, lo];
       }
 
-      // overlay other instrument if requested
-      if(overlay){
-        const other = instrument === 'NIGHT-USDT' ? 'ADA-USDT' : 'NIGHT-USDT';
-        try{
-            // determine provider (prefer local providerSel if present, otherwise top control)
-            const topProvider = (document.getElementById('provider') && document.getElementById('provider').value) ? document.getElementById('provider').value : null;
-            const prov = (typeof providerSel !== 'undefined' && providerSel && providerSel.value) ? providerSel.value : (topProvider || 'okx');
-            const tfVal = (timeframe || (document.getElementById('timeframe') && document.getElementById('timeframe').value) || '1H');
-            // fetch overlay using selected provider
-            let otherData = null;
-            if(prov === 'bybit'){
-              otherData = await window.pywebview.api.fetch_ohlc_bybit(other, tfVal, data.length);
-            } else if(prov === 'gate'){
-              otherData = await window.pywebview.api.fetch_ohlc_gate(other, tfVal, data.length);
-            } else {
-              otherData = await window.pywebview.api.fetch_ohlc(other, tfVal, data.length);
-            }
-            if(otherData && !otherData.error){
-            try{ window.apiOutputs['overlay_'+other] = otherData }catch(e){}
-            const otherCloses = otherData.map(d=>d.close);
-            const oMax = Math.max(...otherCloses), oMin = Math.min(...otherCloses);
-            ctx.beginPath(); ctx.strokeStyle='#7cc7ff'; ctx.lineWidth=1.5;
-            for(let i=0;i<otherCloses.length;i++){
-              const v = otherCloses[i];
-              const x = pad + (i/(otherCloses.length-1))*w;
-              const y = pad + ((oMax - v)/(oMax - oMin || 1))*h;
-              if(i===0) ctx.moveTo(x,y); else ctx.lineTo(x,y);
-            }
-            ctx.stroke();
+      // keep the range tables in step with the series; only the changed tail is rewritten when possible
+      function syncTables(data, indicators, overlay){
+        const prev = st.tableSrc;
+        if(!prev || prev.data !== data || prev.indicators !== indicators){
+          const [hi, lo] = extremes(data, indicators);
+          let from = -1;
+          if(prev && st.table && st.table.length === data.length && data.length && sameCandle(prev.data[0], data[0])
+             && indicatorKeys(prev.indicators).join() === indicatorKeys(indicators).join()){
+            from = data.length;
+            while(from > 0 && !(sameCandle(prev.data[from-1], data[from-1]) && prev.hi[from-1] === hi[from-1] && prev.lo[from-1] === lo[from-1])) from--;
           }
-        }catch(e){ console.error('Overlay error', e) }
+          if(from >= 0 && from < data.length - 8) from = -1;  // more than a tail changed
+          if(from < 0) st.table = rangeTable(hi, lo);
+          else if(from < data.length) st.table.update(from, hi, lo);
+          st.tableSrc = {data, indicators, hi, lo};
+        }
+        if(st.oSrc !== overlay){
+          st.oTable = overlay ? rangeTable(overlay.map(d=>d ? d.close : -Infinity), overlay.map(d=>d ? d.close : Infinity)) : null;
+          st.oSrc = overlay;
+        }
       }
+
+      function drawGrid(v){
+        const {pad, w, h} = layout(), ctx = gridCtx;
+        ctx.clearRect(0, 0, st.cssW, st.cssH);
+        ctx.fillStyle = '#071018'; ctx.fillRect(0, 0, st.cssW, st.cssH);
+        ctx.strokeStyle = 'rgba(255,255,255,0.03)'; ctx.lineWidth = 1;
+        ctx.beginPath();
+        for(let i = 0; i < 5; i++){ const y = pad + (i/4)*h; ctx.moveTo(pad, y); ctx.lineTo(pad + w, y); }
+        ctx.stroke();
+        if(!v) return;
+        ctx.fillStyle = '#98a0a6'; ctx.font = '12px Inter, Arial'; ctx.textAlign = 'left';
+        for(let yi = 0; yi < 5; yi++) ctx.fillText((v.max - (yi/4)*(v.max - v.min)).toFixed(3), 8, pad + (yi/4)*h + 4);
+        ctx.textAlign = 'center';
+        const n = v.end - v.start;
+        for(let ti = 0; ti < 6; ti++){
+          const idx = Math.floor(ti*(n-1)/5);
+          ctx.fillText(timeLabel(v.data[v.start + idx].ts || 0, v.timeframe), v.x(v.start + idx), pad + h + 18);
+        }
+      }
+
+      // candles and lines of absolute indexes [a, b) of the view
+      function drawSeries(v, a, b){
+        const ctx = candleCtx, {pad, h} = layout(), data = v.data;
+        a = Math.max(v.start, a); b = Math.min(v.end, b);
+        const y = p=>pad + ((v.max - p)/(v.max - v.min || 1))*h;
+        const candleW = Math.max(2, Math.floor(v.step * 0.7));
+        ctx.strokeStyle = 'rgba(200,200,200,0.25)'; ctx.lineWidth = 1;
+        ctx.beginPath();
+        for(let i = a; i < b; i++){ const x = v.x(i); ctx.moveTo(x, y(data[i].high)); ctx.lineTo(x, y(data[i].low)); }
+        ctx.stroke();
+        for(const up of [true, false]){
+          ctx.fillStyle = up ? '#28a745' : '#dc3545';
+          ctx.beginPath();
+          for(let i = a; i < b; i++){
+            const d = data[i];
+            if((d.close >= d.open) !== up) continue;
+            const yO = y(d.open), yC = y(d.close);
+            ctx.rect(v.x(i) - candleW/2, Math.min(yO, yC), candleW, Math.max(1, Math.abs(yC - yO)));
+          }
+          ctx.fill();
+        }
+        // lines also take the segment into the range from its left neighbour
+        const la = Math.max(v.start, a - 1);
+        indicatorKeys(v.indicators).forEach((k, ki)=>{
+          const vals = v.indicators[k];
+          ctx.beginPath(); ctx.strokeStyle = k.endsWith('_mid') ? '#c792ea' : IND_COLORS[ki % IND_COLORS.length]; ctx.lineWidth = 1.2;
+          let started = false;
+          for(let i = la; i < b; i++){
+            const val = vals[i];
+            if(val == null){ started = false; continue; }
+            if(!started){ ctx.moveTo(v.x(i), y(val)); started = true; } else ctx.lineTo(v.x(i), y(val));
+          }
+          ctx.stroke();
+        });
+        if(v.overlay && v.oMax >= v.oMin){
+          const oy = p=>pad + ((v.oMax - p)/(v.oMax - v.oMin || 1))*h;
+          ctx.beginPath(); ctx.strokeStyle = '#7cc7ff'; ctx.lineWidth = 1.5;
+          let started = false;
+          for(let i = la; i < b; i++){
+            const d = v.overlay[i];
+            if(!d) continue;
+            if(!started){ ctx.moveTo(v.x(i), oy(d.close)); started = true; } else ctx.lineTo(v.x(i), oy(d.close));
+          }
+          ctx.stroke();
+        }
+      }
+
+      // first and last index in the view whose candle, indicator or overlay value differs from what is on screen
+      function dirtyRange(prev, v){
+        let lo = -1, hi = -1;
+        const keys = indicatorKeys(v.indicators);
+        for(let i = v.start; i < v.end; i++){
+          let same = sameCandle(prev.data[i], v.data[i]);
+          for(let k = 0; same && k < keys.length; k++) same = prev.indicators[keys[k]][i] === v.indicators[keys[k]][i];
+          if(same && v.overlay) same = sameCandle(prev.overlay[i], v.overlay[i]);
+          if(!same){ if(lo < 0) lo = i; hi = i; }
+        }
+        return lo < 0 ? null : [lo, hi];
+      }
+
+      function render(data, start, end, overlay, indicators, timeframe){
+        const resized = resize();
+        const prev = st.drawn;
+        if(!data || !data.length || end <= start){
+          [gridCtx, candleCtx, pointerCtx].forEach(ctx=>ctx.clearRect(0, 0, st.cssW, st.cssH));
+          drawGrid(null); st.gridKey = '';
+          gridCtx.fillStyle = '#98a0a6'; gridCtx.fillText('No chart data', 20, 20);
+          st.drawn = null;
+          return;
+        }
+        overlay = overlay || null; indicators = indicators || null;
+        syncTables(data, indicators, overlay);
+        const [min, max] = st.table.query(start, end);
+        const [oMin, oMax] = st.oTable ? st.oTable.query(start, end) : [Infinity, -Infinity];
+        const {pad, w} = layout();
+        const step = w / Math.max(1, end - start - 1);
+        const v = {data, start, end, overlay, indicators, timeframe, min, max, oMin, oMax, step, x: i=>pad + (i - start)*step};
+
+        const gridKey = [st.cssW, st.cssH, min, max, data[start].ts, data[end-1].ts, end - start, timeframe].join('|');
+        if(gridKey !== st.gridKey){ drawGrid(v); st.gridKey = gridKey; }
+
+        const comparable = !resized && prev && prev.start === start && prev.end === end && prev.min === min && prev.max === max
+          && prev.oMin === oMin && prev.oMax === oMax && !!prev.overlay === !!overlay
+          && indicatorKeys(prev.indicators).join() === indicatorKeys(indicators).join();
+        if(comparable){
+          const dirty = (prev.data === data && prev.indicators === indicators && prev.overlay === overlay) ? null : dirtyRange(prev, v);
+          if(dirty){
+            // repaint only the columns of the changed candles (plus neighbours for wicks/line joins)
+            const left = Math.floor(v.x(Math.max(start, dirty[0] - 1))), right = Math.ceil(v.x(Math.min(end - 1, dirty[1] + 1)));
+            candleCtx.save();
+            candleCtx.beginPath(); candleCtx.rect(left, 0, right - left, st.cssH); candleCtx.clip();
+            candleCtx.clearRect(left, 0, right - left, st.cssH);
+            drawSeries(v, dirty[0] - 2, dirty[1] + 3);
+            candleCtx.restore();
+          }
+        } else {
+          candleCtx.clearRect(0, 0, st.cssW, st.cssH);
+          drawSeries(v, start, end);
+        }
+        st.drawn = v;
+      }
+
+      // crosshair at the candle nearest to css x/y; returns that candle (or null)
+      function pointer(mx, my){
+        pointerCtx.clearRect(0, 0, st.cssW, st.cssH);
+        const v = st.drawn;
+        if(!v) return null;
+        const {pad, h} = layout();
+        const i = Math.max(v.start, Math.min(v.end - 1, v.start + Math.round((mx - pad) / v.step)));
+        const x = Math.round(v.x(i)) + 0.5;
+        pointerCtx.strokeStyle = 'rgba(124,199,255,0.35)'; pointerCtx.lineWidth = 1;
+        pointerCtx.beginPath();
+        pointerCtx.moveTo(x, pad); pointerCtx.lineTo(x, pad + h);
+        if(my >= pad && my <= pad + h){ pointerCtx.moveTo(pad, Math.round(my) + 0.5); pointerCtx.lineTo(st.cssW - pad, Math.round(my) + 0.5); }
+        pointerCtx.stroke();
+        return v.data[i];
+      }
+
+      function clearPointer(){ pointerCtx.clearRect(0, 0, st.cssW, st.cssH) }
+
+      return {canvas: layers[2], render, pointer, clearPointer, layout};
     }
 
   </script>
@@ -1216,9 +2617,93 @@ def start():
         return
 
     api = Api()
-    webview.create_window('NIGHT Schedule', html=HTML, js_api=api, width=1000, height=760)
+    api._window = webview.create_window('NIGHT Schedule', html=HTML, js_api=api, width=1000, height=760)
+    # the header shows the price as soon as the page asks for it
+    api.prefetch_price()
     webview.start()
 
 
+def run_batch_cli(argv: Optional[List[str]] = None) -> int:
+    """Command line entry for batch jobs, e.g. one shard per process or machine:
+
+      python night_claim_management.py batch create sweep addresses.txt
+      python night_claim_management.py batch run sweep --shard 0/4 --threads 16
+      python night_claim_management.py batch status sweep
+    """
+    parser = argparse.ArgumentParser(prog='night_claim_management.py batch')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_create = sub.add_parser('create', help='create a job from a file with one address per line')
+    p_create.add_argument('job_id')
+    p_create.add_argument('file')
+    p_create.add_argument('--kind', default='check')
+    p_run = sub.add_parser('run', help='run (or resume) a job or one shard of it')
+    p_run.add_argument('job_id')
+    p_run.add_argument('--shard', default='0/1', help='i/N: take shard i of N')
+    p_run.add_argument('--threads', type=int, default=8)
+    p_status = sub.add_parser('status')
+    p_status.add_argument('job_id')
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'create':
+        lines, fmt = read_source(path=args.file)
+        with lines:
+            valid, invalid = split_valid(a for _, a in import_stream(lines, fmt))
+        job = BatchJob.create(valid, kind=args.kind, job_id=args.job_id)
+        print(json.dumps(dict(job.status(), invalid=len(invalid))))
+        for item in invalid[:20]:
+            print(f"invalid: {item['value']} ({item['error']})", file=sys.stderr)
+        return 0
+    job = BatchJob.open(args.job_id)
+    if args.cmd == 'status':
+        print(json.dumps(job.status()))
+        return 0
+    shard, _, count = args.shard.partition('/')
+    api = Api()
+    started = time.perf_counter()
+    summary = job.run(api._batch_worker(job.kind), shard=int(shard), shard_count=int(count or 1),
+                      threads=args.threads)
+    summary['elapsed_s'] = round(time.perf_counter() - started, 3)
+    if CASSETTE is not None:
+        summary['cassette'] = dict(CASSETTE.stats, mode=CASSETTE.mode)
+    print(json.dumps(summary))
+    return 0
+
+
+def run_serve_cli(argv: Optional[List[str]] = None) -> int:
+    """Headless mode: serve the Api over local HTTP/JSON (see service.py), e.g.
+
+      python night_claim_management.py serve --port 8787
+    """
+    parser = argparse.ArgumentParser(prog='night_claim_management.py serve')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--check-ttl', type=float, default=60.0,
+                        help='seconds a schedule check is shared between clients')
+    args = parser.parse_args(argv)
+
+    def upstream() -> Dict[str, Any]:
+        with _upstream_lock:
+            return dict(UPSTREAM_CALLS)
+
+    service = NightService(Api(), get_night_price, TTLCache(ttl=args.check_ttl, max_entries=10_000), upstream)
+    server = make_server(service, args.host, args.port)
+    print(f'serving on http://{args.host}:{server.server_address[1]}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
 if __name__ == '__main__':
+    if CASSETTE_ERROR:
+        # a run asked to replay (or record) must not silently hit the network instead
+        print(f'error: {CASSETTE_ERROR}', file=sys.stderr)
+        sys.exit(2)
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        sys.exit(run_batch_cli(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        sys.exit(run_serve_cli(sys.argv[2:]))
     start()
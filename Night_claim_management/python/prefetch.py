@@ -0,0 +1,118 @@
+"""
+Low-priority background work that warms caches ahead of user actions.
+
+Tasks are keyed; submitting a key that is already queued does nothing, and
+`cancel()` drops everything still waiting (the view it was queued for is
+gone). The newest submissions run first, since they belong to what is on
+screen now. Workers start a task only when no foreground request is in
+flight (`foreground()` marks one) and after taking a token from their own
+rate limiter, so prefetching never competes with a click for bandwidth or
+upstream quota. A task that is already running finishes and fills the
+cache; its result is simply not waited for.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+from rate_limit import RateLimiter
+
+
+class PrefetchQueue:
+    def __init__(self, limiter: RateLimiter, workers: int = 2):
+        self.limiter = limiter
+        self.workers = max(1, int(workers))
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        # key -> task, newest last
+        self._pending: 'OrderedDict[Hashable, Callable[[], Any]]' = OrderedDict()
+        self._running: set = set()
+        self._foreground = 0
+        # bumped by cancel(); a task taken before the cancel is dropped if it has not started
+        self._generation = 0
+        self._idle = threading.Event()
+        self._idle.set()
+        self._threads: list = []
+        self.stats = {'submitted': 0, 'done': 0, 'failed': 0, 'cancelled': 0}
+
+    def _ensure_workers(self) -> None:
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._work, name='prefetch', daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, key: Hashable, task: Callable[[], Any]) -> bool:
+        """Queue `task` under `key`; False when that key is already queued or running."""
+        with self._lock:
+            if key in self._pending or key in self._running:
+                return False
+            self._pending[key] = task
+            self.stats['submitted'] += 1
+            self._ensure_workers()
+            self._wake.notify()
+        return True
+
+    def cancel(self) -> int:
+        """Drop every task that has not started; returns how many were dropped."""
+        with self._lock:
+            n = len(self._pending)
+            self._pending.clear()
+            self._generation += 1
+            self.stats['cancelled'] += n
+        return n
+
+    @contextmanager
+    def foreground(self) -> Iterator[None]:
+        """Mark a user-facing request; workers hold off starting tasks until it is done."""
+        with self._lock:
+            self._foreground += 1
+            self._idle.clear()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._foreground -= 1
+                if not self._foreground:
+                    self._idle.set()
+
+    def _take(self) -> Optional[tuple]:
+        with self._lock:
+            while not self._pending:
+                if not self._wake.wait(timeout=30):
+                    return None  # idle worker exits; submit() starts a new one
+            key, task = self._pending.popitem(last=True)
+            self._running.add(key)
+            return key, task, self._generation
+
+    def _work(self) -> None:
+        while True:
+            item = self._take()
+            if item is None:
+                with self._lock:
+                    if not self._pending:
+                        self._threads = [t for t in self._threads if t is not threading.current_thread()]
+                        return
+                continue
+            key, task, generation = item
+            self._idle.wait()
+            self.limiter.acquire()
+            self._idle.wait()
+            if generation != self._generation:
+                outcome = 'cancelled'
+            else:
+                try:
+                    task()
+                    outcome = 'done'
+                except Exception:
+                    outcome = 'failed'
+            with self._lock:
+                self._running.discard(key)
+                self.stats[outcome] += 1
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, pending=len(self._pending), running=len(self._running),
+                        foreground=self._foreground)
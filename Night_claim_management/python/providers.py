@@ -0,0 +1,232 @@
+"""
+Exchange candle providers behind one normalized pipeline.
+
+A provider only knows how to build its kline URL and where the rows sit
+in the response; everything else (rate limit, concurrency cap, column
+order, ms timestamps, chronological order) is shared. Parsing is
+columnar: the rows of a response are transposed once and each column is
+converted in a single pass, so a malformed value fails the whole response
+instead of being swallowed row by row.
+
+Adding an exchange is a small plugin:
+
+    class KucoinProvider(CandleProvider):
+        name = 'kucoin'
+        rate = 10
+        timeframes = {'1m': '1min', '1H': '1hour', ...}
+
+        def url(self, inst_id, bar, limit, start, end):
+            return f'https://api.kucoin.com/api/v1/market/candles?type={self.interval(bar)}&symbol={inst_id}'
+
+        def rows(self, data):
+            return data['data']
+
+    register(KucoinProvider())
+"""
+from __future__ import annotations
+
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from rate_limit import RateLimiter
+
+FIELDS = ('ts', 'open', 'high', 'low', 'close', 'volume')
+
+# column indexes of (ts, open, high, low, close, volume) in a raw row
+Layout = Tuple[int, int, int, int, int, int]
+DEFAULT_LAYOUT: Layout = (0, 1, 2, 3, 4, 5)
+
+
+def to_columns(rows: Sequence[Sequence[Any]], layout: Layout = DEFAULT_LAYOUT,
+               ts_scale: int = 1) -> Dict[str, list]:
+    """Columnar candles in chronological order from raw rows.
+
+    Raises ValueError (or TypeError) on a malformed value.
+    """
+    if not rows:
+        return {f: [] for f in FIELDS}
+    cols = list(zip(*rows))
+    ts_col = cols[layout[0]]
+    ts = [int(float(x) * ts_scale) for x in ts_col]
+    out = {'ts': ts}
+    for name, idx in zip(FIELDS[1:], layout[1:]):
+        out[name] = list(map(float, cols[idx]))
+    if any(ts[i] > ts[i + 1] for i in range(len(ts) - 1)):
+        order = sorted(range(len(ts)), key=ts.__getitem__)
+        out = {f: [c[i] for i in order] for f, c in out.items()}
+    return out
+
+
+def to_rows(cols: Dict[str, list]) -> List[Dict[str, Any]]:
+    """Columns -> the list of {ts, open, high, low, close, volume} dicts used by the UI."""
+    return [dict(zip(FIELDS, t)) for t in zip(*(cols[f] for f in FIELDS))]
+
+
+class CandleProvider(ABC):
+    """Base class of an exchange plugin; subclasses set the attributes and implement
+    `url` and `rows` (and `layout` when columns are not [ts, o, h, l, c, v])."""
+
+    name = ''
+    # requests/second and requests in flight
+    rate = 10.0
+    concurrency = 4
+    # candles per request
+    page_limit = 1000
+    # timestamps in the response are multiplied by this to get ms
+    ts_scale = 1
+    # app bar ('1m', '5m', '15m', '1H', '4H', '1D') -> exchange interval
+    timeframes: Dict[str, str] = {}
+    default_bar = '1H'
+
+    def __init__(self):
+        self.limiter = RateLimiter(self.rate)
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+
+    def interval(self, bar: str) -> str:
+        return self.timeframes.get(bar) or self.timeframes[self.default_bar]
+
+    @abstractmethod
+    def url(self, inst_id: str, bar: str, limit: int, start: Optional[int], end: Optional[int]) -> str:
+        """Kline URL of one page; `start`/`end` ms (either optional)."""
+
+    @abstractmethod
+    def rows(self, data: Any) -> List[Sequence[Any]]:
+        """Raw candle rows inside a decoded response."""
+
+    def layout(self, rows: List[Sequence[Any]]) -> Layout:
+        return DEFAULT_LAYOUT
+
+    def fetch(self, get_json: Callable[[str], Any], inst_id: str, bar: str, limit: int = 200,
+              start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, list]:
+        """One page of candles as columns; `start`/`end` ms (start inclusive, end exclusive).
+
+        Raises on network or format errors.
+        """
+        url = self.url(inst_id, bar, limit, start, end)
+        with self._slots:
+            self.limiter.acquire()
+            data = get_json(url)
+        rows = [r for r in self.rows(data) or [] if isinstance(r, (list, tuple)) and len(r) >= 6]
+        return to_columns(rows, self.layout(rows), self.ts_scale)
+
+    def info(self) -> Dict[str, Any]:
+        return {'name': self.name, 'bars': list(self.timeframes), 'page_limit': self.page_limit}
+
+
+class OkxProvider(CandleProvider):
+    name = 'okx'
+    rate = 8  # history-candles: 20 requests / 2 s
+    page_limit = 100
+    timeframes = {'1m': '1m', '5m': '5m', '15m': '15m', '1H': '1H', '4H': '4H', '1D': '1D'}
+
+    def url(self, inst_id, bar, limit, start, end):
+        # `after` = older than, `before` = newer than
+        url = f'https://www.okx.com/api/v5/market/history-candles?instId={inst_id}&bar={self.interval(bar)}&limit={limit}'
+        if end is not None:
+            url += f'&after={int(end)}'
+        if start is not None:
+            url += f'&before={int(start) - 1}'
+        return url
+
+    def rows(self, data):
+        if not isinstance(data, dict) or 'data' not in data:
+            raise ValueError(data.get('msg') if isinstance(data, dict) and data.get('msg') else 'no data')
+        return data['data']
+
+
+class BybitProvider(CandleProvider):
+    name = 'bybit'
+    rate = 10  # 120 requests / s per IP
+    timeframes = {'1m': '1', '5m': '5', '15m': '15', '1H': '60', '4H': '240', '1D': 'D'}
+
+    def url(self, inst_id, bar, limit, start, end):
+        symbol = inst_id.replace('-', '').upper()
+        url = ('https://api.bybit.com/v5/market/kline'
+               f'?category=spot&symbol={symbol}&interval={self.interval(bar)}&limit={limit}')
+        # start/end are inclusive ms
+        if start is not None:
+            url += f'&start={int(start)}'
+        if end is not None:
+            url += f'&end={int(end) - 1}'
+        return url
+
+    def rows(self, data):
+        # {'retCode': 0, 'result': {'list': [[ts, o, h, l, c, vol, turnover], ...]}}, newest first
+        if isinstance(data, list):
+            return data
+        if not isinstance(data, dict):
+            raise ValueError('unexpected response format')
+        if data.get('retCode') not in (None, 0):
+            raise ValueError(data.get('retMsg') or f"retCode {data.get('retCode')}")
+        return (data.get('result') or {}).get('list') or []
+
+
+class GateProvider(CandleProvider):
+    name = 'gate'
+    rate = 10  # 200 requests / 10 s
+    ts_scale = 1000
+    timeframes = {'1m': '1m', '5m': '5m', '15m': '15m', '1H': '1h', '4H': '4h', '1D': '1d'}
+
+    # v4: [t, quote volume, close, high, low, open, base volume, window closed]
+    V4_LAYOUT: Layout = (0, 5, 3, 4, 2, 6)
+    # six-column rows: either [t, o, h, l, c, v] or [t, v, c, h, l, o]
+    SHORT_LAYOUTS: Tuple[Layout, ...] = (DEFAULT_LAYOUT, (0, 5, 3, 4, 2, 1))
+
+    def url(self, inst_id, bar, limit, start, end):
+        pair = inst_id.replace('-', '_').upper()
+        url = f'https://api.gateio.ws/api/v4/spot/candlesticks?currency_pair={pair}&interval={self.interval(bar)}'
+        # Gate rejects `limit` together with from/to (seconds, both inclusive)
+        if start is not None or end is not None:
+            if start is not None:
+                url += f'&from={int(start) // 1000}'
+            if end is not None:
+                url += f'&to={(int(end) - 1) // 1000}'
+        else:
+            url += f'&limit={limit}'
+        return url
+
+    def rows(self, data):
+        if not isinstance(data, list):
+            raise ValueError(data.get('message') if isinstance(data, dict) and data.get('message')
+                             else 'unexpected response format')
+        return data
+
+    def layout(self, rows):
+        """Column order decided once per response: the documented v4 order when the
+        rows carry base volume, otherwise whichever six-column order keeps
+        high/low around open/close for more rows."""
+        if not rows or min(len(r) for r in rows) >= 7:
+            return self.V4_LAYOUT
+
+        def violations(layout: Layout) -> int:
+            _, o, h, l, c, _ = layout
+            bad = 0
+            for r in rows:
+                op, hi, lo, cl = float(r[o]), float(r[h]), float(r[l]), float(r[c])
+                if hi < max(op, cl) or lo > min(op, cl):
+                    bad += 1
+            return bad
+
+        return min(self.SHORT_LAYOUTS, key=violations)
+
+
+PROVIDERS: Dict[str, CandleProvider] = {}
+
+
+def register(provider: CandleProvider) -> CandleProvider:
+    if not provider.name:
+        raise ValueError('provider needs a name')
+    PROVIDERS[provider.name] = provider
+    return provider
+
+
+def get_provider(name: str) -> CandleProvider:
+    try:
+        return PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f'unknown provider: {name}') from None
+
+
+for _cls in (OkxProvider, BybitProvider, GateProvider):
+    register(_cls())
@@ -0,0 +1,178 @@
+"""
+Headless local HTTP/JSON service around one shared `Api`.
+
+Several dashboards and scripts can query the same process, so they all
+share its candle/price caches, rate limiters and connection pools. Schedule
+checks are also cached for a short time and concurrent identical requests
+are coalesced, so more clients do not mean more upstream requests.
+
+  GET  /health
+  GET  /check?address=addr1...
+  POST /check                  {"addresses": [...], "workers": 8}
+  GET  /price
+  GET  /ohlc?provider=okx&inst=NIGHT-USDT&bar=1H&limit=200   (provider=all: consolidated)
+  GET  /metrics
+
+Standard library only (http.server); binds to 127.0.0.1 unless told otherwise.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from address_import import validate_address
+
+# bulk POST /check is capped so one client cannot queue an unbounded sweep
+MAX_BULK = 1000
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.routes: Dict[str, Dict[str, float]] = {}
+
+    def observe(self, route: str, status: int, seconds: float) -> None:
+        with self._lock:
+            m = self.routes.setdefault(route, {'count': 0, 'errors': 0, 'total_ms': 0.0})
+            m['count'] += 1
+            m['errors'] += 1 if status >= 400 else 0
+            m['total_ms'] += seconds * 1000
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {r: dict(m, total_ms=round(m['total_ms'], 1),
+                              avg_ms=round(m['total_ms'] / m['count'], 2) if m['count'] else 0.0)
+                      for r, m in self.routes.items()}
+        return {'uptime_s': round(time.time() - self.started, 1), 'routes': routes}
+
+
+class NightService:
+    """Route table over an Api instance.
+
+    `price` returns the NIGHT price, `cache` is a TTLCache-like object with
+    `get_or_load(key, loader, should_cache=...)` used for schedule checks,
+    and `upstream` returns counters of outgoing requests for /metrics.
+    """
+
+    def __init__(self, api, price: Callable[[], float], cache,
+                 upstream: Optional[Callable[[], Dict[str, Any]]] = None):
+        self.api = api
+        self.price = price
+        self.cache = cache
+        self.upstream = upstream or (lambda: {})
+        self.metrics = Metrics()
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/check'): self.check_one,
+            ('POST', '/check'): self.check_many,
+            ('GET', '/price'): self.get_price,
+            ('GET', '/ohlc'): self.ohlc,
+            ('GET', '/metrics'): self.get_metrics,
+        }
+
+    def _check(self, address: str) -> Dict[str, Any]:
+        # one cache entry per address however it was spelled (case, whitespace, quotes)
+        address = validate_address(address)[0] or address
+        return self.cache.get_or_load(('check', address), lambda: self.api.check_address(address, remember=False),
+                                      should_cache=lambda r: isinstance(r, dict) and not str(r.get('error', '')).startswith('network'))
+
+    def health(self, q: Dict[str, str], body: Any):
+        return 200, {'ok': True}
+
+    def check_one(self, q: Dict[str, str], body: Any):
+        address = q.get('address', '').strip()
+        if not address:
+            return 400, {'error': 'address is required'}
+        res = self._check(address)
+        return (400 if str(res.get('error', '')).startswith('invalid address') else 200), res
+
+    def check_many(self, q: Dict[str, str], body: Any):
+        addresses = body.get('addresses') if isinstance(body, dict) else body
+        if not isinstance(addresses, list) or not addresses:
+            return 400, {'error': 'body must be {"addresses": [...]}'}
+        if len(addresses) > MAX_BULK:
+            return 413, {'error': f'at most {MAX_BULK} addresses per request; use a batch job for more'}
+        addresses = list(dict.fromkeys(str(a).strip() for a in addresses if a))
+        try:
+            workers = max(1, min(16, int((body.get('workers') if isinstance(body, dict) else None) or 8)))
+        except (TypeError, ValueError):
+            return 400, {'error': 'workers must be an integer'}
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(self._check, addresses))
+        return 200, {'results': [{'address': a, **r} for a, r in zip(addresses, results)]}
+
+    def get_price(self, q: Dict[str, str], body: Any):
+        return 200, {'NIGHT': self.price()}
+
+    def ohlc(self, q: Dict[str, str], body: Any):
+        try:
+            limit = max(1, min(1000, int(q.get('limit', 200))))
+        except ValueError:
+            return 400, {'error': 'limit must be an integer'}
+        rows = self.api.cached_candles(q.get('provider', 'okx'), q.get('inst', 'NIGHT-USDT'), q.get('bar', '1H'), limit)
+        if isinstance(rows, dict) and rows.get('error'):
+            return 502, rows
+        return 200, {'candles': rows}
+
+    def get_metrics(self, q: Dict[str, str], body: Any):
+        return 200, dict(self.metrics.snapshot(), upstream=self.upstream())
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: Any):
+        route = self.routes.get((method, path))
+        if route is None:
+            known = any(p == path for _, p in self.routes)
+            return (405 if known else 404), {'error': 'method not allowed' if known else 'not found'}
+        try:
+            return route(query, body)
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+
+def make_server(service: NightService, host: str = '127.0.0.1', port: int = 8787) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        server_version = 'night-service/1.0'
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _serve(self, method: str) -> None:
+            started = time.perf_counter()
+            parts = urlsplit(self.path)
+            query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+            body: Any = None
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                try:
+                    body = json.loads(self.rfile.read(length).decode('utf-8'))
+                except ValueError:
+                    status, payload = 400, {'error': 'invalid JSON body'}
+                    return self._reply(parts.path, status, payload, started)
+            status, payload = service.handle(method, parts.path, query, body)
+            self._reply(parts.path, status, payload, started)
+
+        def _reply(self, route: str, status: int, payload: Any, started: float) -> None:
+            data = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            service.metrics.observe(route if route in {p for _, p in service.routes} else 'other',
+                                    status, time.perf_counter() - started)
+
+        def do_GET(self):
+            self._serve('GET')
+
+        def do_POST(self):
+            self._serve('POST')
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,196 @@
+"""
+File-backed cache shared by every process on the machine (GUI, batch CLI,
+service, cron sweeps), so one process reuses what another just fetched.
+
+Each entry is one small JSON file named after a hash of its key and holding
+the key, an absolute expiry time and the value. Writers build the file
+under a temporary name and swap it in with `os.replace`, so readers never
+see a half-written entry and need no lock: a hit is one open and one read.
+
+A miss claims the key by creating a `<hash>.pending` marker next to the
+entry (an exclusive create, atomic on every platform) and removes it once
+the value is published. When several processes miss the same key at once,
+the one holding the marker fetches and the others poll for its result;
+nothing is held for other keys, so a slow load never delays a different
+key. A marker left by a crashed process goes stale after PENDING_STALE
+seconds and is then taken over.
+
+Values must be JSON-serializable; anything else is simply not shared.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+CACHE_DIR = os.environ.get('NIGHT_CACHE_DIR') or os.path.join(os.path.dirname(__file__), 'cache')
+
+# expired entry files are swept after this many writes by one process
+PURGE_EVERY = 200
+
+# a claim older than this is abandoned (longer than any loader: fetch.ps1 has 30 s)
+PENDING_STALE = 60.0
+# how often a process waiting on another one's load looks for the result
+POLL_INTERVAL = 0.05
+
+
+class SharedCache:
+    def __init__(self, root: str = CACHE_DIR, namespace: str = ''):
+        self.root = root
+        self.namespace = namespace
+        self._writes = 0
+        self._count_lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'waited': 0}
+
+    @classmethod
+    def from_env(cls, namespace: str = '') -> Optional['SharedCache']:
+        """The default shared cache, or None when NIGHT_SHARED_CACHE=0."""
+        if os.environ.get('NIGHT_SHARED_CACHE', '1').strip().lower() in ('0', 'false', 'no', 'off'):
+            return None
+        return cls(namespace=namespace)
+
+    def _name(self, key: Any) -> Tuple[str, str]:
+        text = f'{self.namespace}:{key!r}'
+        return text, hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest + '.json')
+
+    def _count(self, stat: str) -> None:
+        with self._count_lock:
+            self.stats[stat] += 1
+
+    def read(self, key: Any) -> Optional[Tuple[Any, float]]:
+        """(value, seconds left) of a live entry, else None. Takes no lock."""
+        text, digest = self._name(key)
+        try:
+            with open(self._path(digest), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        left = float(entry.get('exp', 0)) - time.time()
+        if entry.get('key') != text or left <= 0:
+            return None
+        return entry.get('v'), left
+
+    def write(self, key: Any, value: Any, ttl: float) -> bool:
+        text, digest = self._name(key)
+        path = self._path(digest)
+        try:
+            data = json.dumps({'key': text, 'exp': time.time() + ttl, 'v': value},
+                              ensure_ascii=False, separators=(',', ':'))
+        except (TypeError, ValueError):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(data)
+            for attempt in range(5):
+                try:
+                    os.replace(tmp, path)
+                    break
+                except PermissionError:
+                    # Windows refuses to replace a file another process is reading
+                    if attempt == 4:
+                        raise
+                    time.sleep(0.01 * (attempt + 1))
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+        self._count('writes')
+        with self._count_lock:
+            self._writes += 1
+            sweep = self._writes % PURGE_EVERY == 0
+        if sweep:
+            self.purge()
+        return True
+
+    def _claim(self, marker: str) -> Optional[bool]:
+        """True when this process now owns the load, False when another one does,
+        None when markers cannot be created (load without coordination)."""
+        try:
+            os.makedirs(os.path.dirname(marker), exist_ok=True)
+            os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+            return True
+        except FileExistsError:
+            try:
+                if os.path.getmtime(marker) < time.time() - PENDING_STALE:
+                    os.remove(marker)  # owner died; the next attempt claims it
+            except OSError:
+                pass
+            return False
+        except OSError:
+            return None
+
+    def load(self, key: Any, loader: Callable[[], Any], ttl: float,
+             should_cache: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, float]:
+        """(value, seconds left) from the cache, or from `loader()` run by exactly one
+        of the processes that miss at the same time."""
+        hit = self.read(key)
+        if hit is not None:
+            self._count('hits')
+            return hit
+        _, digest = self._name(key)
+        marker = self._path(digest)[:-len('.json')] + '.pending'
+        while True:
+            claimed = self._claim(marker)
+            if claimed is not False:
+                break
+            time.sleep(POLL_INTERVAL)
+            hit = self.read(key)
+            if hit is not None:
+                self._count('waited')
+                return hit
+        try:
+            hit = self.read(key)  # published between the miss and the claim
+            if hit is not None:
+                self._count('waited')
+                return hit
+            self._count('misses')
+            value = loader()
+            if should_cache is None or should_cache(value):
+                self.write(key, value, ttl)
+            return value, ttl
+        finally:
+            if claimed:
+                try:
+                    os.remove(marker)
+                except OSError:
+                    pass
+
+    def purge(self) -> int:
+        """Delete expired entries (and temp files left by crashed writers); returns how many."""
+        removed = 0
+        now = time.time()
+        try:
+            buckets = [os.path.join(self.root, d) for d in os.listdir(self.root) if len(d) == 2]
+        except OSError:
+            return 0
+        for bucket in buckets:
+            try:
+                names = os.listdir(bucket)
+            except OSError:
+                continue
+            for name in names:
+                path = os.path.join(bucket, name)
+                try:
+                    if name.endswith('.tmp'):
+                        expired = os.path.getmtime(path) < now - 60
+                    elif name.endswith('.pending'):
+                        expired = os.path.getmtime(path) < now - PENDING_STALE
+                    else:
+                        with open(path, 'r', encoding='utf-8') as f:
+                            expired = float(json.load(f).get('exp', 0)) < now
+                    if expired:
+                        os.remove(path)
+                        removed += 1
+                except (OSError, ValueError):
+                    continue
+        return removed
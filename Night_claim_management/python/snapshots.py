@@ -0,0 +1,99 @@
+"""
+Per-address snapshots of the last schedule check, for reporting only what changed.
+
+Each address keeps a short fingerprint of its schedule plus one compact
+entry per thaw ([amount, status] keyed by thaw start). A new check whose
+fingerprint matches is reported as unchanged without looking further;
+otherwise the thaw entries are compared to list each transition
+(e.g. 'upcoming' -> 'claimed').
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+SNAPSHOT_FILE = os.path.join(os.path.dirname(__file__), 'NIGHT_snapshots.json')
+
+
+def _thaw_states(result: Dict[str, Any]) -> Dict[str, list]:
+    states: Dict[str, list] = {}
+    for i, t in enumerate(result.get('thaws') or []):
+        raw = t.get('raw') if isinstance(t.get('raw'), dict) else {}
+        key = t.get('thaw_date') or raw.get('thawing_period_start') or f'#{i + 1}'
+        status = raw.get('status') or t.get('status') or ''
+        states[key] = [round(float(t.get('amount') or 0.0), 6), status]
+    return states
+
+
+def fingerprint(states: Dict[str, list]) -> str:
+    blob = json.dumps(sorted(states.items()), separators=(',', ':'))
+    return hashlib.sha1(blob.encode('utf-8')).hexdigest()[:16]
+
+
+class SnapshotStore:
+    def __init__(self, path: str = SNAPSHOT_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, Dict[str, Any]]] = None
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._data is None:
+            self._data = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        obj = json.load(f)
+                    self._data = obj.get('Snapshots', {}) if isinstance(obj, dict) else {}
+                except Exception:
+                    self._data = {}
+        return self._data
+
+    def diff(self, address: str, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Record `result` as the latest snapshot and return what changed, or None.
+
+        The returned delta lists thaw transitions as {'thaw', 'from', 'to',
+        'amount'}; 'from' is None for a new thaw and 'to' is None for one
+        that disappeared from the schedule.
+        """
+        states = _thaw_states(result)
+        fp = fingerprint(states)
+        with self._lock:
+            data = self._load()
+            prev = data.get(address)
+            if prev and prev.get('fp') == fp:
+                return None
+            old = prev.get('thaws', {}) if prev else {}
+            changes: List[Dict[str, Any]] = []
+            for key in sorted(set(old) | set(states)):
+                a, b = old.get(key), states.get(key)
+                if a == b:
+                    continue
+                changes.append({
+                    'thaw': key,
+                    'from': a[1] if a else None,
+                    'to': b[1] if b else None,
+                    'amount': (b or a)[0],
+                })
+            data[address] = {'fp': fp, 'thaws': states, 't': int(time.time())}
+            self._dirty = True
+        return {'address': address, 'new': prev is None, 'changes': changes}
+
+    def forget(self, address: str) -> None:
+        with self._lock:
+            if self._load().pop(address, None) is not None:
+                self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'Snapshots': self._data}, f, separators=(',', ':'))
+            os.replace(tmp, self.path)
+            self._dirty = False
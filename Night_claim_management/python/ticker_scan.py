@@ -0,0 +1,70 @@
+"""
+Selective extraction of a few tickers from a large exchange ticker list.
+
+`tickers?instType=SPOT` returns every spot instrument (well over a
+thousand flat objects, several hundred KB). Instead of decoding and
+parsing all of it, `extract_tickers` scans the raw bytes chunk by chunk
+for `"instId":"<watched id>"`, parses only the enclosing object, and stops
+reading as soon as every watched id has been seen. Between chunks only
+the unfinished tail object is kept, so memory stays around one chunk and
+the parsing work scales with the number of watched ids.
+
+Relies on ticker objects being flat (no nested braces), which holds for
+the OKX, Bybit and Gate ticker endpoints.
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, Sequence
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _id_pattern(inst_ids: Sequence[str], key: str) -> 're.Pattern[bytes]':
+    ids = b'|'.join(re.escape(i.encode('utf-8')) for i in inst_ids)
+    return re.compile(b'"' + re.escape(key.encode('utf-8')) + b'"\\s*:\\s*"(' + ids + b')"')
+
+
+def read_chunks(resp, size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    while True:
+        chunk = resp.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def extract_tickers(chunks: Iterable[bytes], inst_ids: Sequence[str], key: str = 'instId') -> Dict[str, Dict[str, Any]]:
+    """{inst_id: ticker object} for the watched ids found in a JSON byte stream.
+
+    Stops consuming `chunks` once every id has been found.
+    """
+    wanted = set(inst_ids)
+    if not wanted:
+        return {}
+    pattern = _id_pattern(sorted(wanted), key)
+    found: Dict[str, Dict[str, Any]] = {}
+    buf = b''
+    for chunk in chunks:
+        buf += chunk
+        pos = 0
+        while True:
+            m = pattern.search(buf, pos)
+            if m is None:
+                break
+            start = buf.rfind(b'{', 0, m.start())
+            end = buf.find(b'}', m.end())
+            if start < 0 or end < 0:
+                break  # object continues in the next chunk
+            inst = m.group(1).decode('utf-8')
+            try:
+                found[inst] = json.loads(buf[start:end + 1])
+            except ValueError:
+                pass
+            pos = end + 1
+        if wanted.issubset(found):
+            break
+        # keep only the object that is still open (objects are flat, so it starts at the last '{')
+        tail = buf.rfind(b'{', pos)
+        buf = buf[tail:] if tail >= 0 else b''
+    return found
@@ -0,0 +1,296 @@
+"""
+Portfolio mark-to-market: the thaw timeline of many addresses joined with
+NIGHT price history.
+
+Every tranche of every address is one entry of flat arrays (thaw ts, NIGHT
+amount, address index). Against a daily close series the engine computes,
+in whole-array operations:
+
+  - per tranche: the close of the day it thawed, and its USD value then
+  - per day: NIGHT unlocked so far (a cumulative sum over the tranches
+    sorted by thaw time, indexed with one searchsorted) and its USD value,
+    plus the value of the whole allocation at that day's close
+  - per address and per thaw date: the same values grouped with bincount
+
+Results are cached. A schedule that did not change (same fingerprint)
+leaves the arrays alone; a price update that only touches the last days
+re-prices just the tranches that thawed from the first changed close on
+(the per-day series is a single pass over the days either way).
+Uses NumPy when it is installed; otherwise everything is recomputed in
+plain Python on each change.
+"""
+from __future__ import annotations
+
+import bisect
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+DAY_MS = 86_400_000
+
+
+def _parse_ms(raw: str) -> Optional[int]:
+    try:
+        dt = datetime.fromisoformat(raw.replace('Z', '+00:00'))
+    except Exception:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def tranches(schedule: Any) -> List[Tuple[int, float]]:
+    """(thaw ts ms, NIGHT amount) of a raw schedule ({'thaws': [...]} as served by the API)."""
+    out = []
+    for item in (schedule or {}).get('thaws') or []:
+        ts = _parse_ms(item.get('thawing_period_start') or item.get('start') or '')
+        try:
+            amount = float(item.get('amount', 0)) / 1e6
+        except Exception:
+            continue
+        if ts is not None and amount:
+            out.append((ts, amount))
+    return out
+
+
+def _fingerprint(rows: List[Tuple[int, float]]) -> str:
+    return hashlib.sha1(json.dumps(sorted(rows)).encode('utf-8')).hexdigest()[:16]
+
+
+class ValuationEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # address -> (fingerprint, tranches); insertion order = address index
+        self._schedules: Dict[str, Tuple[str, List[Tuple[int, float]]]] = {}
+        self._schedules_dirty = True
+        self.day_ts: List[int] = []
+        self.close: List[float] = []
+        # first day index whose close changed since the last valuation (None = unchanged)
+        self._price_from: Optional[int] = 0
+        self._arrays: Dict[str, Any] = {}
+        self._result: Optional[Dict[str, Any]] = None
+        # `now_ms` of the cached result and the sorted thaw ts it was computed over
+        self._now_ms: Optional[int] = None
+        self._sorted_ts: Sequence[int] = []
+        self.last_recompute = ''
+
+    # -- inputs ------------------------------------------------------------
+    def set_schedule(self, address: str, schedule: Any) -> bool:
+        """Store an address's schedule; False when it is unchanged."""
+        rows = tranches(schedule)
+        fp = _fingerprint(rows)
+        with self._lock:
+            prev = self._schedules.get(address)
+            if prev is not None and prev[0] == fp:
+                return False
+            self._schedules[address] = (fp, rows)
+            self._schedules_dirty = True
+            return True
+
+    def keep_only(self, addresses: Iterable[str]) -> int:
+        """Forget every address not in `addresses`; returns how many were dropped."""
+        keep = set(addresses)
+        with self._lock:
+            gone = [a for a in self._schedules if a not in keep]
+            for a in gone:
+                del self._schedules[a]
+            if gone:
+                self._schedules_dirty = True
+            return len(gone)
+
+    def set_prices(self, day_ts: Sequence[int], close: Sequence[float]) -> Optional[int]:
+        """Replace the daily close series; returns the first changed index (None if identical)."""
+        day_ts, close = [int(t) for t in day_ts], [float(c) for c in close]
+        with self._lock:
+            n = min(len(day_ts), len(self.day_ts))
+            first = 0
+            while first < n and day_ts[first] == self.day_ts[first] and close[first] == self.close[first]:
+                first += 1
+            if first == len(day_ts) == len(self.day_ts):
+                return None
+            if len(day_ts) < len(self.day_ts):
+                first = 0  # history was cut: tranches past the new end lose their price
+            self.day_ts, self.close = day_ts, close
+            self._price_from = first if self._price_from is None else min(self._price_from, first)
+            return first
+
+    # -- valuation ---------------------------------------------------------
+    def value(self, now_ms: Optional[int] = None) -> Dict[str, Any]:
+        """Cached valuation; recomputed only as far as schedules/prices changed
+        or tranches thawed since the last call."""
+        now_ms = int(time.time() * 1000) if now_ms is None else int(now_ms)
+        with self._lock:
+            if self._now_ms is not None and self._thawed_between(self._now_ms, now_ms):
+                self._price_from = 0  # thawed amounts and prices at thaw depend on now_ms
+            if self._result is not None and not self._schedules_dirty and self._price_from is None:
+                self.last_recompute = 'none'
+                return self._result
+            if not self.day_ts:
+                return {'error': 'no price history'}
+            if np is None:
+                self._result = self._value_plain(now_ms)
+                self.last_recompute = 'full'
+            else:
+                if self._schedules_dirty or not self._arrays:
+                    self._build_arrays()
+                    self._price_from = 0
+                self._result = self._value_numpy(now_ms)
+            self._schedules_dirty = False
+            self._price_from = None
+            self._now_ms = now_ms
+            return self._result
+
+    def _thawed_between(self, a: int, b: int) -> bool:
+        """True when a tranche thaws in (min(a, b), max(a, b)]."""
+        lo, hi = min(a, b), max(a, b)
+        if lo == hi or not len(self._sorted_ts):
+            return False
+        if np is not None and not isinstance(self._sorted_ts, list):
+            return bool(np.searchsorted(self._sorted_ts, hi, side='right') > np.searchsorted(self._sorted_ts, lo, side='right'))
+        return bisect.bisect_right(self._sorted_ts, hi) > bisect.bisect_right(self._sorted_ts, lo)
+
+    def _build_arrays(self) -> None:
+        addrs = list(self._schedules)
+        ts, amt, idx = [], [], []
+        for i, a in enumerate(addrs):
+            for t, v in self._schedules[a][1]:
+                ts.append(t)
+                amt.append(v)
+                idx.append(i)
+        ts_a = np.asarray(ts, dtype=np.int64)
+        order = np.argsort(ts_a, kind='stable')
+        amt_a = np.asarray(amt, dtype=np.float64)
+        self._arrays = {
+            'addresses': addrs,
+            'ts': ts_a,
+            'amount': amt_a,
+            'addr': np.asarray(idx, dtype=np.int64),
+            'sorted_ts': ts_a[order],
+            'cum_amount': np.cumsum(amt_a[order]),
+            'price': np.full(len(ts), np.nan),
+        }
+        self._sorted_ts = self._arrays['sorted_ts']
+
+    def _value_numpy(self, now_ms: int) -> Dict[str, Any]:
+        arr = self._arrays
+        day_ts = np.asarray(self.day_ts, dtype=np.int64)
+        close = np.asarray(self.close, dtype=np.float64)
+        first = self._price_from or 0
+        ts, amount, price = arr['ts'], arr['amount'], arr['price']
+
+        # re-price only tranches that fall on or after the first changed day
+        stale = ts >= (day_ts[first] if first < len(day_ts) else np.iinfo(np.int64).max)
+        if first == 0:
+            stale[:] = True
+        pos = np.searchsorted(day_ts, ts[stale], side='right') - 1
+        priced = (pos >= 0) & (ts[stale] < day_ts[-1] + DAY_MS) & (ts[stale] <= now_ms)
+        price[stale] = np.where(priced, close[np.clip(pos, 0, None)], np.nan)
+        self.last_recompute = 'full' if first == 0 else f'from day {first}'
+
+        usd_at_thaw = np.nan_to_num(amount * price)
+        thawed = ts <= now_ms
+        total_amount = float(amount.sum())
+        # NIGHT unlocked by the end of each day: cumulative amount of tranches with ts < day end
+        count = np.searchsorted(arr['sorted_ts'], day_ts + DAY_MS, side='left')
+        unlocked = np.where(count > 0, arr['cum_amount'][np.clip(count - 1, 0, None)], 0.0) if len(ts) else np.zeros(len(day_ts))
+        days = {
+            'ts': day_ts.tolist(),
+            'close': close.tolist(),
+            'unlocked': np.round(unlocked, 6).tolist(),
+            'unlocked_usd': np.round(unlocked * close, 2).tolist(),
+            'total_usd': np.round(total_amount * close, 2).tolist(),
+        }
+
+        # tranches sharing a thaw ts share its price
+        uniq, first_of, inv = np.unique(ts, return_index=True, return_inverse=True)
+        by_date = {
+            'ts': uniq.tolist(),
+            'amount': np.round(np.bincount(inv, weights=amount, minlength=len(uniq)), 6).tolist(),
+            'usd_at_thaw': np.round(np.bincount(inv, weights=usd_at_thaw, minlength=len(uniq)), 2).tolist(),
+            'price': [None if np.isnan(p) else float(p) for p in price[first_of]],
+            'addresses': np.bincount(inv, minlength=len(uniq)).tolist(),
+        }
+
+        n_addr = len(arr['addresses'])
+        latest = float(close[-1])
+        per_amount = np.bincount(arr['addr'], weights=amount, minlength=n_addr)
+        per_thawed = np.bincount(arr['addr'], weights=amount * thawed, minlength=n_addr)
+        per_at_thaw = np.bincount(arr['addr'], weights=usd_at_thaw, minlength=n_addr)
+        addresses = [{'address': a, 'amount': round(float(per_amount[i]), 6),
+                      'thawed': round(float(per_thawed[i]), 6),
+                      'usd_now': round(float(per_amount[i]) * latest, 2),
+                      'usd_at_thaw': round(float(per_at_thaw[i]), 2)}
+                     for i, a in enumerate(arr['addresses'])]
+        return {
+            'days': [dict(zip(days, row)) for row in zip(*days.values())],
+            'tranches': [dict(zip(by_date, row)) for row in zip(*by_date.values())],
+            'addresses': addresses,
+            'totals': {'addresses': n_addr, 'tranches': int(len(ts)), 'amount': round(total_amount, 6),
+                       'thawed': round(float((amount * thawed).sum()), 6),
+                       'usd_now': round(total_amount * latest, 2),
+                       'usd_at_thaw': round(float(usd_at_thaw.sum()), 2), 'price': latest},
+        }
+
+    def _value_plain(self, now_ms: int) -> Dict[str, Any]:
+        day_ts, close = self.day_ts, self.close
+        latest = close[-1]
+
+        def price_at(t: int) -> Optional[float]:
+            i = bisect.bisect_right(day_ts, t) - 1
+            if i < 0 or t >= day_ts[-1] + DAY_MS or t > now_ms:
+                return None
+            return close[i]
+
+        rows = [(a, t, v) for a, (_, tr) in self._schedules.items() for t, v in tr]
+        by_date: Dict[int, Dict[str, Any]] = {}
+        per: Dict[str, Dict[str, Any]] = {a: {'address': a, 'amount': 0.0, 'thawed': 0.0, 'usd_now': 0.0,
+                                              'usd_at_thaw': 0.0} for a in self._schedules}
+        for a, t, v in rows:
+            p = price_at(t)
+            usd = v * p if p is not None else 0.0
+            d = by_date.setdefault(t, {'ts': t, 'amount': 0.0, 'usd_at_thaw': 0.0, 'price': p, 'addresses': 0})
+            d['amount'] += v
+            d['usd_at_thaw'] += usd
+            d['addresses'] += 1
+            e = per[a]
+            e['amount'] += v
+            e['thawed'] += v if t <= now_ms else 0.0
+            e['usd_at_thaw'] += usd
+        total = sum(v for _, _, v in rows)
+        sorted_rows = sorted((t, v) for _, t, v in rows)
+        sorted_ts = self._sorted_ts = [t for t, _ in sorted_rows]
+        cum, acc = [], 0.0
+        for _, v in sorted_rows:
+            acc += v
+            cum.append(acc)
+        days = []
+        for t, c in zip(day_ts, close):
+            k = bisect.bisect_left(sorted_ts, t + DAY_MS)
+            unlocked = cum[k - 1] if k else 0.0
+            days.append({'ts': t, 'close': c, 'unlocked': round(unlocked, 6),
+                         'unlocked_usd': round(unlocked * c, 2), 'total_usd': round(total * c, 2)})
+        for e in per.values():
+            e['usd_now'] = round(e['amount'] * latest, 2)
+            e['usd_at_thaw'] = round(e['usd_at_thaw'], 2)
+            e['amount'] = round(e['amount'], 6)
+            e['thawed'] = round(e['thawed'], 6)
+        tranche_rows = [dict(d, amount=round(d['amount'], 6), usd_at_thaw=round(d['usd_at_thaw'], 2))
+                        for _, d in sorted(by_date.items())]
+        usd_at_thaw = sum(d['usd_at_thaw'] for d in by_date.values())
+        return {
+            'days': days,
+            'tranches': tranche_rows,
+            'addresses': list(per.values()),
+            'totals': {'addresses': len(per), 'tranches': len(rows), 'amount': round(total, 6),
+                       'thawed': round(sum(e['thawed'] for e in per.values()), 6),
+                       'usd_now': round(total * latest, 2), 'usd_at_thaw': round(usd_at_thaw, 2),
+                       'price': latest},
+        }
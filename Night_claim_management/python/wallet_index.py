@@ -0,0 +1,347 @@
+"""
+Incremental index of generated wallets across `phraseN` folders.
+
+The donation tools write, per phrase folder:
+
+  phraseN/delegated_summary.txt   wallet|delegated address|skey path, one line per wallet
+  phraseN/generation.log          "[ts] ✓ Created wallet_x_1/ (delegated: addr1..., skey: OK)"
+
+`FileTailer` remembers how many bytes of a file it has consumed (plus a
+signature of the file's first bytes, to notice when generation.log is
+rewritten) and returns only complete new lines. `WalletIndex` tails both
+files in every phrase folder and keeps a persistent wallet -> delegated
+address index in an append-only JSONL file, so each refresh costs
+O(new data) rather than O(file).
+
+`WalletScanner` discovers wallets straight from the key folders
+(phraseN/generated_keys/<wallet>/delegated.addr) for trees without those
+files, caching results per folder modification time.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PHRASE_DIR_RE = re.compile(r'^phrase\d+$')
+CREATED_RE = re.compile(
+    r'^(?:\[.*?\]\s*)?(?:\S+\s+)?Created\s+(wallet_[\w-]+)/\s*\(delegated:\s*([^,\)]+),\s*skey:\s*([^\)]+)\)')
+
+INDEX_FILE = 'wallet_index.jsonl'
+STATE_FILE = 'wallet_index.state.json'
+SCAN_CACHE_FILE = 'wallet_scan_cache.json'
+
+# bytes compared to detect a rewritten file (generation.log is recreated on every run)
+SIGNATURE_BYTES = 64
+
+
+class FileTailer:
+    """Reads a growing text file from a saved byte offset, one complete line at a time."""
+
+    def __init__(self, path: str, offset: int = 0, signature: str = '', mtime: float = 0.0):
+        self.path = path
+        self.offset = offset
+        self.signature = signature
+        self.mtime = mtime
+
+    def state(self) -> Dict[str, Any]:
+        return {'offset': self.offset, 'sig': self.signature, 'mtime': self.mtime}
+
+    def read_lines(self) -> List[str]:
+        """New complete lines since the last call ([] when nothing changed).
+
+        A file that shrank, whose first bytes changed, or that was rewritten
+        at the size already read (same size, new mtime) is read again from
+        the start. A trailing partial line is left for the next call.
+        """
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return []
+        size, mtime, previous = st.st_size, st.st_mtime, self.mtime
+        self.mtime = mtime
+        if size == self.offset and self.offset and mtime == previous:
+            return []
+        with open(self.path, 'rb') as f:
+            sig = f.read(SIGNATURE_BYTES).hex()
+            n = min(len(sig), len(self.signature))
+            rewritten = size == self.offset and bool(previous)
+            if size < self.offset or rewritten or sig[:n] != self.signature[:n]:
+                self.offset = 0
+                self.signature = ''
+            if len(sig) > len(self.signature):
+                self.signature = sig
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        end = chunk.rfind(b'\n') + 1
+        if not end:
+            return []
+        start = 3 if self.offset == 0 and chunk.startswith(b'\xef\xbb\xbf') else 0
+        self.offset += end
+        # Windows PowerShell's Add-Content writes the ANSI code page, so don't trust utf-8 blindly
+        text = chunk[start:end].decode('utf-8', errors='replace')
+        return [ln.rstrip('\r') for ln in text.split('\n')[:-1]]
+
+
+def parse_summary_line(line: str) -> Optional[Dict[str, str]]:
+    parts = line.strip().split('|', 2)
+    if len(parts) < 2 or not parts[0] or not parts[1]:
+        return None
+    return {'wallet': parts[0].strip(), 'address': parts[1].strip(),
+            'skey': parts[2].strip() if len(parts) > 2 else ''}
+
+
+def parse_generation_line(line: str) -> Optional[Dict[str, str]]:
+    m = CREATED_RE.match(line.strip())
+    if not m:
+        return None
+    return {'wallet': m.group(1), 'address': m.group(2).strip(), 'skey_status': m.group(3).strip()}
+
+
+class WalletIndex:
+    """Persistent wallet -> delegated address index over all phrase folders under `root`.
+
+    Entries are keyed '<phrase>/<wallet>'. delegated_summary.txt is the
+    primary source (it carries the skey path); generation.log entries fill
+    in wallets whose summary line is missing.
+    """
+
+    def __init__(self, root: str, index_dir: Optional[str] = None):
+        self.root = root
+        self.index_dir = index_dir or root
+        self._lock = threading.Lock()
+        self._wallets: Dict[str, Dict[str, Any]] = {}
+        self._tailers: Dict[str, FileTailer] = {}
+        self._loaded = False
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.index_dir, INDEX_FILE)
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.index_dir, STATE_FILE)
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._wallets[rec['key']] = rec
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    files = json.load(f).get('files', {})
+                for path, st in files.items():
+                    self._tailers[path] = FileTailer(path, st.get('offset', 0), st.get('sig', ''), st.get('mtime', 0.0))
+            except Exception:
+                self._tailers = {}
+
+    def phrase_folders(self) -> List[str]:
+        try:
+            with os.scandir(self.root) as it:
+                return sorted(e.path for e in it if e.is_dir() and PHRASE_DIR_RE.match(e.name))
+        except OSError:
+            return []
+
+    def _tailer(self, path: str) -> FileTailer:
+        t = self._tailers.get(path)
+        if t is None:
+            t = self._tailers[path] = FileTailer(path)
+        return t
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        """Consume whatever was appended since the last refresh; return new or changed entries."""
+        with self._lock:
+            self._load()
+            before = {p: t.offset for p, t in self._tailers.items()}
+            changed: List[Dict[str, Any]] = []
+            for folder in self.phrase_folders():
+                phrase = os.path.basename(folder)
+                summary = self._tailer(os.path.join(folder, 'delegated_summary.txt'))
+                for line in summary.read_lines():
+                    rec = parse_summary_line(line)
+                    if rec:
+                        changed.extend(self._upsert(phrase, folder, rec, 'summary'))
+                log = self._tailer(os.path.join(folder, 'generation.log'))
+                for line in log.read_lines():
+                    rec = parse_generation_line(line)
+                    if rec:
+                        changed.extend(self._upsert(phrase, folder, rec, 'log'))
+            if changed:
+                self._persist(changed)
+            elif before != {p: t.offset for p, t in self._tailers.items()}:
+                # offsets moved over lines that carried no wallet
+                self._save_state()
+            return changed
+
+    def _upsert(self, phrase: str, folder: str, rec: Dict[str, str], source: str) -> List[Dict[str, Any]]:
+        key = f"{phrase}/{rec['wallet']}"
+        prev = self._wallets.get(key)
+        if prev and source == 'log' and prev.get('source') == 'summary':
+            # the summary line is authoritative; the log only fills gaps
+            return []
+        entry = {
+            'key': key, 'phrase': phrase, 'wallet': rec['wallet'], 'address': rec['address'],
+            'file': os.path.join(folder, 'generated_keys', rec['wallet'], 'delegated.addr'),
+            'skey': rec.get('skey', ''), 'source': source,
+        }
+        if prev and all(prev.get(k) == entry[k] for k in ('address', 'skey', 'source')):
+            return []
+        self._wallets[key] = entry
+        return [entry]
+
+    def _persist(self, entries: List[Dict[str, Any]]) -> None:
+        os.makedirs(self.index_dir, exist_ok=True)
+        # index first, offsets second: a crash in between only replays (idempotent) lines
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            for e in entries:
+                f.write(json.dumps(e, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._save_state()
+
+    def _save_state(self) -> None:
+        state = {'files': {p: t.state() for p, t in self._tailers.items()}}
+        tmp = self.state_path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(state, f, separators=(',', ':'))
+            os.replace(tmp, self.state_path)
+        except OSError:
+            pass
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._load()
+            return list(self._wallets.values())
+
+    def address_of(self, phrase: str, wallet: str) -> Optional[str]:
+        with self._lock:
+            self._load()
+            e = self._wallets.get(f'{phrase}/{wallet}')
+            return e['address'] if e else None
+
+    def watch(self, on_change: Callable[[List[Dict[str, Any]]], None], interval: float = 1.0,
+              stop: Optional[threading.Event] = None) -> threading.Thread:
+        """Poll `refresh()` in a daemon thread and call `on_change` with new entries.
+
+        An unchanged file costs one stat per poll, so a short interval is cheap.
+        """
+        stop = stop or threading.Event()
+
+        def loop():
+            while not stop.is_set():
+                try:
+                    new = self.refresh()
+                    if new:
+                        on_change(new)
+                except Exception:
+                    pass
+                stop.wait(interval)
+
+        t = threading.Thread(target=loop, daemon=True)
+        t.stop = stop  # type: ignore[attr-defined]
+        t.start()
+        return t
+
+
+def _natural_key(name: str) -> list:
+    return [int(p) if p.isdigit() else p for p in re.split(r'(\d+)', name)]
+
+
+def _read_addr(path: str) -> str:
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+class WalletScanner:
+    """Finds phraseN/generated_keys/<wallet>/delegated.addr under `root`.
+
+    Phrase folders are listed in parallel with os.scandir and unknown
+    address files are read in bulk on a thread pool. Results are cached per
+    generated_keys folder, keyed on its mtime: an unchanged folder is not
+    listed again, and only wallets whose delegated.addr was still missing
+    are re-read. A wallet's address never changes, so known addresses are
+    reused even when a folder did change.
+    """
+
+    def __init__(self, root: str, cache_dir: Optional[str] = None, workers: int = 8):
+        self.root = root
+        self.cache_path = os.path.join(cache_dir or root, SCAN_CACHE_FILE)
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._cache: Optional[Dict[str, Any]] = None
+
+    def _load_cache(self) -> Dict[str, Any]:
+        if self._cache is None:
+            self._cache = {}
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    obj = json.load(f)
+                self._cache = obj if isinstance(obj, dict) else {}
+            except (OSError, ValueError):
+                pass
+        return self._cache
+
+    def _list_phrase(self, folder: str, cached: Optional[Dict[str, Any]]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        gen = os.path.join(folder, 'generated_keys')
+        try:
+            mtime = os.stat(gen).st_mtime_ns
+        except OSError:
+            return folder, None
+        known = dict(cached['wallets']) if cached else {}
+        if cached and cached.get('mtime') == mtime:
+            return folder, {'mtime': mtime, 'wallets': known}
+        wallets: Dict[str, str] = {}
+        with os.scandir(gen) as it:
+            for e in it:
+                if e.is_dir():
+                    wallets[e.name] = known.get(e.name, '')
+        return folder, {'mtime': mtime, 'wallets': wallets}
+
+    def scan(self) -> List[Dict[str, Any]]:
+        """All wallets as {'phrase', 'wallet', 'file', 'address'} ('' when delegated.addr is missing)."""
+        with self._lock:
+            cache = self._load_cache()
+            folders = WalletIndex(self.root).phrase_folders()
+            with ThreadPoolExecutor(max_workers=self.workers) as ex:
+                listed = list(ex.map(lambda f: self._list_phrase(f, cache.get(f)), folders))
+                todo = [(f, w) for f, entry in listed if entry
+                        for w, addr in entry['wallets'].items() if not addr]
+                paths = [os.path.join(f, 'generated_keys', w, 'delegated.addr') for f, w in todo]
+                addrs = list(ex.map(_read_addr, paths)) if paths else []
+
+            new_cache: Dict[str, Any] = {f: entry for f, entry in listed if entry}
+            for (f, w), addr in zip(todo, addrs):
+                new_cache[f]['wallets'][w] = addr
+            if new_cache != cache:
+                self._cache = new_cache
+                tmp = self.cache_path + '.tmp'
+                try:
+                    with open(tmp, 'w', encoding='utf-8') as fh:
+                        json.dump(new_cache, fh, separators=(',', ':'))
+                    os.replace(tmp, self.cache_path)
+                except OSError:
+                    pass
+
+            out = []
+            for f in folders:
+                entry = new_cache.get(f)
+                if not entry:
+                    continue
+                phrase = os.path.basename(f)
+                for w in sorted(entry['wallets'], key=_natural_key):
+                    out.append({'phrase': phrase, 'wallet': w, 'address': entry['wallets'][w],
+                                'file': os.path.join(f, 'generated_keys', w, 'delegated.addr')})
+            return out